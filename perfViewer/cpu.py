@@ -7,96 +7,165 @@ Definition of Class for CPU
 
 """
 
-def process_sched_switch_list(cpu_list, task_list, sched_switch_df):
+import numpy as np
+from runtimeslices import RuntimeSlices
+from runtimestatistics import RuntimeStatistics
+from timestamps import NS_PER_MS
+
+CPU_IDLE_EXIT_STATE = 4294967295  # perf identifier for idle state change (see perf kernel reference)
+
+def process_sched_switch_list(cpu_registry, task_list, sched_switch_chunks):
     """
     Process scheduler switch events
-    :param cpu_list: List of CPUs
+    :param cpu_registry: Registry of CPUs keyed by cpu number, new CPUs are added to it
     :param task_list: List of already processed tasks
-    :param sched_switch_df: Dataframe of sched_switch events
-    :return: cpu_list
+    :param sched_switch_chunks: Iterable of dataframes of sched_switch events, sorted by timestamp over the chunks
+    :return: List of CPUs
     """
 
-    for task in task_list:
-        task_runtime = task.get_task_runtime()
-        cpu_indices = task.get_cpu_to_runtime()
-
-        for runtime_entry, cpu_index in zip(task_runtime[0], cpu_indices):
-            runtime_start = runtime_entry[0]
-            runtime_duration = runtime_entry[1]
-
-            new_cpu = CPU(int(cpu_index))
-            if not new_cpu in cpu_list:
-                cpu_list.append(new_cpu)
-            index = cpu_list.index(new_cpu)
+    if len(task_list) > 0:
+        # Runtime slices of all tasks in task order, CPUs receive them in the same order
+        task_runtime = np.concatenate([task.get_task_runtime() for task in task_list])
+        cpu_numbers, first_slices, cpu_counts = np.unique(task_runtime['cpu'], return_index=True, return_counts=True)
+        slices_by_cpu = np.argsort(task_runtime['cpu'], kind='stable')
+        cpu_ends = np.cumsum(cpu_counts)
+        for cpu_index in np.argsort(first_slices).tolist():
+            cpu_slices = slices_by_cpu[cpu_ends[cpu_index] - cpu_counts[cpu_index]:cpu_ends[cpu_index]]
+            cpu_registry.get(int(cpu_numbers[cpu_index])).set_cpu_runtimes(task_runtime[cpu_slices])
 
-            cpu_list[index].set_cpu_runtime(task.get_task_number(),
-                                            runtime_start,
-                                            runtime_duration)
+    for sched_switch_df in sched_switch_chunks:
+        switch_columns = sched_switch_df[['timestamp', 'prev_comm', 'prev_prio', 'next_comm', 'next_prio']]
+        for cpu_number, rows in sched_switch_df.groupby('cpu', sort=False).indices.items():
+            cpu_registry.get(int(cpu_number)).set_cpu_task_switches(switch_columns.iloc[rows])
 
-    for switch_event_index, switch_event in sched_switch_df.iterrows():
-        new_cpu = CPU(switch_event['cpu'])
-        if not new_cpu in cpu_list:
-            cpu_list.append(new_cpu)
-        index = cpu_list.index(new_cpu)
+    return cpu_registry.to_list()
 
-        cpu_list[index].set_cpu_task_switching(switch_event['timestamp'], switch_event['prev_comm'],
-                                                                switch_event['prev_prio'], switch_event['next_comm'],
-                                                                switch_event['next_prio'])
-    return cpu_list
-
-def process_cpu_idle_list(cpu_idle_df, record_duration):
+def get_cpu_idle_residency(cpu_idle_chunks):
+    """
+    Residency in idle states from power:cpu_idle. Each idle exit (state CPU_IDLE_EXIT_STATE) is paired with the idle
+    entry directly before it on the same CPU, any number of idle states is supported.
+    :param cpu_idle_chunks: Iterable of pandas dataframes of power:cpu_idle, sorted by timestamp over the chunks. The
+                            last event of each CPU is carried over to the next chunk.
+    :return: numpy arrays cpus x states of idle entries and residency in nanoseconds, dictionary of
+             (cpu, state): RuntimeStatistics of the residencies
+    """
+    entries = np.zeros((0, 0), dtype=np.int64)
+    statistics = dict()
+    carried = (np.empty(0, dtype=np.int16), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64))
+    for cpu_idle_df in cpu_idle_chunks:
+        cpus = cpu_idle_df['cpu'].to_numpy(dtype=np.int16)
+        states = cpu_idle_df['state'].to_numpy()
+        timestamps = cpu_idle_df['timestamp'].to_numpy()
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            cpus, states, timestamps = cpus[order], states[order], timestamps[order]
+
+        # Each event is encoded as cpu * (num_states + 1) + state + 1, idle exits as cpu * (num_states + 1). The cast
+        # to int32 wraps CPU_IDLE_EXIT_STATE to -1. The carried events of the previous chunks come first.
+        cpus = np.concatenate((carried[0], cpus))
+        states = np.concatenate((carried[1], states.astype(np.int32) + 1))
+        timestamps = np.concatenate((carried[2], timestamps))
+        num_cpus = int(cpus.max(initial=-1)) + 1
+        num_states = int(states.max(initial=0))
+        codes = cpus.astype(np.int32) * (num_states + 1) + states
+        chunk_entries = np.bincount(codes[len(carried[0]):], minlength=num_cpus * (num_states + 1))
+        chunk_entries = chunk_entries.reshape(num_cpus, num_states + 1)[:, 1:]
+        entries = np.pad(entries, ((0, max(num_cpus - entries.shape[0], 0)),
+                                   (0, max(num_states - entries.shape[1], 0))))
+        entries[:num_cpus, :num_states] += chunk_entries
+
+        # Stable sort by cpu keeps the events of a CPU in time order, an exit is paired with the entry directly
+        # before it
+        order = np.argsort(cpus, kind='stable')
+        sorted_codes = codes[order]
+        exit_codes = sorted_codes - sorted_codes % (num_states + 1)
+        paired = np.flatnonzero((sorted_codes[1:] == exit_codes[:-1]) & (sorted_codes[:-1] != exit_codes[:-1]))
+        residencies = np.diff(timestamps[order])[paired]
+        keys = sorted_codes[paired]
+        key_dtype = np.int16 if num_cpus * (num_states + 1) <= np.iinfo(np.int16).max else np.int32
+        by_key = np.argsort(keys.astype(key_dtype), kind='stable')
+        key_counts = np.bincount(keys, minlength=num_cpus * (num_states + 1))
+        key_ends = np.cumsum(key_counts)
+
+        for key in np.flatnonzero(key_counts).tolist():
+            cpu_number, state = divmod(key, num_states + 1)
+            state_statistics = statistics.setdefault((cpu_number, state - 1), RuntimeStatistics())
+            state_statistics.add_durations(residencies[by_key[key_ends[key] - key_counts[key]:key_ends[key]]])
+
+        # The last event of each CPU may be the entry of an exit in the next chunk
+        sorted_cpus = cpus[order]
+        last_events = order[np.flatnonzero(np.append(sorted_cpus[1:] != sorted_cpus[:-1], len(order) > 0))]
+        carried = (cpus[last_events], states[last_events], timestamps[last_events])
+
+    residency = np.zeros(entries.shape, dtype=np.int64)
+    for (cpu_number, state), state_statistics in statistics.items():
+        residency[cpu_number, state] = state_statistics.total
+    return entries, residency, statistics
+
+def get_binned_utilization(runtime_slices, start, stop, bin_size):
     """
-    Calculate duration in idle states from power:cpu_idle
-    :param cpu_idle_df: pandas dataframe of power:cpu_idle
-    :param record_duration: perf record duration
-    :return: cpu_idle_state table
+    Utilization per bin of fixed size. The runtime slices are clipped to [start, stop), each slice adds its overlap with
+    the first and the last bin it touches, the bins in between are filled with a difference array.
+    :param runtime_slices: Structured array of runtime slices (start, duration in nanoseconds)
+    :param start: Start of the first bin in nanoseconds
+    :param stop: End of the last bin in nanoseconds
+    :param bin_size: Size of a bin in nanoseconds
+    :return: numpy array of the utilization per bin, 1.0 for a fully used bin
     """
-    num_cpus = 0
-    state_change_identifier=4294967295  # perf identifier for idle state change (see perf kernel reference)
-
-    for entry_index, entry in cpu_idle_df.iterrows():
-        if num_cpus < entry['cpu']:
-            num_cpus+=1
-    num_cpus+=1
-
-    previous_timestamps = [0]*num_cpus
-    last_idle_state = [0]*num_cpus
-    cpu_idle_state = [[0]*2]*num_cpus
-
-    for item_index, item in cpu_idle_df.iterrows():
-        if item['state'] != state_change_identifier:
-            previous_timestamps[item['cpu']] = item['timestamp']
-            last_idle_state[item['cpu']] = item['state']
-        else:
-            cpu_idle_state[item['cpu']][last_idle_state[item['cpu']]] += item['timestamp'] -\
-                                                                         previous_timestamps[item['cpu']]
-    i = 0
-    for lines in cpu_idle_state:
-        lines[0] = round(lines[0]*1e3, 3)
-        lines[1] = round(lines[1]*1e3, 3)
-        lines.insert(0, i)
-        if lines[2] + lines[1] > 0:
-            lines.insert(3, round(100 * lines[1]*1e-3 / record_duration, 3))
-            lines.insert(4, round(100 * lines[2]*1e-3 / record_duration, 3))
-            lines.insert(5, round(100 * (lines[1]*1e-3 + lines[2]*1e-3) / record_duration, 3))
-        else:
-            lines.insert(3, 0)
-            lines.insert(4, 0)
-            lines.insert(5, 0)
-        i += 1
-
-    return cpu_idle_state
+    num_bins = max(-(-(stop - start) // bin_size), 0)
+    slice_starts = np.maximum(runtime_slices['start'], start)
+    slice_stops = np.minimum(runtime_slices['start'] + runtime_slices['duration'], stop)
+    inside = slice_stops > slice_starts
+    slice_starts = slice_starts[inside] - start
+    slice_stops = slice_stops[inside] - start
+
+    first_bins = slice_starts // bin_size
+    last_bins = (slice_stops - 1) // bin_size
+    single = first_bins == last_bins
+    busy_time = np.zeros(num_bins)
+    busy_time += np.bincount(first_bins[single], weights=slice_stops[single] - slice_starts[single],
+                             minlength=num_bins)
+    multiple = ~single
+    busy_time += np.bincount(first_bins[multiple], weights=(first_bins[multiple] + 1) * bin_size -
+                             slice_starts[multiple], minlength=num_bins)
+    busy_time += np.bincount(last_bins[multiple], weights=slice_stops[multiple] - last_bins[multiple] * bin_size,
+                             minlength=num_bins)
+    full_bins = np.bincount(first_bins[multiple] + 1, minlength=num_bins + 1) - \
+        np.bincount(last_bins[multiple], minlength=num_bins + 1)
+    busy_time += np.cumsum(full_bins)[:num_bins] * bin_size
+
+    return busy_time / bin_size
+
+def get_peak_window(utilization, window_bins):
+    """
+    Busiest window of consecutive bins
+    :param utilization: numpy array of the utilization per bin
+    :param window_bins: Number of bins of the window
+    :return: Index of the first bin of the window, mean utilization in the window
+    """
+    if len(utilization) == 0:
+        return 0, 0.0
+    window_bins = max(min(window_bins, len(utilization)), 1)
+    cumulative_utilization = np.concatenate(([0.0], np.cumsum(utilization)))
+    window_sums = cumulative_utilization[window_bins:] - cumulative_utilization[:-window_bins]
+    peak = int(np.argmax(window_sums))
+    return peak, float(window_sums[peak]) / window_bins
 
 class CPU:
     """
     CPU Class
     """
+    __slots__ = ('number', 'total_runtime', 'total_sleeptime', 'runtime', 'statistics', 'task_switch',
+                 'task_switch_times', 'usage_percent')
+
     def __init__(self, cpu_number):
         self.number = cpu_number
         self.total_runtime = 0
         self.total_sleeptime = 0
-        self.runtime = []
+        self.runtime = RuntimeSlices()
+        self.statistics = RuntimeStatistics()
         self.task_switch = []
+        self.task_switch_times = np.empty(0, dtype=np.int64)
         self.usage_percent = 0
 
     def __eq__(self, other):
@@ -106,34 +175,64 @@ class CPU:
         """ get CPU number"""
         return self.number
 
-    def get_cpu_runtime_tuple(self):
-        """ get cpu runtime data """
-        runtime_data = []
-        runtime_data.append([tuple(row[1]) for row in self.runtime])
-        return runtime_data
-
-    def get_task_switch_tuple(self, yvalue):
-        """ get cpu task switch data """
-        return [(float(row[0]), yvalue) for row in self.task_switch]
-
-    def get_cpu_task_switching_text(self, time):
-        """ get task switch information """
-        return [row for row in self.task_switch if float(row[0]) == time]
+    def get_cpu_runtime(self):
+        """ get cpu runtime data, numpy structured array view (start, duration, cpu, tid) """
+        return self.runtime.view()
+
+    def get_cpu_utilization(self, start, stop, bin_size):
+        """ get utilization of the cpu per bin between start and stop, times in nanoseconds """
+        return get_binned_utilization(self.runtime.view(), start, stop, bin_size)
+
+    def get_cpu_statistics(self):
+        """ get online statistics of the runtime slice durations """
+        return self.statistics
+
+    def get_task_switch_times(self):
+        """ get sorted timestamps of the task switches in nanoseconds """
+        return self.task_switch_times
+
+    def find_task_switch(self, time, tolerance):
+        """
+        find the task switch nearest to time with bisection on the sorted timestamps
+        :param time: time in nanoseconds
+        :param tolerance: maximum distance in nanoseconds
+        :return: index of the task switch, None if there is none within tolerance
+        """
+        index = int(np.searchsorted(self.task_switch_times, time))
+        candidates = [candidate for candidate in (index - 1, index) if 0 <= candidate < len(self.task_switch_times)]
+        if not candidates:
+            return None
+        nearest = min(candidates, key=lambda candidate: abs(int(self.task_switch_times[candidate]) - time))
+        return nearest if abs(int(self.task_switch_times[nearest]) - time) <= tolerance else None
+
+    def get_cpu_task_switching_text(self, index):
+        """ get task switch information [time, prev task, prev prio, next task, next prio] of task switch index """
+        for task_switch_df in self.task_switch:
+            if index < len(task_switch_df):
+                return task_switch_df.iloc[index].tolist()
+            index -= len(task_switch_df)
+        raise IndexError(index)
 
     def get_cpu_table_entry(self):
         """ get entry for cpu table """
-        return [self.number, round(self.total_runtime*1e3, 3), round(self.usage_percent * 100, 3)]
-
-    def set_cpu_runtime(self, task, start_time, duration):
-        """ receive entry for cpu runtime """
-        self.runtime.append([task, tuple([start_time, duration])])
-        self.total_runtime += duration
-
-    def set_cpu_task_switching(self, time, old_task, old_task_prio, new_task, new_task_prio):
-        """ receive task switch data """
-        self.task_switch.append([time, old_task, old_task_prio, new_task, new_task_prio])
+        return [self.number, round(self.total_runtime / NS_PER_MS, 3), round(self.usage_percent * 100, 3)]
+
+    def set_cpu_runtimes(self, runtime_slices):
+        """ receive runtime slices for cpu runtime, structured array of RUNTIME_SLICE_DTYPE """
+        self.runtime.extend_slices(runtime_slices)
+        self.statistics.add_durations(runtime_slices['duration'])
+        self.total_runtime += int(runtime_slices['duration'].sum())
+
+    def set_cpu_task_switches(self, task_switch_df):
+        """
+        receive task switch data, dataframe of timestamp, prev_comm, prev_prio, next_comm, next_prio. The task switches
+        of a chunk are kept as a dataframe of their own behind the task switches of the previous chunks.
+        """
+        task_switch_df = task_switch_df.sort_values('timestamp', kind='mergesort', ignore_index=True)
+        self.task_switch.append(task_switch_df)
+        self.task_switch_times = np.concatenate((self.task_switch_times, task_switch_df['timestamp'].to_numpy()))
 
     def set_sleeptime_and_percentage(self, total_log_time):
-        """ set overall sleeptime and calculate percentage to overall runtime """
+        """ set overall sleeptime and calculate percentage to overall runtime, total_log_time in nanoseconds """
         self.total_sleeptime = total_log_time - self.total_runtime
         self.usage_percent = self.total_runtime / total_log_time
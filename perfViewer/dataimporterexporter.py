@@ -11,8 +11,13 @@ Imports data from following perf dump files:
     - irq:irq_handler_entry.dump
     - probes_*.list
     - perf.data.probe_*_entry.dump and perf.data.probe_*_exit__return.dump
+or directly from perf.data with the perfdatareader
 Exports data to following files:
+    - perf.data.*.dump.npz (columnar cache of imported dump files)
+    - perf.data.*.dump.idx (timestamp index of dump files)
     - Tracing_Data*.csv
+    - Latency_Data*.csv
+    - Utilization_Data*.csv
     - input_args.txt
     - tid_pid.txt
     - Console_Output*.csv
@@ -21,226 +26,821 @@ Exports data to following files:
 
 import re
 import os
+import io
+import mmap
 from probe import Probe
+import perfdatareader
+import perfdumpparser
+import timestamps
+import runtimestatistics
 import glob
+import numpy as np
 import pandas as pd
 import csv
+from concurrent.futures import ProcessPoolExecutor
 
-def import_data_from_sched_runtime(perf_import_dir, filename):
+# Column layouts of the perf per-event dump files. Each column is described by
+# (column name, key prefix written by perf script, dtype). Columns with dtype None are dropped after parsing.
+# Names are stored as categoricals (see unify_string_columns), numbers in the narrowest integer type of their range.
+# Timestamps are integer nanoseconds (see timestamps).
+PERF_DUMP_HEADER_COLUMNS = [('task', None, 'category'), ('tid', None, 'int32'), ('cpu', None, 'int16'),
+                            ('timestamp', None, 'int64'), ('event', None, 'category')]
+
+SCHED_RUNTIME_COLUMNS = PERF_DUMP_HEADER_COLUMNS + [('comm', 'comm=', 'category'), ('pid', 'pid=', 'int32'),
+                                                   ('runtime', 'runtime=', 'int64'), ('ns', None, None),
+                                                   ('vruntime', 'vruntime=', 'int64'), ('ns2', None, None)]
+
+CPU_IDLE_COLUMNS = PERF_DUMP_HEADER_COLUMNS + [('state', 'state=', 'int64'), ('cpu_id', 'cpu_id=', 'int16')]
+
+SCHED_SWITCH_COLUMNS = PERF_DUMP_HEADER_COLUMNS + [('prev_comm', 'prev_comm=', 'category'),
+                                                  ('prev_pid', 'prev_pid=', 'int32'),
+                                                  ('prev_prio', 'prev_prio=', 'int16'),
+                                                  ('prev_state', 'prev_state=', 'category'), ('-', None, None),
+                                                  ('next_comm', 'next_comm=', 'category'),
+                                                  ('next_pid', 'next_pid=', 'int32'),
+                                                  ('next_prio', 'next_prio=', 'int16')]
+
+SCHED_MIGRATE_COLUMNS = PERF_DUMP_HEADER_COLUMNS + [('comm', 'comm=', 'category'), ('pid', 'pid=', 'int32'),
+                                                   ('prio', 'prio=', 'int16'), ('orig_cpu', 'orig_cpu=', 'int16'),
+                                                   ('dest_cpu', 'dest_cpu=', 'int16')]
+
+SCHED_WAKEUP_COLUMNS = PERF_DUMP_HEADER_COLUMNS + [('comm', 'comm=', 'category'), ('pid', 'pid=', 'int32'),
+                                                  ('prio', 'prio=', 'int16'), ('target', 'target_cpu=', 'int16')]
+
+IRQ_COLUMNS = PERF_DUMP_HEADER_COLUMNS + [('irq', 'irq=', 'int32'), ('irq_source', 'name=', 'category')]
+
+PROBE_ENTRY_COLUMNS = PERF_DUMP_HEADER_COLUMNS + [('address', None, 'category')]
+
+PROBE_EXIT_COLUMNS = PERF_DUMP_HEADER_COLUMNS + [('address1', None, None), ('-', None, None),
+                                                ('address', None, 'category')]
+
+# Columnar cache of parsed dump files, written next to the dump as <dump>.npz. Increase the version whenever the
+# layout or the dtypes of the imported dataframes change.
+IMPORT_CACHE_SUFFIX = '.npz'
+IMPORT_CACHE_VERSION = 3
+
+# Index of a perf dump file (<dump>.idx) with timestamp, byte offset and row number of a line per bucket of
+# DUMP_INDEX_STRIDE bytes, used to read time windows without scanning the whole dump
+DUMP_INDEX_SUFFIX = '.idx'
+DUMP_INDEX_VERSION = 1
+DUMP_INDEX_STRIDE = 64 * 1024
+
+# perf script separates the 'key=' prefixes with '=' and the cpu number with '[' and ']'. These characters are
+# translated to blanks, so every prefix becomes a token of its own which is skipped while parsing.
+PERF_DUMP_SEPARATORS = bytes.maketrans(b'=[]', b'   ')
+
+# Timestamp behind the cpu number of a dump line, ex. b'  perf  1234 [000]  1630.000910: irq:irq_handler_entry: ...'
+PERF_DUMP_TIMESTAMP = re.compile(rb'\] +(\d+\.\d+): ')
+
+def parse_perf_dump(data, columns):
+    """
+    Parse the content of a perf per-event dump file. The lines are parsed straight from the bytes with the layout of
+    the first line (see perfdumpparser), which skips the 'key=' prefixes and the dropped columns without tokenizing
+    them. Dumps with a line of another layout are tokenized with parse_perf_dump_tokens.
+    :param data: Content of dump file as bytes or mmap
+    :param columns: Column layout of the dump file, ex. SCHED_SWITCH_COLUMNS
+    :return: Pandas dataframe of events
+    """
+    events_df = perfdumpparser.parse_dump_lines(data, columns)
+    if events_df is None:
+        events_df = parse_perf_dump_tokens(data[:], columns)
+    return events_df
+
+def parse_perf_dump_tokens(data, columns):
+    """
+    Parse the content of a perf per-event dump file in a single vectorized pass.
+    The trailing ':' of timestamp and event is blanked and the '[cpu]' brackets and 'key=' separators are translated to
+    blanks over the whole buffer, afterwards the C parser of pandas splits the tokens and assigns the dtypes.
+    :param data: Content of dump file as bytes
+    :param columns: Column layout of the dump file, ex. SCHED_SWITCH_COLUMNS
+    :return: Pandas dataframe of events
+    """
+    colnames = []
+    for name, prefix, dtype in columns:
+        if prefix is not None:
+            colnames.append('_' + prefix)
+        colnames.append(name)
+    usecols = [name for name, prefix, dtype in columns if dtype is not None]
+    dtypes = {name: dtype for name, prefix, dtype in columns if dtype is not None}
+
+    if not data.strip():
+        return pd.DataFrame({name: pd.Series(dtype=dtypes[name]) for name in usecols})
+
+    data = data.replace(b': ', b'  ').translate(PERF_DUMP_SEPARATORS)
+
+    # Timestamps are read as text and converted exactly to nanoseconds, a float64 would round them
+    events_df = pd.read_csv(io.BytesIO(data), index_col=False, names=colnames, usecols=usecols,
+                            dtype=dict(dtypes, timestamp='object'), header=None, sep=r'\s+')
+    events_df['timestamp'] = timestamps.parse_timestamps(events_df['timestamp'].to_numpy(dtype=object))
+    return events_df
+
+def get_dump_line_timestamp(data, line_start):
+    """
+    Parse the timestamp of the line at line_start of a perf dump file
+    :param data: Content of dump file as bytes or mmap
+    :param line_start: Byte offset of the line
+    :return: Timestamp in nanoseconds and byte offset of the following line. The timestamp is None, if the line
+             has no timestamp.
+    """
+    line_end = data.find(b'\n', line_start)
+    line_end = len(data) if line_end < 0 else line_end + 1
+    match = PERF_DUMP_TIMESTAMP.search(data[line_start:line_end])
+    if match is None:
+        return None, line_end
+    return timestamps.parse_timestamp(match.group(1)), line_end
+
+def find_dump_offset(data, timestamp, dump_index=None):
+    """
+    Binary search the first line of a perf dump file with an event at or after timestamp. perf script writes the
+    events sorted by timestamp, so only about log2(size) lines are parsed. With a dump index the search is limited to
+    the bucket of the timestamp.
+    :param data: Content of dump file as bytes or mmap
+    :param timestamp: Timestamp in nanoseconds
+    :param dump_index: Dump index of the file (see import_dump_index), None to search the whole file
+    :return: Byte offset of the line
+    """
+    low, high = 0, len(data)
+    if dump_index is not None and len(dump_index['timestamps']):
+        bucket = int(np.searchsorted(dump_index['timestamps'], timestamp, side='left'))
+        if bucket > 0:
+            low = int(dump_index['offsets'][bucket - 1])
+        if bucket < len(dump_index['offsets']):
+            high = int(dump_index['offsets'][bucket])
+
+    while low < high:
+        # Start of the line containing the middle byte, never before low as low is a line start
+        line_start = data.rfind(b'\n', low, (low + high) // 2) + 1 or low
+        line_timestamp, line_end = get_dump_line_timestamp(data, line_start)
+        if line_timestamp is not None and line_timestamp >= timestamp:
+            high = line_start
+        else:
+            low = line_end
+    return low
+
+def get_dump_window_offsets(data, window, dump_index=None):
+    """
+    Byte offsets of the lines of a perf dump file with events inside a time window
+    :param data: Content of dump file as bytes or mmap
+    :param window: (start, stop) timestamps in nanoseconds, both included. None for an open end.
+    :param dump_index: Dump index of the file, None to search the whole file
+    :return: Byte offsets (begin, end) of the lines
+    """
+    start, stop = window
+    begin = 0 if start is None else find_dump_offset(data, start, dump_index)
+    end = len(data) if stop is None else find_dump_offset(data, stop + 1, dump_index)
+    return begin, max(begin, end)
+
+def build_dump_index(data, stride=DUMP_INDEX_STRIDE):
+    """
+    Build the index of a perf dump file. The file is split in buckets of about stride bytes, cut at line starts. For
+    each bucket the timestamp, byte offset and row number of its first line are stored.
+    :param data: Content of dump file as bytes or mmap
+    :param stride: Number of bytes per bucket
+    :return: Dictionary of numpy arrays timestamps, offsets and rows
+    """
+    offsets = []
+    rows = []
+    line_timestamps = []
+    row = 0
+    line_start = 0
+    while line_start < len(data):
+        line_end = data.find(b'\n', line_start)
+        match = PERF_DUMP_TIMESTAMP.search(data, line_start, len(data) if line_end < 0 else line_end)
+        if match is not None:
+            offsets.append(line_start)
+            rows.append(row)
+            line_timestamps.append(match.group(1))
+        next_start = data.find(b'\n', line_start + stride - 1) + 1
+        if next_start <= line_start:
+            break
+        row += data[line_start:next_start].count(b'\n')
+        line_start = next_start
+
+    dump_index = dict()
+    dump_index['timestamps'] = timestamps.parse_timestamps(line_timestamps) if line_timestamps else \
+        np.empty(0, dtype=np.int64)
+    dump_index['offsets'] = np.array(offsets, dtype=np.int64)
+    dump_index['rows'] = np.array(rows, dtype=np.int64)
+    return dump_index
+
+def import_dump_index(perf_import_dir, filename):
+    """
+    Load the index (<dump>.idx) of a perf dump file. The index is only used, if size and modification time of the
+    dump file still match the values stored at export.
+    :param perf_import_dir: Path to file
+    :param filename: name of dump file
+    :return: Dictionary of numpy arrays timestamps, offsets and rows, None if there is no valid index
+    """
+    dump_path = perf_import_dir + filename
+    index_path = dump_path + DUMP_INDEX_SUFFIX
+    if not os.path.exists(index_path):
+        return None
+
+    dump_stat = os.stat(dump_path)
+    try:
+        with np.load(index_path, allow_pickle=False) as index:
+            if int(index['index_version']) != DUMP_INDEX_VERSION or \
+                    int(index['source_size']) != dump_stat.st_size or \
+                    int(index['source_mtime']) != dump_stat.st_mtime_ns:
+                return None
+            dump_index = {name: index[name] for name in ('timestamps', 'offsets', 'rows')}
+    except (OSError, ValueError, KeyError):
+        return None
+    return dump_index
+
+def export_dump_index(perf_import_dir, filename):
+    """
+    Build the index of a perf dump file and write it to <dump>.idx next to the dump file
+    :param perf_import_dir: Path to file
+    :param filename: name of dump file
+    """
+    dump_path = perf_import_dir + filename
+    index_path = dump_path + DUMP_INDEX_SUFFIX
+
+    with open(dump_path, 'rb') as dump_file:
+        dump_stat = os.fstat(dump_file.fileno())
+        if dump_stat.st_size == 0:
+            dump_index = build_dump_index(b'')
+        else:
+            with mmap.mmap(dump_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                dump_index = build_dump_index(data)
+
+    dump_index['index_version'] = np.array(DUMP_INDEX_VERSION)
+    dump_index['source_size'] = np.array(dump_stat.st_size)
+    dump_index['source_mtime'] = np.array(dump_stat.st_mtime_ns)
+    try:
+        with open(index_path + '.tmp', 'wb') as index_file:
+            np.savez(index_file, **dump_index)
+        os.replace(index_path + '.tmp', index_path)
+    except OSError as err:
+        print("Warning: Couldn't write dump index {0}: {1}".format(index_path, err))
+
+def select_window(events_df, window):
+    """
+    Select the events of a dataframe sorted by timestamp inside a time window
+    :param events_df: Pandas dataframe of events
+    :param window: (start, stop) timestamps in nanoseconds, both included. None for an open end. None selects all.
+    :return: Pandas dataframe of the events inside the window
+    """
+    if window is None:
+        return events_df
+    start, stop = window
+    begin = 0 if start is None else events_df['timestamp'].searchsorted(start, side='left')
+    end = len(events_df) if stop is None else events_df['timestamp'].searchsorted(stop, side='right')
+    return events_df.iloc[begin:end].reset_index(drop=True)
+
+def read_perf_dump(perf_import_dir, filename, columns, window=None):
+    """
+    Open a perf per-event dump file and parse it with parse_perf_dump
+    :param perf_import_dir: Path to file
+    :param filename: name of file
+    :param columns: Column layout of the dump file
+    :param window: (start, stop) timestamps in nanoseconds. Only the lines inside the window are read from the memory
+                   mapped file, their byte range is looked up in the dump index if there is a valid one.
+    :return: Pandas dataframe of events
+    """
+    with open(perf_import_dir + filename, 'rb') as dump_file:
+        if os.fstat(dump_file.fileno()).st_size == 0:
+            return parse_perf_dump(b'', columns)
+        with mmap.mmap(dump_file.fileno(), 0, access=mmap.ACCESS_READ) as dump_map:
+            if window is None:
+                # The whole dump is parsed from the memory mapped file without a copy
+                return parse_perf_dump(dump_map, columns)
+            dump_index = import_dump_index(perf_import_dir, filename)
+            begin, end = get_dump_window_offsets(dump_map, window, dump_index)
+            data = dump_map[begin:end]
+    return parse_perf_dump(data, columns)
+
+def read_perf_dump_chunks(perf_import_dir, filename, columns, chunk_size, window=None):
+    """
+    Open a perf per-event dump file and parse it in chunks of about chunk_size bytes, cut at line ends
+    :param perf_import_dir: Path to file
+    :param filename: name of file
+    :param columns: Column layout of the dump file
+    :param chunk_size: Number of bytes read per chunk
+    :param window: (start, stop) timestamps in nanoseconds. Only the lines inside the window are parsed.
+    :return: Generator of pandas dataframes of events
+    """
+    with open(perf_import_dir + filename, 'rb') as dump_file:
+        if os.fstat(dump_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(dump_file.fileno(), 0, access=mmap.ACCESS_READ) as dump_map:
+            begin, end = 0, len(dump_map)
+            if window is not None:
+                dump_index = import_dump_index(perf_import_dir, filename)
+                begin, end = get_dump_window_offsets(dump_map, window, dump_index)
+
+            while begin < end:
+                chunk_end = min(begin + chunk_size, end)
+                if chunk_end < end:
+                    # Cut at the last line end of the chunk, a line longer than a chunk is read as a whole
+                    line_end = dump_map.rfind(b'\n', begin, chunk_end) + 1 or dump_map.find(b'\n', chunk_end, end) + 1
+                    chunk_end = line_end or end
+                yield parse_perf_dump(dump_map[begin:chunk_end], columns)
+                begin = chunk_end
+
+def unify_string_columns(dataframes, string_table=None):
+    """
+    Convert the categorical columns of several dataframes to one shared string table. Codes of equal strings are equal
+    in all dataframes, so they compare as integers and concatenated dataframes stay categorical.
+    :param dataframes: List of pandas dataframes, the columns are converted in place
+    :param string_table: String table of previous calls. New strings are appended, so existing codes stay valid
+    :return: String table, pandas Index of all strings
+    """
+    strings = set()
+    for events_df in dataframes:
+        for name in events_df.columns:
+            if isinstance(events_df[name].dtype, pd.CategoricalDtype):
+                strings.update(events_df[name].cat.categories)
+
+    if string_table is None:
+        string_table = pd.Index([], dtype=object)
+    new_strings = sorted(strings.difference(string_table))
+    if new_strings:
+        string_table = string_table.append(pd.Index(new_strings, dtype=object))
+
+    string_dtype = pd.CategoricalDtype(string_table)
+    for events_df in dataframes:
+        for name in events_df.columns:
+            if isinstance(events_df[name].dtype, pd.CategoricalDtype):
+                events_df[name] = events_df[name].astype(string_dtype)
+    return string_table
+
+def stream_dump_chunks(perf_import_dir, dump_files, chunk_size, window=None):
+    """
+    Stream the events of several perf dump files merged by timestamp. Each dump file is read in chunks and the
+    chunks are merged k-way, so about one chunk per dump file is held in memory. The events of a chunk at its last
+    timestamp are kept with the next chunk of the file.
+    :param perf_import_dir: Path to files
+    :param dump_files: List of (column layout, filename),
+                       ex. [(SCHED_SWITCH_COLUMNS, 'perf.data.sched:sched_switch.dump')]
+    :param chunk_size: Number of bytes read per chunk of a dump file
+    :param window: (start, stop) timestamps in nanoseconds of the events to stream, None for all
+    :return: Generator of lists of pandas dataframes, the events of each dump file in the time range of the chunk.
+             The string table of the categorical columns only grows between the chunks, codes of earlier chunks stay
+             valid. Dump files without any events give a single chunk of empty dataframes.
+    """
+    chunk_readers = [read_perf_dump_chunks(perf_import_dir, filename, columns, chunk_size, window)
+                     for columns, filename in dump_files]
+    pending_chunks = [None] * len(chunk_readers)
+    # Dump files without events stream empty dataframes of their column layout
+    empty_chunks = [parse_perf_dump(b'', columns) for columns, filename in dump_files]
+    string_table = None
+    merged = False
+
+    while True:
+        # Refill every dump file whose pending events all share one timestamp, the next chunk may continue them
+        for i, chunk_reader in enumerate(chunk_readers):
+            while chunk_reader is not None and (pending_chunks[i] is None or pending_chunks[i].empty or
+                                                pending_chunks[i]['timestamp'].iloc[0] ==
+                                                pending_chunks[i]['timestamp'].iloc[-1]):
+                chunk = next(chunk_reader, None)
+                if chunk is None:
+                    chunk_readers[i] = chunk_reader = None
+                elif pending_chunks[i] is None or pending_chunks[i].empty:
+                    pending_chunks[i] = chunk
+                else:
+                    string_table = unify_string_columns([pending_chunks[i], chunk], string_table)
+                    pending_chunks[i] = pd.concat([pending_chunks[i], chunk], ignore_index=True)
+        if all(chunk is None or chunk.empty for chunk in pending_chunks):
+            if not merged:
+                unify_string_columns(empty_chunks)
+                yield empty_chunks
+            break
+
+        # Events before the smallest last timestamp of the files still being read can be merged safely. Events at
+        # that timestamp wait for the next chunk, so equal timestamps of all files are merged in the same order as
+        # in a full import. Once all files are read the remaining events are merged.
+        reading_chunks = [chunk for chunk, chunk_reader in zip(pending_chunks, chunk_readers)
+                          if chunk_reader is not None]
+        merged_chunks = []
+        for i, chunk in enumerate(pending_chunks):
+            if chunk is None:
+                merged_chunks.append(empty_chunks[i])
+                continue
+            split = len(chunk)
+            if reading_chunks and not chunk.empty:
+                watermark = min(reading_chunk['timestamp'].iloc[-1] for reading_chunk in reading_chunks)
+                split = chunk['timestamp'].searchsorted(watermark, side='left')
+            merged_chunks.append(chunk.iloc[:split])
+            pending_chunks[i] = chunk.iloc[split:]
+
+        string_table = unify_string_columns(merged_chunks, string_table)
+        merged = True
+        yield merged_chunks
+
+def stream_perf_events(perf_import_dir, dump_files, chunk_size, window=None):
+    """
+    Stream the events of several perf dump files merged by timestamp, see stream_dump_chunks
+    :param perf_import_dir: Path to files
+    :param dump_files: List of (column layout, filename),
+                       ex. [(SCHED_SWITCH_COLUMNS, 'perf.data.sched:sched_switch.dump')]
+    :param chunk_size: Number of bytes read per chunk of a dump file
+    :param window: (start, stop) timestamps in nanoseconds of the events to stream, None for all
+    :return: Generator of pandas dataframes of events sorted by timestamp. The string table of the categorical
+             columns only grows between the chunks, codes of earlier chunks stay valid.
+    """
+    for merged_chunks in stream_dump_chunks(perf_import_dir, dump_files, chunk_size, window):
+        if all(chunk.empty for chunk in merged_chunks):
+            continue
+        events_df = pd.concat([chunk for chunk in merged_chunks if not chunk.empty], ignore_index=True)
+        yield events_df.sort_values('timestamp', kind='mergesort').reset_index(drop=True)
+
+def stream_dump_files(perf_import_dir, dump_files, chunk_size, window, keys):
+    """
+    Stream the events of the dump files of keys merged by timestamp, see stream_dump_chunks
+    :param perf_import_dir: Path to files
+    :param dump_files: Dictionary of key: (column layout, filename),
+                       ex. {'SCHED_SWITCH_DF': (SCHED_SWITCH_COLUMNS, 'perf.data.sched:sched_switch.dump')}
+    :param chunk_size: Number of bytes read per chunk of a dump file
+    :param window: (start, stop) timestamps in nanoseconds of the events to stream, None for all
+    :param keys: Keys of the dump files to stream, keys without a dump file are left out
+    :return: Generator of dictionaries of key: pandas dataframe of the events in the time range of the chunk
+    """
+    keys = [key for key in keys if key in dump_files]
+    for merged_chunks in stream_dump_chunks(perf_import_dir, [dump_files[key] for key in keys], chunk_size, window):
+        yield dict(zip(keys, merged_chunks))
+
+def get_event_chunks(imported_files, keys):
+    """
+    Events of the dataframes of keys chunk by chunk. In stream mode (DUMP_FILE_STREAM) the dump files are read in
+    chunks merged by timestamp, otherwise the imported dataframes are the only chunk.
+    :param imported_files: Dictionary of imported files
+    :param keys: Keys of the dataframes, ex. ['SCHED_WAKEUP_DF', 'SCHED_SWITCH_DF']. Keys which are neither imported
+                 nor streamed are left out.
+    :return: Iterable of dictionaries of key: pandas dataframe of events, sorted by timestamp over the chunks
+    """
+    if 'DUMP_FILE_STREAM' in imported_files:
+        return imported_files['DUMP_FILE_STREAM'](keys)
+    return [{key: imported_files[key] for key in keys if key in imported_files}]
+
+def concat_event_chunks(event_chunks):
+    """
+    Concatenate the dataframes of events of consecutive chunks, ex. the events of a dump file kept by an analysis in
+    stream mode. The string table only grows between the chunks, so the categorical columns of all chunks are
+    converted to the string table of the last chunk.
+    :param event_chunks: List of pandas dataframes of events
+    :return: Pandas dataframe of events
+    """
+    string_columns = [name for name in event_chunks[-1].columns
+                      if isinstance(event_chunks[-1][name].dtype, pd.CategoricalDtype)]
+    if string_columns:
+        unify_string_columns(event_chunks, event_chunks[-1][string_columns[0]].cat.categories)
+    return pd.concat(event_chunks, ignore_index=True)
+
+def import_dump_cache(perf_import_dir, filename):
+    """
+    Load the columnar cache (<dump>.npz) of a perf dump file. The cache is only used, if size and modification time
+    of the dump file still match the values stored at export.
+    :param perf_import_dir: Path to file
+    :param filename: name of dump file
+    :return: Pandas dataframe of events, None if there is no valid cache
+    """
+    dump_path = perf_import_dir + filename
+    cache_path = dump_path + IMPORT_CACHE_SUFFIX
+    if not os.path.exists(cache_path):
+        return None
+
+    dump_stat = os.stat(dump_path)
+    try:
+        with np.load(cache_path, allow_pickle=False) as cache:
+            if int(cache['cache_version']) != IMPORT_CACHE_VERSION or \
+                    int(cache['source_size']) != dump_stat.st_size or \
+                    int(cache['source_mtime']) != dump_stat.st_mtime_ns:
+                return None
+            events = dict()
+            for name in cache['columns']:
+                name = str(name)
+                if 'values:' + name in cache:
+                    # Categorical columns are stored as codes and categories, code -1 marks missing values
+                    events[name] = pd.Categorical.from_codes(cache['column:' + name],
+                                                             cache['values:' + name].astype(object))
+                else:
+                    events[name] = cache['column:' + name]
+            events_df = pd.DataFrame(events)
+    except (OSError, ValueError, KeyError):
+        return None
+    return events_df
+
+def export_dump_cache(perf_import_dir, filename, events_df):
+    """
+    Write parsed events of a perf dump file to a columnar cache (<dump>.npz) next to the dump file
+    :param perf_import_dir: Path to file
+    :param filename: name of dump file
+    :param events_df: Pandas dataframe of events
+    """
+    dump_path = perf_import_dir + filename
+    cache_path = dump_path + IMPORT_CACHE_SUFFIX
+    dump_stat = os.stat(dump_path)
+
+    cache = dict()
+    cache['cache_version'] = np.array(IMPORT_CACHE_VERSION)
+    cache['source_size'] = np.array(dump_stat.st_size)
+    cache['source_mtime'] = np.array(dump_stat.st_mtime_ns)
+    cache['columns'] = np.array(events_df.columns, dtype=str)
+    for name in events_df.columns:
+        if isinstance(events_df[name].dtype, pd.CategoricalDtype):
+            cache['column:' + name] = events_df[name].cat.codes.to_numpy()
+            cache['values:' + name] = np.array(events_df[name].cat.categories, dtype=str)
+        else:
+            cache['column:' + name] = events_df[name].to_numpy()
+
+    try:
+        with open(cache_path + '.tmp', 'wb') as cache_file:
+            np.savez(cache_file, **cache)
+        os.replace(cache_path + '.tmp', cache_path)
+    except OSError as err:
+        print("Warning: Couldn't write import cache {0}: {1}".format(cache_path, err))
+
+def import_data_with_cache(import_function, perf_import_dir, filename, window=None):
+    """
+    Import a perf dump file from its columnar cache. If there is no valid cache, the dump is parsed with
+    import_function and the cache is written for later imports. The dump index is written as well, if it is missing.
+    :param import_function: Importer of the dump file, ex. import_data_from_sched_switch
+    :param perf_import_dir: Path to file
+    :param filename: name of dump file
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all. Without a valid
+                   cache only the window is parsed and no cache is written, as it has to hold the whole dump.
+    :return: Pandas dataframe of events
+    """
+    if import_dump_index(perf_import_dir, filename) is None:
+        export_dump_index(perf_import_dir, filename)
+
+    events_df = import_dump_cache(perf_import_dir, filename)
+    if events_df is None:
+        if window is not None:
+            return import_function(perf_import_dir, filename, window)
+        events_df = import_function(perf_import_dir, filename)
+        export_dump_cache(perf_import_dir, filename, events_df)
+    return select_window(events_df, window)
+
+def import_data_from_sched_runtime(perf_import_dir, filename, window=None):
     """
     Open sched:sched_stat_runtime.dump file and import data
     :param perf_import_dir: Path to file
     :param filename: name of file
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all
     :return: Pandas dataframe of events on success, otherwise -1
     """
     try:
-        colnames = ['task', 'tid', 'cpu', 'timestamp', 'event', 'comm', 'pid', 'runtime', 'ns', 'vruntime', 'ns2']
-        sched_runtime_df = pd.read_csv(perf_import_dir + filename, index_col=False, names=colnames, header=None,
-                                       delim_whitespace=True)
-        del sched_runtime_df['ns'], sched_runtime_df['ns2']
-
-        sched_runtime_df['tid'] = pd.to_numeric(sched_runtime_df['tid'])
-        sched_runtime_df['cpu'] = sched_runtime_df['cpu'].map(lambda cpu: re.sub("[^0-9]", "", cpu))
-        sched_runtime_df['cpu'] = pd.to_numeric(sched_runtime_df['cpu'])
-        sched_runtime_df['timestamp'] = sched_runtime_df['timestamp'].map(lambda timestamp: timestamp.replace(":", ""))
-        sched_runtime_df['timestamp'] = pd.to_numeric(sched_runtime_df['timestamp'])
-        sched_runtime_df['comm'] = sched_runtime_df['comm'].map(lambda comm: comm.replace("comm=", ""))
-        sched_runtime_df['pid'] = sched_runtime_df['pid'].map(lambda pid: pid.replace("pid=", ""))
-        sched_runtime_df['runtime'] = sched_runtime_df['runtime'].map(lambda runtime: runtime.replace("runtime=", ""))
-        sched_runtime_df['runtime'] = pd.to_numeric(sched_runtime_df['runtime'])
-        sched_runtime_df['vruntime'] = sched_runtime_df['vruntime'].map(lambda vruntime:
-                                                                        vruntime.replace("vruntime=", ""))
-        sched_runtime_df['vruntime'] = pd.to_numeric(sched_runtime_df['vruntime'])
-        sched_runtime_df['event'] = sched_runtime_df['event'].map(
-            lambda event: event.rstrip(':'))
-
+        sched_runtime_df = read_perf_dump(perf_import_dir, filename, SCHED_RUNTIME_COLUMNS, window)
     except:
         print("Error: Dataimport of sched_runtime failed.")
         os.sys.exit()
 
     return sched_runtime_df
 
-def import_data_from_cpu_idle(perf_import_dir, filename):
+def import_data_from_cpu_idle(perf_import_dir, filename, window=None):
     """
     Open power:cpu_idle.dump file and import data
     :param perf_import_dir: Path to file
     :param filename: name of file
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all
     :return: Pandas dataframe of events on success, otherwise -1
     """
 
     try:
-        colnames = ['task', 'tid', 'cpu', 'timestamp', 'event', 'state', 'cpu_id']
-        cpu_idle_df = pd.read_csv(perf_import_dir + filename, index_col=False, names=colnames, header=None,
-                                  delim_whitespace=True)
-
-        cpu_idle_df['tid'] = pd.to_numeric(cpu_idle_df['tid'])
-        cpu_idle_df['cpu'] = cpu_idle_df['cpu'].map(lambda cpu: re.sub("[^0-9]", "", cpu))
-        cpu_idle_df['cpu'] = pd.to_numeric(cpu_idle_df['cpu'])
-        cpu_idle_df['timestamp'] = cpu_idle_df['timestamp'].map(lambda timestamp: timestamp.replace(":", ""))
-        cpu_idle_df['timestamp'] = pd.to_numeric(cpu_idle_df['timestamp'])
-        cpu_idle_df['state'] = cpu_idle_df['state'].map(lambda state: state.replace("state=", ""))
-        cpu_idle_df['state'] = pd.to_numeric(cpu_idle_df['state'])
-        cpu_idle_df['cpu_id'] = cpu_idle_df['cpu_id'].map(lambda state: state.replace("cpu_id=", "").rstrip())
-        cpu_idle_df['cpu_id'] = pd.to_numeric(cpu_idle_df['cpu_id'])
-        cpu_idle_df['event'] = cpu_idle_df['event'].map(
-            lambda event: event.rstrip(':'))
-
+        cpu_idle_df = read_perf_dump(perf_import_dir, filename, CPU_IDLE_COLUMNS, window)
     except:
         print("Error: Dataimport of cpu_idle_list failed.")
         os.sys.exit()
     return cpu_idle_df
 
-def import_data_from_sched_switch(perf_export_dir, filename):
+def import_data_from_sched_switch(perf_export_dir, filename, window=None):
     """
     Open sched:sched_switch.dump file and import data
     :param perf_export_dir: Path to file
     :param filename: name of file
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all
     :return: pandas dataframe of events on success, otherwise -1
     """
     try:
-        colnames = ['task', 'tid', 'cpu', 'timestamp', 'event', 'prev_comm', 'prev_pid', 'prev_prio', 'prev_state', '-',
-                    'next_comm', 'next_pid', 'next_prio']
-        sched_switch_df = pd.read_csv(perf_export_dir + filename, index_col=False, names=colnames, header=None,
-                                       delim_whitespace=True)
-        del sched_switch_df['-']
-
-        sched_switch_df['tid'] = pd.to_numeric(sched_switch_df['tid'])
-        sched_switch_df['cpu'] = sched_switch_df['cpu'].map(lambda cpu: re.sub("[^0-9]", "", cpu))
-        sched_switch_df['cpu'] = pd.to_numeric(sched_switch_df['cpu'])
-        sched_switch_df['timestamp'] = sched_switch_df['timestamp'].map(lambda timestamp: timestamp.replace(":", ""))
-        sched_switch_df['timestamp'] = pd.to_numeric(sched_switch_df['timestamp'])
-        sched_switch_df['prev_comm'] = sched_switch_df['prev_comm'].map(
-            lambda prev_comm: prev_comm.replace("prev_comm=", ""))
-        sched_switch_df['prev_pid'] = sched_switch_df['prev_pid'].map(
-            lambda prev_pid: prev_pid.replace("prev_pid=", ""))
-        sched_switch_df['prev_prio'] = sched_switch_df['prev_prio'].map(
-            lambda prev_prio: prev_prio.replace("prev_prio=", ""))
-        sched_switch_df['next_comm'] = sched_switch_df['next_comm'].map(
-            lambda next_comm: next_comm.replace("next_comm=", ""))
-        sched_switch_df['next_pid'] = sched_switch_df['next_pid'].map(
-            lambda next_pid: next_pid.replace("next_pid=", ""))
-        sched_switch_df['next_prio'] = sched_switch_df['next_prio'].map(
-            lambda next_prio: next_prio.replace("next_prio=", "").rstrip())
-        sched_switch_df['event'] = sched_switch_df['event'].map(
-            lambda event: event.rstrip(':'))
-
+        sched_switch_df = read_perf_dump(perf_export_dir, filename, SCHED_SWITCH_COLUMNS, window)
     except:
         print("Error: Dataimport of sched_switch_list failed.")
         os.sys.exit()
     return sched_switch_df
 
-def import_data_from_sched_migrate(perf_export_dir, filename):
+def import_data_from_sched_migrate(perf_export_dir, filename, window=None):
     """
     Open sched:sched_migrate.dump file and import data
     :param perf_export_dir: Path to file
     :param filename: name of file
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all
     :return: pandas dataframe of events on success, otherwise -1
     """
 
     try:
-        colnames = ['task', 'tid', 'cpu', 'timestamp', 'command', 'pid', 'prio', 'orig_cpu', 'dest_cpu']
-        sched_migrate_df = pd.read_csv(perf_export_dir + filename, index_col=False, names=colnames, header=None,
-                                       delim_whitespace=True)
-
-        sched_migrate_df['tid'] = pd.to_numeric(sched_migrate_df['tid'])
-        sched_migrate_df['cpu'] = sched_migrate_df['cpu'].map(lambda cpu: re.sub("[^0-9]", "", cpu))
-        sched_migrate_df['cpu'] = pd.to_numeric(sched_migrate_df['cpu'])
-        sched_migrate_df['timestamp'] = sched_migrate_df['timestamp'].map(lambda timestamp: timestamp.replace(":", ""))
-        sched_migrate_df['timestamp'] = pd.to_numeric(sched_migrate_df['timestamp'])
+        sched_migrate_df = read_perf_dump(perf_export_dir, filename, SCHED_MIGRATE_COLUMNS, window)
     except OSError as err:
         print("OS error: {0}".format(err))
         os.sys.exit()
 
     return sched_migrate_df
 
-def import_data_from_sched_waking(perf_export_dir, filename):
+def import_data_from_sched_waking(perf_export_dir, filename, window=None):
     """
     Open sched:sched_waking.dump file and import data
     :param perf_export_dir: Path to file
     :param filename: name of file
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all
     :return: pandas dataframe of events on success, otherwise -1
     """
     try:
-        colnames = ['task', 'tid', 'cpu', 'timestamp', 'event', 'comm', 'pid', 'prio', 'target']
-        sched_waking_df = pd.read_csv(perf_export_dir + filename, index_col=False, names=colnames, header=None,
-                                      delim_whitespace=True)
-
-        sched_waking_df['tid'] = pd.to_numeric(sched_waking_df['tid'])
-        sched_waking_df['cpu'] = sched_waking_df['cpu'].map(lambda cpu: re.sub("[^0-9]", "", cpu))
-        sched_waking_df['cpu'] = pd.to_numeric(sched_waking_df['cpu'])
-        sched_waking_df['timestamp'] = sched_waking_df['timestamp'].map(lambda timestamp: timestamp.replace(":", ""))
-        sched_waking_df['timestamp'] = pd.to_numeric(sched_waking_df['timestamp'])
-        sched_waking_df['comm'] = sched_waking_df['comm'].map(lambda comm: comm.replace("comm=", ""))
-        sched_waking_df['pid'] = sched_waking_df['pid'].map(lambda pid: pid.replace("pid=", ""))
-        sched_waking_df['pid'] = pd.to_numeric(sched_waking_df['pid'])
-        sched_waking_df['prio'] = sched_waking_df['prio'].map(lambda prio: prio.replace("prio=", ""))
-        sched_waking_df['prio'] = pd.to_numeric(sched_waking_df['prio'])
-        sched_waking_df['target'] = sched_waking_df['target'].map(lambda target: target.replace("target_cpu=", ""))
-        sched_waking_df['event'] = sched_waking_df['event'].map(
-            lambda event: event.rstrip(':'))
+        sched_waking_df = read_perf_dump(perf_export_dir, filename, SCHED_WAKEUP_COLUMNS, window)
     except OSError as err:
         print("OS error: {0}".format(err))
         os.sys.exit()
     return sched_waking_df
 
-def import_data_from_sched_wakeup(perf_export_dir, filename):
+def import_data_from_sched_wakeup(perf_export_dir, filename, window=None):
     """
     Open sched:sched_wakeup.dump file and import data
     :param perf_export_dir: Path to file
     :param filename: name of file
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all
     :return: pandas dataframe of events on success, otherwise -1
     """
     try:
-        colnames = ['task', 'tid', 'cpu', 'timestamp', 'event', 'comm', 'pid', 'prio', 'target']
-        sched_wakeup_df = pd.read_csv(perf_export_dir + filename, index_col=False, names=colnames, header=None,
-                                      delim_whitespace=True)
-
-        sched_wakeup_df['tid'] = pd.to_numeric(sched_wakeup_df ['tid'])
-        sched_wakeup_df['cpu'] = sched_wakeup_df ['cpu'].map(lambda cpu: re.sub("[^0-9]", "", cpu))
-        sched_wakeup_df['cpu'] = pd.to_numeric(sched_wakeup_df ['cpu'])
-        sched_wakeup_df['timestamp'] = sched_wakeup_df ['timestamp'].map(lambda timestamp: timestamp.replace(":", ""))
-        sched_wakeup_df['timestamp'] = pd.to_numeric(sched_wakeup_df ['timestamp'])
-        sched_wakeup_df['comm'] = sched_wakeup_df ['comm'].map(lambda comm: comm.replace("comm=", ""))
-        sched_wakeup_df['pid'] = sched_wakeup_df ['pid'].map(lambda pid: pid.replace("pid=", ""))
-        sched_wakeup_df['pid'] = pd.to_numeric(sched_wakeup_df['pid'])
-        sched_wakeup_df['prio'] = sched_wakeup_df ['prio'].map(lambda prio: prio.replace("prio=", ""))
-        sched_wakeup_df['prio'] = pd.to_numeric(sched_wakeup_df['prio'])
-        sched_wakeup_df['target'] = sched_wakeup_df['target'].map(lambda target: target.replace("target_cpu=", ""))
-        sched_wakeup_df['event'] = sched_wakeup_df['event'].map(
-            lambda event: event.rstrip(':'))
+        sched_wakeup_df = read_perf_dump(perf_export_dir, filename, SCHED_WAKEUP_COLUMNS, window)
     except OSError as err:
         print("OS error: {0}".format(err))
         os.sys.exit()
     return sched_wakeup_df
 
-def import_data_from_irq(perf_export_dir, filename):
+def import_data_from_irq(perf_export_dir, filename, window=None):
     """
     Open irq:irq_handler_entry.dump file and import data
     :param perf_export_dir: Path to file
     :param filename: name of file
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all
     :return: pandas dataframe of events on success, otherwise -1
     """
     try:
-        colnames = ['task', 'tid', 'cpu', 'timestamp', 'event', 'irq', 'irq_source']
-        irq_handler_entry_list = pd.read_csv(perf_export_dir + filename, index_col=False, names=colnames, header=None,
-                                             delim_whitespace=True)
-
-        irq_handler_entry_list['tid'] = pd.to_numeric(irq_handler_entry_list['tid'])
-        irq_handler_entry_list['cpu'] = irq_handler_entry_list['cpu'].map(lambda cpu: re.sub("[^0-9]", "", cpu))
-        irq_handler_entry_list['cpu'] = pd.to_numeric(irq_handler_entry_list['cpu'])
-        irq_handler_entry_list['timestamp'] = irq_handler_entry_list['timestamp'].map(
-            lambda timestamp: timestamp.replace(":", ""))
-        irq_handler_entry_list['timestamp'] = pd.to_numeric(irq_handler_entry_list['timestamp'])
-        irq_handler_entry_list['irq'] = irq_handler_entry_list['irq'].map(lambda irq: irq.replace("irq=", ""))
-        irq_handler_entry_list['irq_source'] = irq_handler_entry_list['irq_source'].map(
-            lambda irq_source: irq_source.replace("name=", ""))
-        irq_handler_entry_list['event'] = irq_handler_entry_list['event'].map(
-            lambda event: event.rstrip(':'))
+        irq_handler_entry_list = read_perf_dump(perf_export_dir, filename, IRQ_COLUMNS, window)
     except OSError as err:
         print("OS error: {0}".format(err))
         os.sys.exit()
     return irq_handler_entry_list
 
+def import_dump_files(perf_import_dir, dump_files, jobs=1, use_cache=False, window=None, executor=None):
+    """
+    Import several perf dump files. With jobs > 1 or an executor the files are parsed concurrently on a process pool.
+    :param perf_import_dir: Path to files
+    :param dump_files: Dictionary of key: (importer, filename), ex. 'SCHED_SWITCH_DF': (import_data_from_sched_switch,
+                       'perf.data.sched:sched_switch.dump')
+    :param jobs: Number of worker processes of the process pool created without executor
+    :param use_cache: Import from and export to the columnar cache of the dump files
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all
+    :param executor: Process pool shared with later processing steps, None to create one for jobs > 1
+    :return: Dictionary of key: pandas dataframe of events
+    """
+    imported_files = dict()
+
+    if executor is not None or jobs > 1:
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=min(jobs, len(dump_files)))
+        try:
+            futures = dict()
+            for key, (import_function, filename) in dump_files.items():
+                if use_cache:
+                    futures[key] = executor.submit(import_data_with_cache, import_function, perf_import_dir, filename,
+                                                   window)
+                else:
+                    futures[key] = executor.submit(import_function, perf_import_dir, filename, window)
+            for key, future in futures.items():
+                imported_files[key] = future.result()
+        finally:
+            if own_executor:
+                executor.shutdown()
+    else:
+        for key, (import_function, filename) in dump_files.items():
+            if use_cache:
+                imported_files[key] = import_data_with_cache(import_function, perf_import_dir, filename, window)
+            else:
+                imported_files[key] = import_function(perf_import_dir, filename, window)
+
+    return imported_files
+
+def unify_imported_files(imported_files, probe_list=()):
+    """
+    Share one string table between all imported dataframes and the trace data of the probes
+    :param imported_files: Dictionary of imported files, the string table is stored as STRING_TABLE
+    :param probe_list: List of probes
+    """
+    dataframes = [events_df for events_df in imported_files.values() if isinstance(events_df, pd.DataFrame)]
+    dataframes += [probe.trace_data for probe in probe_list]
+    imported_files['STRING_TABLE'] = unify_string_columns(dataframes)
+
+# Dataframes imported from perf.data: event name: (key of imported files, column layout)
+PERF_DATA_EVENTS = {'sched:sched_migrate_task': ('SCHED_MIGRATE_DF', SCHED_MIGRATE_COLUMNS),
+                    'sched:sched_stat_runtime': ('SCHED_RUNTIME_DF', SCHED_RUNTIME_COLUMNS),
+                    'sched:sched_switch': ('SCHED_SWITCH_DF', SCHED_SWITCH_COLUMNS),
+                    'sched:sched_waking': ('SCHED_WAKING_DF', SCHED_WAKEUP_COLUMNS),
+                    'sched:sched_wakeup': ('SCHED_WAKEUP_DF', SCHED_WAKEUP_COLUMNS),
+                    'irq:irq_handler_entry': ('IRQ_HANDLER_ENTRY_DF', IRQ_COLUMNS),
+                    'irq:irq_handler_exit': ('IRQ_HANDLER_EXIT_DF', IRQ_COLUMNS),
+                    'power:cpu_idle': ('CPU_IDLE_DF', CPU_IDLE_COLUMNS)}
+
+# Tracepoint fields of the dump layout columns with a different name
+PERF_DATA_FIELDS = {'target': 'target_cpu', 'irq_source': 'name'}
+
+# Task states of sched_switch prev_state as printed by perf script
+TASK_STATES = ((0x01, 'S'), (0x02, 'D'), (0x04, 'T'), (0x08, 't'), (0x10, 'X'), (0x20, 'Z'), (0x40, 'P'), (0x80, 'I'))
+TASK_REPORT_MAX = 0x100
+
+def format_task_state(prev_state):
+    """ Format prev_state of sched_switch like perf script, ex. 'S', 'R+' """
+    states = '|'.join(state for bit, state in TASK_STATES if prev_state & bit)
+    return (states if states else 'R') + ('+' if prev_state & TASK_REPORT_MAX else '')
+
+def convert_perf_data_samples(perf_data_reader, event_name, samples, columns):
+    """
+    Convert tracepoint samples decoded from perf.data to the dataframe of the corresponding dump file
+    :param perf_data_reader: PerfDataReader of the perf.data file
+    :param event_name: Name of tracepoint, ex. 'sched:sched_switch'
+    :param samples: Dictionary of numpy arrays of the sample fields
+    :param columns: Column layout of the dump file
+    :return: pandas dataframe of events
+    """
+    def to_categorical(values, format_value=str):
+        """ Format each distinct value once, tracepoint fields repeat a small set of values """
+        unique_values, inverse = np.unique(values, return_inverse=True)
+        if unique_values.dtype.kind == 'S':
+            unique_values = np.char.decode(unique_values, 'utf-8', 'replace')
+        strings = np.array([format_value(value) for value in unique_values.tolist()], dtype=object)
+        categories, codes = np.unique(strings, return_inverse=True)
+        return pd.Series(pd.Categorical.from_codes(codes.reshape(-1)[inverse.reshape(-1)], categories))
+
+    fields = dict(samples)
+    if 'prev_state' in fields:
+        fields['prev_state'] = to_categorical(fields['prev_state'], format_task_state)
+    if 'ret' in fields and 'name' not in fields:
+        fields['name'] = to_categorical(fields['ret'] != 0, lambda handled: 'handled' if handled else 'unhandled')
+    if '__probe_ret_ip' in fields:
+        fields['address'] = to_categorical(fields['__probe_ret_ip'], lambda address: '%x)' % address)
+    elif '__probe_ip' in fields:
+        fields['address'] = to_categorical(fields['__probe_ip'], lambda address: '(%x)' % address)
+
+    events = dict()
+    events['task'] = to_categorical(samples['tid'], perf_data_reader.get_task_name)
+    header_dtypes = {name: dtype for name, prefix, dtype in PERF_DUMP_HEADER_COLUMNS}
+    events['tid'] = samples['tid'].astype(header_dtypes['tid'])
+    events['cpu'] = samples['cpu'].astype(header_dtypes['cpu'])
+    events['timestamp'] = samples['time']
+    events['event'] = pd.Categorical.from_codes(np.zeros(len(samples['time']), dtype=np.int8), [event_name])
+    for name, prefix, dtype in columns[len(PERF_DUMP_HEADER_COLUMNS):]:
+        if dtype is None:
+            continue
+        values = fields[PERF_DATA_FIELDS.get(name, name)]
+        if isinstance(values, pd.Series):
+            events[name] = values
+        else:
+            events[name] = to_categorical(values) if dtype == 'category' else values.astype(dtype)
+
+    return pd.DataFrame(events)
+
+def import_perf_data(perf_import_dir, filename, window=None):
+    """
+    Open perf.data file and import all tracepoint samples without perf script
+    :param perf_import_dir: Path to file
+    :param filename: name of file
+    :param window: (start, stop) timestamps in nanoseconds of the samples to import, None for all
+    :return: Dictionary of imported files with the dataframes of PERF_DATA_EVENTS. PERF_DATA_EVENTS holds the
+             dataframes of all recorded tracepoints (including probes) with the event name as key
+    """
+    try:
+        perf_data_reader = perfdatareader.PerfDataReader(perf_import_dir + filename)
+        samples = perf_data_reader.read_tracepoint_samples(window)
+
+        perf_data_events = dict()
+        for event_name, event_samples in samples.items():
+            if event_name in PERF_DATA_EVENTS:
+                columns = PERF_DATA_EVENTS[event_name][1]
+            elif event_name.endswith('_exit__return'):
+                columns = PROBE_EXIT_COLUMNS
+            elif event_name.endswith('_entry'):
+                columns = PROBE_ENTRY_COLUMNS
+            else:
+                continue
+            perf_data_events[event_name] = convert_perf_data_samples(perf_data_reader, event_name, event_samples,
+                                                                     columns)
+        perf_data_reader.close()
+    except (OSError, perfdatareader.PerfDataError) as err:
+        print("Error: Dataimport of perf.data failed: {0}".format(err))
+        os.sys.exit()
+
+    imported_files = dict()
+    for event_name, (key, columns) in PERF_DATA_EVENTS.items():
+        if event_name in perf_data_events:
+            imported_files[key] = perf_data_events[event_name]
+        else:
+            imported_files[key] = parse_perf_dump(b'', columns)
+    imported_files['PERF_DATA_EVENTS'] = perf_data_events
+
+    return imported_files
+
 def import_probe_list(conf, probe_files):
     """
     Open probe.list file and function names to probe
@@ -281,54 +881,95 @@ def import_probe_list(conf, probe_files):
             os.sys.exit()
     return Probes
 
-def import_probe_tracing_data(perf_export_dir, probe_list):
+def import_probe_trace_data(perf_export_dir, filename_entry, filename_exit, window=None):
+    """
+    Open entry and exit dump file of a perf probe and import data
+    :param perf_export_dir: Path to files
+    :param filename_entry: name of entry dump file
+    :param filename_exit: name of exit dump file
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all
+    :return: pandas dataframe of entry and exit events sorted by timestamp
+    """
+    probe_entry_df = read_perf_dump(perf_export_dir, filename_entry, PROBE_ENTRY_COLUMNS, window)
+    probe_exit_df = read_perf_dump(perf_export_dir, filename_exit, PROBE_EXIT_COLUMNS, window)
+    unify_string_columns([probe_entry_df, probe_exit_df])
+
+    trace_data = pd.concat([probe_entry_df, probe_exit_df], ignore_index=True)
+    trace_data = trace_data.sort_values('timestamp', kind='mergesort')
+    return trace_data.reset_index(drop=True)
+
+def import_probe_tracing_data(perf_export_dir, probe_list, jobs=1, window=None, executor=None):
     """
     Open a file with tracing data of a perf probe and import data
     :param perf_export_dir: Path to file
-    :param filename: name of file
-    :return: pandas dataframe of events on success, otherwise -1
+    :param probe_list: List of probes, trace_data of each probe is set
+    :param jobs: Number of worker processes to import the probe files concurrently
+    :param window: (start, stop) timestamps in nanoseconds of the events to import, None for all
+    :param executor: Process pool to import the probe files on, None to create one for jobs > 1
     """
-    colnames_entry = ['task', 'tid', 'cpu', 'timestamp', 'event', 'address']
-    colnames_exit = ['task', 'tid', 'cpu', 'timestamp', 'event', 'address1', '-', 'address']
+    probe_files = []
+    for probe in probe_list:
+        filename_entry = "perf.data.probe_" + probe.executable + ":" + probe.probe_name + "_entry.dump"
+        filename_exit = "perf.data.probe_" + probe.executable + ":" + probe.probe_name + "_exit__return.dump"
+        probe_files.append((filename_entry, filename_exit))
+
+    own_executor = executor is None and jobs > 1 and len(probe_list) > 1
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=min(jobs, len(probe_list)))
     try:
-        for probe in probe_list:
-            filename_entry = "perf.data.probe_" + probe.executable + ":" + probe.probe_name + "_entry.dump"
-            filename_exit = "perf.data.probe_" + probe.executable + ":" + probe.probe_name + "_exit__return.dump"
-
-            probe_entry_df = pd.read_csv(perf_export_dir + filename_entry, index_col=False, names=colnames_entry,
-                                         header=None, delim_whitespace=True)
-            probe_exit_df = pd.read_csv(perf_export_dir + filename_exit, index_col=False, names=colnames_exit,
-                                        header=None, delim_whitespace=True)
-
-            del probe_exit_df['-'], probe_exit_df['address1']
-
-            probe_entry_df['tid'] = pd.to_numeric(probe_entry_df['tid'])
-            probe_entry_df['cpu'] = probe_entry_df['cpu'].map(lambda cpu: re.sub("[^0-9]", "", cpu))
-            probe_entry_df['cpu'] = pd.to_numeric(probe_entry_df['cpu'])
-            probe_entry_df['timestamp'] = probe_entry_df['timestamp'].map(
-                lambda timestamp: timestamp.replace(":", ""))
-            probe_entry_df['timestamp'] = pd.to_numeric(probe_entry_df['timestamp'])
-            probe_entry_df['event'] = probe_entry_df['event'].map(
-                lambda event: event.rstrip(':'))
-
-            probe.trace_data = probe.trace_data.append(probe_entry_df)
-
-            probe_exit_df['tid'] = pd.to_numeric(probe_exit_df['tid'])
-            probe_exit_df['cpu'] = probe_exit_df['cpu'].map(lambda cpu: re.sub("[^0-9]", "", cpu))
-            probe_exit_df['cpu'] = pd.to_numeric(probe_exit_df['cpu'])
-            probe_exit_df['timestamp'] = probe_exit_df['timestamp'].map(
-                lambda timestamp: timestamp.replace(":", ""))
-            probe_exit_df['timestamp'] = pd.to_numeric(probe_exit_df['timestamp'])
-            probe_exit_df['event'] = probe_exit_df['event'].map(
-                lambda event: event.rstrip(':'))
-
-            probe.trace_data = probe.trace_data.append(probe_exit_df)
-
-            probe.trace_data = probe.trace_data.sort_values('timestamp')
-            probe.trace_data = probe.trace_data.reset_index(drop=True)
+        if executor is not None and len(probe_list) > 1:
+            trace_data_list = list(executor.map(import_probe_trace_data, [perf_export_dir] * len(probe_files),
+                                                *zip(*probe_files), [window] * len(probe_files)))
+        else:
+            trace_data_list = [import_probe_trace_data(perf_export_dir, filename_entry, filename_exit, window)
+                               for filename_entry, filename_exit in probe_files]
     except OSError as err:
         print("OS error: {0}".format(err))
         os.sys.exit()
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    for probe, trace_data in zip(probe_list, trace_data_list):
+        probe.trace_data = trace_data
+
+def import_probe_tracing_data_from_perf_data(perf_data_events, probe_list):
+    """
+    Set trace data of perf probes from the tracepoints imported with import_perf_data
+    :param perf_data_events: Dictionary of event name: pandas dataframe of events
+    :param probe_list: List of probes, trace_data of each probe is set
+    """
+    for probe in probe_list:
+        event_entry = "probe_" + probe.executable + ":" + probe.probe_name + "_entry"
+        event_exit = "probe_" + probe.executable + ":" + probe.probe_name + "_exit__return"
+
+        probe_entry_df = perf_data_events.get(event_entry, parse_perf_dump(b'', PROBE_ENTRY_COLUMNS))
+        probe_exit_df = perf_data_events.get(event_exit, parse_perf_dump(b'', PROBE_EXIT_COLUMNS))
+        unify_string_columns([probe_entry_df, probe_exit_df])
+
+        trace_data = pd.concat([probe_entry_df, probe_exit_df], ignore_index=True)
+        trace_data = trace_data.sort_values('timestamp', kind='mergesort')
+        probe.trace_data = trace_data.reset_index(drop=True)
+
+def import_offline_probe_list_from_perf_data(perf_data_events):
+    """
+    Create new probe instances from the probe tracepoints imported with import_perf_data
+    :param perf_data_events: Dictionary of event name: pandas dataframe of events
+    :return: list of probes or empty list
+    """
+    Probes = []
+    for event_name in perf_data_events:
+        if not event_name.startswith('probe_'):
+            continue
+        executable, function_name = event_name[len('probe_'):].split(':', 1)
+        function_name = re.sub('_exit__return$', '', function_name)
+        function_name = re.sub('_entry$', '', function_name)
+
+        new_probe = Probe(executable, '', '', function_name, '')
+        new_probe.probe_name = function_name
+        if new_probe not in Probes:
+            Probes.append(new_probe)
+    return Probes
 
 def import_offline_probe_tracing_data(perf_import_dir, conf):
     """
@@ -362,7 +1003,7 @@ def import_offline_probe_tracing_data(perf_import_dir, conf):
     return Probes
 
 def export_console_output_txt(perf_import_dir, cpu_table, cpu_sleep_table, task_table, task_wakeup_table, time,
-                          trace_table = None, tracing_delta_table=None):
+                          trace_table = None, tracing_delta_table=None, analysis_tables=None):
     """
     Export output of console to text file
     :param perf_import_dir: Path to SampleData directory
@@ -373,6 +1014,7 @@ def export_console_output_txt(perf_import_dir, cpu_table, cpu_sleep_table, task_
     :param time: perfViewer start time
     :param trace_table: Table of probe traces
     :param tracing_delta_table: table of delta times
+    :param analysis_tables: Dictionary of title: table of additional analyses
     """
 
     cpu_table_txt = cpu_table.get_string()
@@ -395,6 +1037,10 @@ def export_console_output_txt(perf_import_dir, cpu_table, cpu_sleep_table, task_
         tracing_delta_table_txt = tracing_delta_table.get_string()
         table += "\n\n\n" + tracing_delta_table_txt
 
+    if analysis_tables is not None:
+        for analysis_table in analysis_tables.values():
+            table += "\n\n\n" + analysis_table.get_string()
+
     try:
         with open(perf_import_dir + "/Console_Output"+ time + ".txt", "w") as file:
             file.write(table)
@@ -404,7 +1050,7 @@ def export_console_output_txt(perf_import_dir, cpu_table, cpu_sleep_table, task_
 
 
 def export_console_output_csv(perf_import_dir, cpu_table, cpu_sleep_table, task_table, task_wakeup_table, time,
-                          trace_table = None, tracing_delta_table=None):
+                          trace_table = None, tracing_delta_table=None, analysis_tables=None):
     """
     Export output of console to csv file
     :param perf_import_dir: Path to SampleData directory
@@ -415,6 +1061,7 @@ def export_console_output_csv(perf_import_dir, cpu_table, cpu_sleep_table, task_
     :param time: perfViewer start time
     :param trace_table: Table of probe traces
     :param tracing_delta_table: table of delta times
+    :param analysis_tables: Dictionary of title: table of additional analyses
     """
 
     def table_to_csv(table_txt):
@@ -472,6 +1119,11 @@ def export_console_output_csv(perf_import_dir, cpu_table, cpu_sleep_table, task_
                 tracing_delta_table_csv = table_to_csv(tracing_delta_table_txt)
                 writer.writerows(tracing_delta_table_csv)
                 writer.writerows([''])
+
+            if analysis_tables is not None:
+                for analysis_table in analysis_tables.values():
+                    writer.writerows(table_to_csv(analysis_table.get_string()))
+                    writer.writerows([''])
     except OSError as err:
         print("OS error: {0}".format(err))
         os.sys.exit()
@@ -484,12 +1136,15 @@ def export_tracing_data_txt(scheduler_irq_tracing_files, perf_import_dir, time):
     :param time: time at perfviewer statup
     """
     probe_list = scheduler_irq_tracing_files["PROBE_LIST"]
-    runtime_string = "Tracing Data of each probe: [Timestamp_Entry, Timestamp_Exit, Delta] \n"
+    runtime_string = "Tracing Data of each probe: [Timestamp_Entry, Timestamp_Exit, Delta, Preempted] \n"
 
     for probe in probe_list:
         runtime_string += "\n" + probe.function + '\n'
-        for runtime in probe.function_runtimes:
-            runtime_string += str(runtime[0]) + "," + str(runtime[1]) + "," + str(runtime[2]) + "\n"
+        for runtime, preempted_time in zip(probe.function_runtimes, probe.function_preempted_times):
+            runtime_string += timestamps.format_timestamp(runtime[0]) + "," + \
+                              timestamps.format_timestamp(runtime[1]) + "," + \
+                              timestamps.format_timestamp(runtime[2]) + "," + \
+                              timestamps.format_timestamp(preempted_time) + "\n"
     try:
         with open(perf_import_dir + "/Tracing_Data" + time + ".txt", "w") as file:
             file.write(runtime_string)
@@ -507,12 +1162,13 @@ def export_tracing_data_csv(scheduler_irq_tracing_files, perf_import_dir, time):
     """
     probe_list = scheduler_irq_tracing_files["PROBE_LIST"]
     runtime_csv = []
-    runtime_csv.append(["Tracing Data of each probe: [Timestamp_Entry, Timestamp_Exit, Delta]"])
+    runtime_csv.append(["Tracing Data of each probe: [Timestamp_Entry, Timestamp_Exit, Delta, Preempted]"])
 
     for probe in probe_list:
         runtime_csv.append([probe.function])
-        for runtime in probe.function_runtimes:
-            runtime_csv.append([str(runtime[0]), str(runtime[1]), str(runtime[2])])
+        for runtime, preempted_time in zip(probe.function_runtimes, probe.function_preempted_times):
+            runtime_csv.append([timestamps.format_timestamp(runtime[0]), timestamps.format_timestamp(runtime[1]),
+                                timestamps.format_timestamp(runtime[2]), timestamps.format_timestamp(preempted_time)])
 
     try:
         with open(perf_import_dir + "/Tracing_Data" + time + ".csv", "w") as csvfile:
@@ -522,6 +1178,65 @@ def export_tracing_data_csv(scheduler_irq_tracing_files, perf_import_dir, time):
         print("OS error: {0}".format(err))
         os.sys.exit()
 
+def export_cpu_utilization_csv(cpu_list, bin_starts, utilization, perf_import_dir, time):
+    """
+    Export cpu utilization per bin to Utilization_Data_*.csv
+    :param cpu_list: List of CPUs
+    :param bin_starts: numpy array of bin starts in nanoseconds
+    :param utilization: numpy array CPUs x bins of utilization in percent
+    :param perf_import_dir: SampleDirectory path
+    :param time: time at perfviewer statup
+    """
+    utilization_csv = []
+    utilization_csv.append(["CPU utilization per bin: [Timestamp_Bin, " +
+                            ", ".join("CPU " + str(cpu.get_cpu_number()) + " [%]" for cpu in cpu_list) + "]"])
+    for bin_start, bin_utilization in zip(bin_starts.tolist(), np.round(utilization, 3).T.tolist()):
+        utilization_csv.append([timestamps.format_timestamp(bin_start)] + bin_utilization)
+
+    try:
+        with open(perf_import_dir + "/Utilization_Data" + time + ".csv", "w") as csvfile:
+            writer = csv.writer(csvfile, delimiter=';')
+            writer.writerows(utilization_csv)
+    except OSError as err:
+        print("OS error: {0}".format(err))
+        os.sys.exit()
+
+def export_latency_data_csv(latency_df, task_latencies, perf_import_dir, time):
+    """
+    Export scheduling latencies to Latency_Data_*.csv
+    :param latency_df: Dataframe of latencies (see latency.process_wakeup_latency)
+    :param task_latencies: List of [comm, pid, latency statistics] per task
+    :param perf_import_dir: SampleDirectory path
+    :param time: time at perfviewer statup
+    """
+    latency_csv = []
+    latency_csv.append(["Scheduling Latency of each wakeup: [Task, TID, Target CPU, CPU, Timestamp_Wakeup, "
+                        "Timestamp_Switch, Latency]"])
+    for comm, pid, target, cpu, wakeup, switch, latency in zip(
+            latency_df['comm'].tolist(), latency_df['pid'].tolist(), latency_df['target'].tolist(),
+            latency_df['cpu'].tolist(), latency_df['wakeup'].tolist(), latency_df['switch'].tolist(),
+            latency_df['latency'].tolist()):
+        latency_csv.append([comm, pid, target, cpu, timestamps.format_timestamp(wakeup),
+                            timestamps.format_timestamp(switch), timestamps.format_timestamp(latency)])
+
+    latency_csv.append([])
+    latency_csv.append(["Scheduling Latency histogram of each task: [Task, TID, Latency_From, Latency_To, Count]"])
+    for comm, pid, statistics in task_latencies:
+        buckets = np.flatnonzero(statistics.histogram)
+        lowest, highest = runtimestatistics.get_histogram_bucket_range(buckets)
+        for bucket_lowest, bucket_highest, count in zip(lowest.tolist(), highest.tolist(),
+                                                         statistics.histogram[buckets].tolist()):
+            latency_csv.append([comm, pid, timestamps.format_timestamp(bucket_lowest),
+                                timestamps.format_timestamp(bucket_highest), count])
+
+    try:
+        with open(perf_import_dir + "/Latency_Data" + time + ".csv", "w") as csvfile:
+            writer = csv.writer(csvfile, delimiter=';')
+            writer.writerows(latency_csv)
+    except OSError as err:
+        print("OS error: {0}".format(err))
+        os.sys.exit()
+
 def export_input_args(perf_import_dir, record_duration):
     """
     Export input args to input_args.txt Currently only recordduration is exported for offline usage.
@@ -7,11 +7,19 @@ Definition of data plot functions
 
 """
 
+import time
 import matplotlib.legend_handler
 import matplotlib.patches as mpatches
 import matplotlib.pyplot as plt
+import numpy as np
 from matplotlib.container import ErrorbarContainer
+from probe import PROBE_ENTRY_SUFFIX, PROBE_EXIT_SUFFIX, PROBE_RUNTIME_PERCENTILES, get_probe_event_mask
+from timelinelod import TimelineRenderer
+from timestamps import NS_PER_MS, NS_PER_SECOND, format_timestamp
 
+HOVER_INTERVAL = 0.05   # minimum time in seconds between two handled motion events
+HOVER_TOLERANCE = 5     # distance in pixels of the mouse to a task switch for the annotation
+CPU_COLORS = ['tab:red', 'tab:orange', 'tab:green', 'tab:blue']
 
 class re_order_errorbarHandler(matplotlib.legend_handler.HandlerErrorbar):
     """
@@ -37,17 +45,15 @@ def draw_cpu_plot(cpu_list):
     cpu_ylabels = []
     # Plot Scatter for CPU data
     cmap = plt.cm.RdYlGn
+    renderer = TimelineRenderer(ax)
     i = 0
 
     for cpu in cpu_list:
-        ax.broken_barh(cpu.get_cpu_runtime_tuple()[0], (10+i*10, 9), facecolors='tab:blue')
-
-        if cpu.get_cpu_number() == 0:
-            sc_list.append(plt.scatter(*zip(*cpu.get_task_switch_tuple(15)),
-                                       c='red', s=5, cmap=cmap, label='sched:switch'))
-        else:
-            sc_list.append(plt.scatter(*zip(*cpu.get_task_switch_tuple(25)),
-                                       c='red', s=5, cmap=cmap))
+        renderer.add_bars(cpu.get_cpu_runtime(), (10+i*10, 9), facecolors='tab:blue')
+
+        task_switch_times = cpu.get_task_switch_times()
+        sc_list.append(renderer.add_points(task_switch_times, np.full(len(task_switch_times), 15 + 10 * i),
+                                           c='red', s=5, cmap=cmap, label='sched:switch' if i == 0 else None))
         cpu_ylabels.append('CPU ' + str(cpu.get_cpu_number()))
         cpu_yticks.append(15 + 10 * i)
         i += 1
@@ -58,6 +64,7 @@ def draw_cpu_plot(cpu_list):
     ax.set_yticks(cpu_yticks)
     ax.set_yticklabels(cpu_ylabels)
     ax.grid(True)
+    renderer.connect()
 
     my_handler_map = {ErrorbarContainer: re_order_errorbarHandler(numpoints=2)}
 
@@ -83,45 +90,126 @@ def draw_cpu_plot(cpu_list):
             line.set_visible(not line.get_visible())
         fig.canvas.draw()
 
-    def hover(event):
+    last_hover = [0.0]
+    # The last motion event within HOVER_INTERVAL is handled by a single shot timer, so the annotation follows the
+    # position where the mouse stopped
+    pending_hover = [None]
+    hover_timer = fig.canvas.new_timer(interval=int(HOVER_INTERVAL * 1000))
+    hover_timer.single_shot = True
+
+    def find_hovered_task_switch(event):
         """
-        Adds scheduling events while hovering over plot data
+        Task switch next to the mouse, searched by bisection in the sorted switch times of the CPU row under the mouse
+        :return: (row, index of the task switch) or None
         """
-        vis = annot.get_visible()
-        if event.inaxes == ax:
-            for scatter in sc_list:
-                cont, ind = scatter.contains(event)
-                if cont:
-                    update_annot(ind, scatter)
-                    annot.set_visible(True)
-                    fig.canvas.draw_idle()
-                else:
-                    if vis:
-                        annot.set_visible(False)
-                        fig.canvas.draw_idle()
+        if event.inaxes != ax or event.xdata is None:
+            return None
+        row = int(round((event.ydata - 15) / 10))
+        if row < 0 or row >= len(cpu_list) or not sc_list[row].get_visible():
+            return None
+        # Tolerance of HOVER_TOLERANCE pixels in data coordinates
+        (x0, y0), (x1, y1) = ax.transData.inverted().transform([(event.x, event.y),
+                                                                (event.x + HOVER_TOLERANCE, event.y + HOVER_TOLERANCE)])
+        if abs(event.ydata - (15 + 10 * row)) > abs(y1 - y0):
+            return None
+        index = cpu_list[row].find_task_switch(round(event.xdata * NS_PER_SECOND), abs(x1 - x0) * NS_PER_SECOND)
+        return None if index is None else (row, index)
 
-    def update_annot(ind, sc):
+    def hover(event):
+        """
+        Adds scheduling events while hovering over plot data, motion events are handled at most every HOVER_INTERVAL
+        """
+        now = time.monotonic()
+        if now - last_hover[0] < HOVER_INTERVAL:
+            if pending_hover[0] is None:
+                hover_timer.start()
+            pending_hover[0] = event
+            return
+        last_hover[0] = now
+        pending_hover[0] = None
+        found = find_hovered_task_switch(event)
+        if found is not None:
+            update_annot(*found)
+            annot.set_visible(True)
+            fig.canvas.draw_idle()
+        elif annot.get_visible():
+            annot.set_visible(False)
+            fig.canvas.draw_idle()
+
+    def update_annot(row, index):
         """
         Updates annotation on plot
         """
-        pos = sc.get_offsets()[ind["ind"][0]]
-        annot.xy = pos
-
-        sc_index = sc_list.index(sc)
-        task_switch_element = cpu_list[sc_index].get_cpu_task_switching_text(pos[0])
+        task_switch_element = cpu_list[row].get_cpu_task_switching_text(index)
+        annot.xy = (task_switch_element[0] / NS_PER_SECOND, 15 + 10 * row)
         text = "Prev Task: {0}, {1}\nSched Task: {2}, {3}"\
-            .format(task_switch_element[0][1], task_switch_element[0][2],
-                    task_switch_element[0][3], task_switch_element[0][4])
+            .format(task_switch_element[1], task_switch_element[2], task_switch_element[3], task_switch_element[4])
         annot.set_text(text)
         annot.get_bbox_patch().set_facecolor('tab:gray')
         annot.get_bbox_patch().set_alpha(0.4)
 
+    def hover_pending():
+        """
+        Handles the motion event dropped last by hover
+        """
+        if pending_hover[0] is not None:
+            hover(pending_hover[0])
+
+    hover_timer.add_callback(hover_pending)
     fig.canvas.mpl_connect('pick_event', onpick)
     fig.canvas.mpl_connect("motion_notify_event", hover)
     plt.show()
 
 
-def draw_task_plot(tasks_list, probe_list=None):
+def draw_cpu_utilization_plot(cpu_list, bin_starts, utilization):
+    """
+    Draw cpu utilization per bin as heatmap and the mean utilization over all CPUs as line
+    :param cpu_list: List of CPUs
+    :param bin_starts: numpy array of bin starts in nanoseconds
+    :param utilization: numpy array CPUs x bins of utilization in percent
+    """
+    if len(bin_starts) == 0 or len(cpu_list) == 0:
+        return
+    fig, (heatmap_ax, line_ax) = plt.subplots(2, 1, sharex=True, num=3, gridspec_kw={'height_ratios': [3, 1]})
+    bin_size = (bin_starts[1] - bin_starts[0]) / NS_PER_SECOND if len(bin_starts) > 1 else 0
+    extent = (bin_starts[0] / NS_PER_SECOND, bin_starts[-1] / NS_PER_SECOND + bin_size, len(cpu_list) - 0.5, -0.5)
+    image = heatmap_ax.imshow(utilization, aspect='auto', interpolation='nearest', cmap='RdYlGn_r', vmin=0, vmax=100,
+                              extent=extent)
+    heatmap_ax.set_yticks(range(len(cpu_list)))
+    heatmap_ax.set_yticklabels(['CPU ' + str(cpu.get_cpu_number()) for cpu in cpu_list])
+    heatmap_ax.set_title('CPU Utilization per ' + str(round(bin_size * 1000, 3)) + ' ms')
+    fig.colorbar(image, ax=[heatmap_ax, line_ax], label='Usage [%]')
+
+    line_ax.plot(bin_starts / NS_PER_SECOND, utilization.mean(axis=0), color='tab:blue', linewidth=0.8)
+    line_ax.set_ylim(0, 100)
+    line_ax.set_ylabel('Mean [%]')
+    line_ax.set_xlabel('Time [s]')
+    line_ax.grid(True)
+
+def draw_probe_histogram_plot(probe_list):
+    """
+    Draw the logarithmic histogram of the function runtimes and the runtime percentiles of each probe
+    :param probe_list: List of probes with calculated tracepoint statistics
+    """
+    probes = [probe for probe in probe_list if len(probe.runtime_histogram[0]) > 0]
+    if len(probes) == 0:
+        return
+    fig, axes = plt.subplots(len(probes), 1, num=4, squeeze=False)
+    percentile_styles = ['--', '-.', ':']
+    for ax, probe in zip(axes[:, 0], probes):
+        counts, bin_edges = probe.runtime_histogram
+        ax.bar(bin_edges[:-1] / NS_PER_MS, counts, width=np.diff(bin_edges) / NS_PER_MS, align='edge', color='tab:blue')
+        for percentile, runtime, style in zip(PROBE_RUNTIME_PERCENTILES, probe.runtime_percentiles, percentile_styles):
+            ax.axvline(runtime / NS_PER_MS, color='tab:red', linestyle=style, linewidth=0.8,
+                       label='P' + str(percentile) + ': ' + str(round(runtime / NS_PER_MS, 3)) + ' ms')
+        ax.set_xscale('log')
+        ax.set_title(probe.function)
+        ax.set_ylabel('# Calls')
+        ax.grid(True)
+        ax.legend(loc='upper right')
+    axes[-1, 0].set_xlabel('Runtime [ms]')
+
+def draw_task_plot(tasks_list, probe_list=None, migrations_df=None):
     plt.figure(1)
     fig = plt.gcf()
     fig.canvas.set_window_title('perfViewer')
@@ -130,37 +218,49 @@ def draw_task_plot(tasks_list, probe_list=None):
     i = 0
     task_ylabels = []
     task_yticks = []
-    color_array = []
 
     red_patch = mpatches.Patch(color='red', label='CPU 0')
     orange_patch = mpatches.Patch(color='orange', label='CPU 1')
     green_patch = mpatches.Patch(color='green', label='CPU 2')
     blue_patch = mpatches.Patch(color='blue', label='CPU 3')
+    cpu_patches = [red_patch, orange_patch, green_patch, blue_patch]
+    highest_cpu = -1
 
     # Plot Scatter for CPU data
     sc_list = []
     cmap = plt.cm.RdYlGn
+    renderer = TimelineRenderer(ax)
 
     for task in tasks_list:
-        for x in task.get_cpu_to_runtime():
-            if x==0:
-                color_array.append('tab:red')
-                patches = [red_patch]
-            elif x==1:
-                color_array.append('tab:orange')
-                patches = [red_patch, orange_patch]
-            elif x==2:
-                color_array.append('tab:green')
-                patches = [red_patch, orange_patch, green_patch]
-            elif x==3:
-                color_array.append('tab:blue')
-                patches = [red_patch, orange_patch, green_patch, blue_patch]
-        ax.broken_barh(task.get_task_runtime()[0], (10 * i + 10, 9), facecolors=color_array)
+        # One row of bars per CPU, merged bars of the level of detail renderer have a single color
+        task_runtime = task.get_task_runtime()
+        for cpu in np.unique(task.get_cpu_to_runtime()):
+            renderer.add_bars(task_runtime[task_runtime['cpu'] == cpu], (10 * i + 10, 9),
+                              facecolors=CPU_COLORS[cpu % len(CPU_COLORS)])
+            highest_cpu = max(highest_cpu, int(cpu))
         task_ylabels.append(task.get_task_name())
         task_yticks.append(15 + 10 * i)
         i += 1
-
-    plt.legend(handles=patches)
+    patches = cpu_patches[:highest_cpu + 1]
+
+    if migrations_df is not None and len(migrations_df) > 0:
+        # Mark the migrations of each task on its row
+        migration_timestamps = migrations_df['timestamp'].to_numpy()
+        task_migrations = migrations_df.groupby(['comm', 'pid'], sort=False, observed=True).indices
+        migration_x = []
+        migration_y = []
+        for row, task in enumerate(tasks_list):
+            rows = task_migrations.get((task.get_task_name(), task.get_task_number()))
+            if rows is not None:
+                migration_x.append(migration_timestamps[rows])
+                migration_y.append(np.full(len(rows), 15 + row * 10))
+        if migration_x:
+            patches = patches + [renderer.add_points(np.concatenate(migration_x), np.concatenate(migration_y),
+                                                     c='black', marker='x', s=12, zorder=3,
+                                                     label='sched:migrate_task')]
+
+    # A fixed location, loc='best' tests every bar on each redraw
+    plt.legend(handles=patches, loc='upper right')
 
     ax.set_ylim(5, 15 + i * 10)
     ax.set_yticks(task_yticks)
@@ -175,31 +275,38 @@ def draw_task_plot(tasks_list, probe_list=None):
     annot.set_visible(False)
 
     if probe_list is not None:
-        probe_scatter_list = []
+        # Probe, trace data rows and their timestamps of the points of each scatter
+        scatter_traces = []
+        task_rows = {(task.name, task.get_task_number()): row for row, task in enumerate(tasks_list)}
         for probe in probe_list:
             if not probe.trace_data.empty:
-                # Get Task in which probe was running
-                probe_tasks = probe.trace_data['task']
-                probe_tasks_tid = probe.trace_data['tid']
-
-                probe_tasks_index = [tasks_list.index(task) for task_name, task_tid in zip(probe_tasks, probe_tasks_tid)
-                                     for task in tasks_list if task_name == task.name and task_tid == task.get_task_number()]
-
-                data = [(trace_data['timestamp'], trace_data['event'], 15 + task_index*10) for (trace_data_index, trace_data), task_index
-                        in zip(probe.trace_data.iterrows(), probe_tasks_index)]
-
-                if data != []:
-                    data_red = [(point[0], point[2])for point in data if 'entry' in point[1]]
-                    data_blue = [(point[0], point[2])for point in data if 'exit' in point[1]]
+                # Row of the task in which the probe was running, events of tasks without a row are not drawn
+                yvalues = np.full(len(probe.trace_data), -1, dtype=np.int64)
+                probe_tasks = probe.trace_data.groupby(['task', 'tid'], sort=False, observed=True).indices
+                for task_key, rows in probe_tasks.items():
+                    row = task_rows.get(task_key)
+                    if row is not None:
+                        yvalues[rows] = 15 + row * 10
+
+                if (yvalues >= 0).any():
+                    probe_timestamps = probe.trace_data['timestamp'].to_numpy(dtype=np.int64)
+                    entry_rows = np.flatnonzero((yvalues >= 0) &
+                                                get_probe_event_mask(probe.trace_data['event'], PROBE_ENTRY_SUFFIX))
+                    exit_rows = np.flatnonzero((yvalues >= 0) &
+                                               get_probe_event_mask(probe.trace_data['event'], PROBE_EXIT_SUFFIX))
 
                     if len(sc_list) > 0:
-                        sc_list.append(plt.scatter(*zip(*data_red), c='green', s=5, cmap=cmap))
-                        sc_list.append(plt.scatter(*zip(*data_blue), c='blue', s=5, cmap=cmap))
+                        sc_list.append(renderer.add_points(probe_timestamps[entry_rows], yvalues[entry_rows],
+                                                           c='green', s=5, cmap=cmap))
+                        sc_list.append(renderer.add_points(probe_timestamps[exit_rows], yvalues[exit_rows],
+                                                           c='blue', s=5, cmap=cmap))
                     else:
-                        sc_list.append(plt.scatter(*zip(*data_red), c='green', s=5, cmap=cmap, label='probe_tracepoint_entry'))
-                        sc_list.append(plt.scatter(*zip(*data_blue), c='blue', s=5, cmap=cmap, label='probe_tracepoint_exit'))
-                    probe_scatter_list.append(probe_list.index(probe))
-                    probe_scatter_list.append(probe_list.index(probe))
+                        sc_list.append(renderer.add_points(probe_timestamps[entry_rows], yvalues[entry_rows],
+                                                           c='green', s=5, cmap=cmap, label='probe_tracepoint_entry'))
+                        sc_list.append(renderer.add_points(probe_timestamps[exit_rows], yvalues[exit_rows],
+                                                           c='blue', s=5, cmap=cmap, label='probe_tracepoint_exit'))
+                    scatter_traces.append((probe, entry_rows, probe_timestamps[entry_rows]))
+                    scatter_traces.append((probe, exit_rows, probe_timestamps[exit_rows]))
 
         my_handler_map = {ErrorbarContainer: re_order_errorbarHandler(numpoints=2)}
         legend = ax.legend(loc='upper center', bbox_to_anchor=(0.5, -0.05),
@@ -241,16 +348,20 @@ def draw_task_plot(tasks_list, probe_list=None):
             pos = sc.get_offsets()[ind["ind"][0]]
             annot.xy = pos
 
-            sc_index = sc_list.index(sc)
-            probe = probe_list[probe_scatter_list[sc_index]]
-
-            selected_trace = [trace for (trace_index, trace) in probe.trace_data.iterrows()
-                              if trace['timestamp'] == pos[0]]
+            # Nearest event of the scatter by bisection, the trace data is sorted by timestamp at import
+            probe, rows, trace_timestamps = scatter_traces[sc_list.index(sc)]
+            point_time = round(pos[0] * NS_PER_SECOND)
+            index = int(np.searchsorted(trace_timestamps, point_time))
+            nearest = min([candidate for candidate in (index - 1, index) if 0 <= candidate < len(trace_timestamps)],
+                          key=lambda candidate: abs(int(trace_timestamps[candidate]) - point_time))
+            selected_trace = probe.trace_data.iloc[rows[nearest]]
             text = "Time: {0}, Event: {1}"\
-                .format(selected_trace[0]['timestamp'], selected_trace[0]['event'])
+                .format(format_timestamp(selected_trace['timestamp']), selected_trace['event'])
             annot.set_text(text)
             annot.get_bbox_patch().set_facecolor('tab:gray')
             annot.get_bbox_patch().set_alpha(0.4)
 
         fig.canvas.mpl_connect('pick_event', onpick)
         fig.canvas.mpl_connect("motion_notify_event", hover)
+
+    renderer.connect()
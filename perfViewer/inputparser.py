@@ -9,6 +9,8 @@ import argparse
 import os
 import shutil
 import datetime
+import re
+import timestamps
 
 
 def parse_args():
@@ -33,6 +35,14 @@ def parse_args():
     parser.add_argument("--overwrite", help="Overwrite data of ./SampleData directory", action="store_true")
     parser.add_argument("-e", "--executable", help="Specify path to executable. Default loaded from target", nargs='*',
                         type=str, action='store')
+    parser.add_argument("-j", "--jobs", help="Number of processes to import perf dump files and to calculate the task "
+                                             "runtime of the CPUs in parallel, default 1", type=int, default=1)
+    parser.add_argument("--stream", help="Read perf dump files in chunks instead of importing them completely to "
+                                         "limit the memory usage on large records", action="store_true")
+    parser.add_argument("--from", help="Analyze only events at or after this perf timestamp in seconds, "
+                                       "ex. 1630.25", dest="window_start", type=str)
+    parser.add_argument("--to", help="Analyze only events up to this perf timestamp in seconds, ex. 1630.75",
+                        dest="window_stop", type=str)
 
     args = parser.parse_args()
 
@@ -44,6 +54,21 @@ def parse_args():
         parser.error("Offline usage requires specification of offline folder. Ex.: --offline ../SampleData_2020-03-18_10:43:25")
     elif args.executable == []:
         parser.error("-e, --executable require explicit executable names")
+    elif args.jobs < 1:
+        parser.error("-j, --jobs requires at least one process")
+
+    # Time window in nanoseconds, None for an open end
+    window = []
+    for option, value in (("--from", args.window_start), ("--to", args.window_stop)):
+        if value is None:
+            window.append(None)
+        elif re.fullmatch(r'\d+(\.\d+)?', value.strip()):
+            window.append(timestamps.parse_timestamp(value))
+        else:
+            parser.error(option + " requires a perf timestamp in seconds. Ex.: " + option + " 1630.25")
+    if None not in window and window[0] > window[1]:
+        parser.error("--from must not be later than --to")
+    args.time_window = None if window == [None, None] else tuple(window)
 
     if args.executable is not None and args.executable !=[]:
         for file in args.executable:
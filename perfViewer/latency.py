@@ -0,0 +1,90 @@
+"""
+perfViewer
+Module: latency
+Responsible: Brandtner Philipp
+Description:
+Scheduling latency of tasks, the time from the sched_wakeup of a tid to the following sched_switch with
+next_pid == tid. Wakeups and switch-ins are joined per tid with pandas merge_asof, chunk by chunk in stream mode.
+
+"""
+
+import numpy as np
+import pandas as pd
+from runtimestatistics import RuntimeStatistics
+
+def process_wakeup_latency(sched_wakeup_df, sched_switch_df):
+    """
+    Join each sched_wakeup with the next switch-in of the woken tid. Repeated wakeups of a tid before it is switched
+    in are joined with the same switch-in, only the first of them is kept.
+    :param sched_wakeup_df: Dataframe of sched_wakeup events
+    :param sched_switch_df: Dataframe of sched_switch events
+    :return: Dataframe comm, pid, target, cpu, wakeup, switch, latency sorted by wakeup. target is the target cpu of
+             the wakeup, cpu the cpu of the switch-in, timestamps and latency in nanoseconds.
+    """
+    return process_wakeup_latency_chunks([(sched_wakeup_df, sched_switch_df)])
+
+def process_wakeup_latency_chunks(event_chunks):
+    """
+    Join each sched_wakeup with the next switch-in of the woken tid chunk by chunk, see process_wakeup_latency.
+    Wakeups without a switch-in in their chunk are carried over to the next chunk. The comm of the carried wakeups is
+    kept as code, the string table of the chunks only grows.
+    :param event_chunks: Iterable of (dataframe of sched_wakeup events, dataframe of sched_switch events), sorted by
+                         timestamp over the chunks
+    :return: Dataframe comm, pid, target, cpu, wakeup, switch, latency sorted by wakeup
+    """
+    pending = None
+    joined_chunks = []
+    comm_categories = None
+    sequence = 0
+    for sched_wakeup_df, sched_switch_df in event_chunks:
+        comm_categories = sched_wakeup_df['comm'].cat.categories
+        wakeups = pd.DataFrame({'comm': sched_wakeup_df['comm'].cat.codes.to_numpy(),
+                                'pid': sched_wakeup_df['pid'].to_numpy(dtype=np.int64),
+                                'target': sched_wakeup_df['target'].to_numpy(),
+                                'wakeup': sched_wakeup_df['timestamp'].to_numpy(),
+                                'sequence': np.arange(sequence, sequence + len(sched_wakeup_df))})
+        sequence += len(sched_wakeup_df)
+        wakeups = wakeups.sort_values('wakeup', kind='mergesort', ignore_index=True)
+        if pending is not None:
+            wakeups = pd.concat([pending, wakeups], ignore_index=True)
+        switch_ins = pd.DataFrame({'pid': sched_switch_df['next_pid'].to_numpy(dtype=np.int64),
+                                   'switch': sched_switch_df['timestamp'].to_numpy(),
+                                   'cpu': sched_switch_df['cpu'].to_numpy(),
+                                   'switch_row': np.arange(len(sched_switch_df))})
+        switch_ins = switch_ins.sort_values('switch', kind='mergesort', ignore_index=True)
+
+        joined = pd.merge_asof(wakeups, switch_ins, left_on='wakeup', right_on='switch', by='pid',
+                               direction='forward', allow_exact_matches=True)
+        unjoined = joined['switch_row'].isna()
+        pending = wakeups[unjoined.to_numpy()]
+        joined = joined[~unjoined]
+        joined_chunks.append(joined.drop_duplicates(subset='switch_row', keep='first'))
+
+    joined = pd.concat(joined_chunks, ignore_index=True)
+    # Carried wakeups are joined in a later chunk than the wakeups after them
+    joined = joined.iloc[np.lexsort((joined['sequence'].to_numpy(), joined['wakeup'].to_numpy()))]
+    latency_df = pd.DataFrame({'comm': pd.Categorical.from_codes(joined['comm'].to_numpy(),
+                                                                 categories=comm_categories),
+                               'pid': joined['pid'].to_numpy(dtype=np.int32),
+                               'target': joined['target'].to_numpy(),
+                               'cpu': joined['cpu'].to_numpy(dtype=switch_ins['cpu'].dtype),
+                               'wakeup': joined['wakeup'].to_numpy(),
+                               'switch': joined['switch'].to_numpy(dtype=np.int64)})
+    latency_df['latency'] = latency_df['switch'] - latency_df['wakeup']
+    return latency_df
+
+def get_task_latency_statistics(latency_df):
+    """
+    Latency statistics per task
+    :param latency_df: Dataframe of process_wakeup_latency
+    :return: List of [comm, pid, RuntimeStatistics of the latencies], sorted by maximum latency
+    """
+    latencies = latency_df['latency'].to_numpy()
+    task_latencies = []
+    groups = latency_df.groupby(['comm', 'pid'], sort=False, observed=True).indices
+    for (comm, pid), rows in groups.items():
+        statistics = RuntimeStatistics()
+        statistics.add_durations(latencies[rows])
+        task_latencies.append([comm, int(pid), statistics])
+    task_latencies.sort(key=lambda x: x[2].maximum, reverse=True)
+    return task_latencies
@@ -5,9 +5,16 @@ Responsible: Brandtner Philipp
 Description: Processes task, cpu and probe list and extracts tables
 """
 
+import numpy as np
 import prettytable
 import task
 import cpu
+import dataimporterexporter
+import latency
+import migration
+from probe import PROBE_RUNTIME_PERCENTILES
+from registry import Registry
+from timestamps import NS_PER_MS, NS_PER_SECOND
 
 def create_tracing_list_and_table(scheduler_irq_tracing_files):
     """
@@ -18,34 +25,68 @@ def create_tracing_list_and_table(scheduler_irq_tracing_files):
     :return: PrettyTable of Tracing Data
     """
     probe_list = scheduler_irq_tracing_files["PROBE_LIST"]
-    sched_switch_df = scheduler_irq_tracing_files["SCHED_SWITCH_DF"]
-    irq_handler_entry_df = scheduler_irq_tracing_files["IRQ_HANDLER_ENTRY_DF"]
 
     probe_tracepoint_table = prettytable.PrettyTable(
-        ['Num', 'Probe', '# Calls', 'Min [ms]', 'Max [ms]', 'Median [ms]',
-         '# CSW', 'CSW: [count]', 'CSW @ Max:[count]', 'CSW @ Min:[count]',
+        ['Num', 'Probe', '# Calls', 'Min [ms]', 'Max [ms]', 'Median [ms]', 'Average [ms]', 'Std Dev [ms]',
+         *['P' + str(percentile) + ' [ms]' for percentile in PROBE_RUNTIME_PERCENTILES], 'Jitter [ms]',
+         '# CSW', 'CSW: [count]', 'CSW @ Max:[count]', 'CSW @ Min:[count]', 'Preempted @ Max [ms]',
          '# IRQ', 'IRQ: [count]', 'IRQ @ Max:[count]', 'IRQ @ Min:[count]'])
 
     for probe in probe_list:
         probe.calculate_function_runtimes()
         probe.calculate_tracepoint_statistics()
+    sched_switch_df, irq_handler_entry_df = get_probe_collision_events(scheduler_irq_tracing_files, probe_list)
+    for probe in probe_list:
         probe.evaluate_contextswitch_irq_collisions(sched_switch_df, irq_handler_entry_df)
         probe_table_entry = probe.get_probe_table_entry()
         probe_table_entry.insert(0, str(probe_list.index(probe)))
         probe_tracepoint_table.add_row(probe_table_entry)
     return probe_list, probe_tracepoint_table
 
-def create_task_list_and_table(scheduler_irq_tracing_files, ssh_scp_commander, tid_pid_mapping):
+def get_probe_collision_events(scheduler_irq_tracing_files, probe_list):
+    """
+    sched_switch and irq_handler_entry events which may collide with the function runtimes of the probes, the
+    switches of the probed threads and the interrupts during the function runtimes. In stream mode only these events
+    are kept of the chunks.
+    :param scheduler_irq_tracing_files: Dictionary of input files
+    :param probe_list: List of probes with calculated function runtimes
+    :return: Dataframe of sched_switch events, dataframe of irq_handler_entry events
+    """
+    tids = np.concatenate([np.empty(0, dtype=np.int64)] + [probe.function_tids for probe in probe_list])
+    runtimes = np.concatenate([np.empty((0, 3), dtype=np.int64)] + [probe.function_runtimes for probe in probe_list])
+    runtimes = runtimes[np.argsort(runtimes[:, 0], kind='stable')]
+    # Latest stop of the function runtimes started up to each start
+    stops = np.maximum.accumulate(runtimes[:, 1])
+
+    switch_chunks, irq_chunks = [], []
+    for event_chunks in dataimporterexporter.get_event_chunks(scheduler_irq_tracing_files,
+                                                              ['SCHED_SWITCH_DF', 'IRQ_HANDLER_ENTRY_DF']):
+        sched_switch_df = event_chunks['SCHED_SWITCH_DF']
+        switch_chunks.append(sched_switch_df[np.isin(sched_switch_df['prev_pid'].to_numpy(), tids) |
+                                             np.isin(sched_switch_df['next_pid'].to_numpy(), tids)])
+        irq_handler_entry_df = event_chunks['IRQ_HANDLER_ENTRY_DF']
+        irq_timestamps = irq_handler_entry_df['timestamp'].to_numpy()
+        runtime_index = np.searchsorted(runtimes[:, 0], irq_timestamps, side='right') - 1
+        irq_chunks.append(irq_handler_entry_df[(runtime_index >= 0) & (np.append(stops, 0)[runtime_index] >=
+                                                                       irq_timestamps)])
+    return dataimporterexporter.concat_event_chunks(switch_chunks), \
+        dataimporterexporter.concat_event_chunks(irq_chunks)
+
+def create_task_list_and_table(scheduler_irq_tracing_files, ssh_scp_commander, tid_pid_mapping, jobs=1,
+                               executor=None):
     """
     Create Task Runtime Table, Task Wakeup Table
     :param scheduler_irq_tracing_files: Dictonary of input files
     :param ssh_scp_commander: Instance of ssh_scp_commander to receive tid_pid_mapping
     :param tid_pid_mapping: tid_pid data for offline processing
+    :param jobs: Number of processes to calculate the task runtime of the CPUs in parallel
+    :param executor: Process pool with jobs workers, None to create one for jobs > 1
     :return: Task Runtime List, Task Runtime Table, Task Wakeup Table
     """
-    sched_wakeup_df = scheduler_irq_tracing_files["SCHED_WAKEUP_DF"]
-    tasks_list = task.process_task_runtime(scheduler_irq_tracing_files)
-    tasks_list = task.process_sched_wakeup_list_for_tasks(sched_wakeup_df, tasks_list)
+    task_registry = Registry(task.Task)
+    task.process_task_runtime(scheduler_irq_tracing_files, task_registry, jobs, executor)
+    for event_chunks in dataimporterexporter.get_event_chunks(scheduler_irq_tracing_files, ['SCHED_WAKEUP_DF']):
+        tasks_list = task.process_sched_wakeup_list_for_tasks(event_chunks['SCHED_WAKEUP_DF'], task_registry)
 
     if tid_pid_mapping is None:
         tasks_list = task.get_pid_from_target(tasks_list, ssh_scp_commander)
@@ -62,7 +103,8 @@ def create_task_list_and_table(scheduler_irq_tracing_files, ssh_scp_commander, t
 
     task_table = prettytable.PrettyTable(['Task', 'TID', 'PID', 'Total Runtime [ms]',
                                           'Minimum Runtime [ms]', 'Maximum Runtime [ms]',
-                                          'Average Runtime [ms]'])
+                                          'Average Runtime [ms]', 'Median Runtime [ms]', 'P99 Runtime [ms]',
+                                          'P99.9 Runtime [ms]'])
     for _task in tasks_list:
         task_table_entry = _task.get_task_table_entry()
         if task_table_entry[3] != '-':
@@ -73,16 +115,18 @@ def create_task_list_and_table(scheduler_irq_tracing_files, ssh_scp_commander, t
 def create_cpu_list_and_table(record_duration, scheduler_irq_tracing_files, task_list):
     """
     Create CPU Runtime Table, CPU Wakeup Table
-    :param record_duration: Record duration of perf dump
+    :param record_duration: Record duration of perf dump in seconds
     :param scheduler_irq_tracing_files: Dictionary of input files
     :param task_list: List of Tasks
-    :return: CPU List, CPU Runtime Table, CPU Idle Table (only if power:cpu_idle files are available)
+    :return: CPU List, CPU Runtime Table, CPU Idle Table and CPU Idle Residency Table (only if power:cpu_idle files
+             are available)
     """
-    sched_switch_df = scheduler_irq_tracing_files["SCHED_SWITCH_DF"]
-    cpu_idle_df = scheduler_irq_tracing_files["CPU_IDLE_DF"]
+    record_duration = round(float(record_duration) * NS_PER_SECOND)
 
-    cpu_list = []
-    cpu_list = cpu.process_sched_switch_list(cpu_list, task_list, sched_switch_df)
+    cpu_list = cpu.process_sched_switch_list(
+        Registry(cpu.CPU), task_list,
+        (event_chunks['SCHED_SWITCH_DF'] for event_chunks in
+         dataimporterexporter.get_event_chunks(scheduler_irq_tracing_files, ['SCHED_SWITCH_DF'])))
 
     # Sort Tasks with Total_Runtime as Attribute
     cpu_list.sort(key=lambda x: x.number, reverse=False)
@@ -93,20 +137,148 @@ def create_cpu_list_and_table(record_duration, scheduler_irq_tracing_files, task
         CPU.set_sleeptime_and_percentage(record_duration)
         cpu_table.add_row(CPU.get_cpu_table_entry())
 
-    if len(cpu_idle_df) > 0:
-        cpu_idle_state = cpu.process_cpu_idle_list(cpu_idle_df, record_duration)
-        # Create CPU Idle Table
-        cpu_idle_table = prettytable.PrettyTable(['CPU', 'busy-idle [ms]', 'sleep state [ms]', '% in busy-idle',
-                                                  '% in sleep state', '% in idle-busy and sleep-state'])
-        for lines in cpu_idle_state:
-            cpu_idle_table.add_row(lines)
-    else:
-        cpu_idle_table = None
+    cpu_idle_table, cpu_idle_residency_table = create_cpu_idle_tables(
+        record_duration, (event_chunks['CPU_IDLE_DF'] for event_chunks in
+                          dataimporterexporter.get_event_chunks(scheduler_irq_tracing_files, ['CPU_IDLE_DF'])))
+
+    return cpu_list, cpu_table, cpu_idle_table, cpu_idle_residency_table
+
+def create_cpu_idle_tables(record_duration, cpu_idle_chunks):
+    """
+    Create CPU Idle Table and CPU Idle Residency Table for all idle states of power:cpu_idle
+    :param record_duration: Record duration in nanoseconds
+    :param cpu_idle_chunks: Iterable of pandas dataframes of power:cpu_idle, sorted by timestamp over the chunks
+    :return: CPU Idle Table (time per CPU and idle state), CPU Idle Residency Table (entries and residency
+             distribution per CPU and idle state), None and None without power:cpu_idle events
+    """
+    entries, residency, statistics = cpu.get_cpu_idle_residency(cpu_idle_chunks)
+    if len(entries) == 0:
+        return None, None
+    states = range(residency.shape[1])
+
+    cpu_idle_table = prettytable.PrettyTable(['CPU'] + ['State ' + str(state) + ' [ms]' for state in states] +
+                                             ['% in State ' + str(state) for state in states] +
+                                             ['% in idle states'])
+    for cpu_number, cpu_residency in enumerate(residency.tolist()):
+        cpu_idle_table.add_row([cpu_number] + [round(state_residency / NS_PER_MS, 3)
+                                               for state_residency in cpu_residency] +
+                               [round(100 * state_residency / record_duration, 3)
+                                for state_residency in cpu_residency] +
+                               [round(100 * sum(cpu_residency) / record_duration, 3)])
+
+    cpu_idle_residency_table = prettytable.PrettyTable(['CPU', 'State', '# Entries', 'Min [ms]', 'Median [ms]',
+                                                        'P99 [ms]', 'Max [ms]'])
+    for (cpu_number, state), state_statistics in sorted(statistics.items()):
+        cpu_idle_residency_table.add_row([cpu_number, state, int(entries[cpu_number, state]),
+                                          round(state_statistics.minimum / NS_PER_MS, 3),
+                                          round(state_statistics.get_quantile(0.5) / NS_PER_MS, 3),
+                                          round(state_statistics.get_quantile(0.99) / NS_PER_MS, 3),
+                                          round(state_statistics.maximum / NS_PER_MS, 3)])
+
+    return cpu_idle_table, cpu_idle_residency_table
+
+def create_cpu_utilization_list_and_table(record_duration, cpu_list, bin_size_ms, peak_window_ms):
+    """
+    Create CPU utilization per bin and CPU Utilization Peak Table with the busiest window of each CPU
+    :param record_duration: Record duration of perf dump in seconds
+    :param cpu_list: List of CPUs
+    :param bin_size_ms: Size of the bins in milliseconds
+    :param peak_window_ms: Length of the busiest window in milliseconds
+    :return: numpy array of bin starts in nanoseconds, numpy array CPUs x bins of utilization in percent,
+             CPU Utilization Peak Table
+    """
+    record_duration = round(float(record_duration) * NS_PER_SECOND)
+    bin_size = max(round(bin_size_ms * NS_PER_MS), 1)
+    slice_starts = [int(_cpu.get_cpu_runtime()['start'].min()) for _cpu in cpu_list if len(_cpu.get_cpu_runtime())]
+    start = min(slice_starts) if slice_starts else 0
+    bin_starts = np.arange(start, start + record_duration, bin_size, dtype=np.int64)
+    utilization = np.array([_cpu.get_cpu_utilization(start, start + record_duration, bin_size) * 100
+                            for _cpu in cpu_list]).reshape(len(cpu_list), len(bin_starts))
 
-    return cpu_list, cpu_table, cpu_idle_table
+    peak_window_bins = max(round(peak_window_ms * NS_PER_MS / bin_size), 1)
+    utilization_table = prettytable.PrettyTable(['CPU', 'Mean Usage [%]', 'Peak Window Start [s]',
+                                                 'Peak ' + str(peak_window_ms) + ' ms Usage [%]'])
+    for _cpu, cpu_utilization in zip(cpu_list, utilization):
+        peak_bin, peak_utilization = cpu.get_peak_window(cpu_utilization, peak_window_bins)
+        utilization_table.add_row([_cpu.get_cpu_number(),
+                                   round(float(cpu_utilization.mean()), 3) if len(cpu_utilization) else 0,
+                                   round(int(bin_starts[peak_bin]) / NS_PER_SECOND, 3) if len(bin_starts) else '-',
+                                   round(peak_utilization, 3)])
 
-def print_table(record_duration, task_table, task_wakeup_table, cpu_table, cpu_idle_table=None, tracing_table=None):
-    """ Print task, task_wakeup, cpu and tracing table """
+    return bin_starts, utilization, utilization_table
+
+def create_latency_list_and_table(scheduler_irq_tracing_files):
+    """
+    Create Scheduling Latency Table, latency from sched_wakeup to the switch-in of the task
+    :param scheduler_irq_tracing_files: Dictionary of input files
+    :return: Dataframe of latencies, list of [comm, pid, latency statistics] per task, Scheduling Latency Table
+    """
+    latency_df = latency.process_wakeup_latency_chunks(
+        (event_chunks['SCHED_WAKEUP_DF'], event_chunks['SCHED_SWITCH_DF']) for event_chunks in
+        dataimporterexporter.get_event_chunks(scheduler_irq_tracing_files, ['SCHED_WAKEUP_DF', 'SCHED_SWITCH_DF']))
+    task_latencies = latency.get_task_latency_statistics(latency_df)
+
+    latency_table = prettytable.PrettyTable(['Task', 'TID', '# Wakeups', 'Min [ms]', 'Average [ms]', 'Median [ms]',
+                                             'P99 [ms]', 'Max [ms]'])
+    for comm, pid, statistics in task_latencies:
+        latency_table.add_row([comm, pid, statistics.count, round(statistics.minimum / NS_PER_MS, 3),
+                               round(statistics.total / statistics.count / NS_PER_MS, 3),
+                               round(statistics.get_quantile(0.5) / NS_PER_MS, 3),
+                               round(statistics.get_quantile(0.99) / NS_PER_MS, 3),
+                               round(statistics.maximum / NS_PER_MS, 3)])
+
+    return latency_df, task_latencies, latency_table
+
+def create_migration_list_and_table(record_duration, scheduler_irq_tracing_files):
+    """
+    Create Task Migration Table, CPU Migration Matrix Table and Migration Rate Table from sched_migrate_task
+    :param record_duration: Record duration of perf dump in seconds
+    :param scheduler_irq_tracing_files: Dictionary of input files
+    :return: Dataframe of migrations, Task Migration Table, CPU Migration Matrix Table, Migration Rate Table
+    """
+    migration_chunks = []
+    switch_start = None
+    for event_chunks in dataimporterexporter.get_event_chunks(scheduler_irq_tracing_files,
+                                                              ['SCHED_MIGRATE_DF', 'SCHED_SWITCH_DF']):
+        migration_chunks.append(migration.get_migrations(event_chunks['SCHED_MIGRATE_DF']))
+        if len(event_chunks['SCHED_SWITCH_DF']) > 0:
+            chunk_start = int(event_chunks['SCHED_SWITCH_DF']['timestamp'].min())
+            switch_start = chunk_start if switch_start is None else min(switch_start, chunk_start)
+    migrations_df = dataimporterexporter.concat_event_chunks(migration_chunks)
+    record_duration = round(float(record_duration) * NS_PER_SECOND)
+
+    task_migration_table = prettytable.PrettyTable(['Task', 'TID', 'Migrations', 'Migrations/s'])
+    for comm, pid, count in migration.get_task_migrations(migrations_df):
+        task_migration_table.add_row([comm, pid, count, round(count * NS_PER_SECOND / record_duration, 3)])
+
+    migration_matrix = migration.get_migration_matrix(migrations_df)
+    migration_matrix_table = prettytable.PrettyTable(['From \\ To'] +
+                                                     ['CPU ' + str(cpu) for cpu in range(len(migration_matrix))] +
+                                                     ['Total'])
+    for cpu_number, row in enumerate(migration_matrix.tolist()):
+        migration_matrix_table.add_row(['CPU ' + str(cpu_number)] + row + [sum(row)])
+
+    migration_rate_table = prettytable.PrettyTable(['Interval Start [s]', 'Migrations', 'Migrations/s'])
+    if len(migrations_df) > 0:
+        # Intervals start at the first sched_switch or migration of the record
+        start = int(migrations_df['timestamp'].min())
+        if switch_start is not None:
+            start = min(start, switch_start)
+        interval_starts, migration_counts = migration.get_migration_rate(migrations_df, start,
+                                                                         start + record_duration)
+        interval_duration = record_duration / len(interval_starts)
+        for interval_start, count in zip(interval_starts.tolist(), migration_counts.tolist()):
+            migration_rate_table.add_row([round(interval_start / NS_PER_SECOND, 3), count,
+                                          round(count * NS_PER_SECOND / interval_duration, 3)])
+
+    return migrations_df, task_migration_table, migration_matrix_table, migration_rate_table
+
+def print_table(record_duration, task_table, task_wakeup_table, cpu_table, cpu_idle_table=None, tracing_table=None,
+                analysis_tables=None):
+    """
+    Print task, task_wakeup, cpu and tracing table
+    :param analysis_tables: Dictionary of title: table of additional analyses, printed after the other tables
+    """
     print("\n")
     print("Record Duration: " + str(record_duration))
     print("\n")
@@ -126,6 +298,11 @@ def print_table(record_duration, task_table, task_wakeup_table, cpu_table, cpu_i
         print("\n")
         print("Function Tracing Information:")
         print(tracing_table)
+    if analysis_tables is not None:
+        for title, table in analysis_tables.items():
+            print("\n")
+            print(title + ":")
+            print(table)
 
 def print_delta_table(tracing_delta_table=None):
     """ Print tracing delta table """
@@ -0,0 +1,59 @@
+"""
+perfViewer
+Module: migration
+Responsible: Brandtner Philipp
+Description:
+Task migrations between CPUs from sched:sched_migrate_task: migrations per task, CPU to CPU migration matrix and
+migration rate over time.
+
+"""
+
+import numpy as np
+
+MIGRATION_RATE_INTERVALS = 10   # number of intervals of the record for the migration rate over time
+
+def get_migrations(sched_migrate_df):
+    """
+    Migrations to another CPU, sched_migrate_task events with orig_cpu == dest_cpu are dropped
+    :param sched_migrate_df: Dataframe of sched_migrate_task events
+    :return: Dataframe of migrations
+    """
+    return sched_migrate_df[sched_migrate_df['orig_cpu'] != sched_migrate_df['dest_cpu']]
+
+def get_task_migrations(migrations_df):
+    """
+    Number of migrations per task
+    :param migrations_df: Dataframe of migrations (see get_migrations)
+    :return: List of [comm, pid, number of migrations], sorted by number of migrations
+    """
+    counts = migrations_df.groupby(['comm', 'pid'], sort=False, observed=True).size()
+    counts = counts.sort_values(ascending=False, kind='mergesort')
+    return [[comm, int(pid), int(count)] for (comm, pid), count in counts.items()]
+
+def get_migration_matrix(migrations_df, num_cpus=None):
+    """
+    Number of migrations from CPU (rows) to CPU (columns)
+    :param migrations_df: Dataframe of migrations (see get_migrations)
+    :param num_cpus: Number of CPUs, default the highest CPU of the migrations + 1
+    :return: numpy array num_cpus x num_cpus
+    """
+    orig_cpus = migrations_df['orig_cpu'].to_numpy(dtype=np.int64)
+    dest_cpus = migrations_df['dest_cpu'].to_numpy(dtype=np.int64)
+    if num_cpus is None:
+        num_cpus = int(max(orig_cpus.max(initial=-1), dest_cpus.max(initial=-1))) + 1
+    return np.bincount(orig_cpus * num_cpus + dest_cpus, minlength=num_cpus * num_cpus).reshape(num_cpus, num_cpus)
+
+def get_migration_rate(migrations_df, start, stop, intervals=MIGRATION_RATE_INTERVALS):
+    """
+    Number of migrations per interval
+    :param migrations_df: Dataframe of migrations (see get_migrations)
+    :param start: Start of the first interval in nanoseconds
+    :param stop: End of the last interval in nanoseconds
+    :param intervals: Number of intervals between start and stop
+    :return: numpy arrays of interval starts in nanoseconds and migrations per interval
+    """
+    interval_starts = start + (np.arange(intervals, dtype=np.int64) * (stop - start)) // intervals
+    timestamps = migrations_df['timestamp'].to_numpy()
+    timestamps = timestamps[(timestamps >= start) & (timestamps <= stop)]
+    interval_indices = np.searchsorted(interval_starts, timestamps, side='right') - 1
+    return interval_starts, np.bincount(interval_indices, minlength=intervals)
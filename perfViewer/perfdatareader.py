@@ -0,0 +1,334 @@
+"""
+perfViewer
+Module: perfdatareader
+Responsible: Brandtner Philipp
+Description:
+Decodes tracepoint samples of a perf.data file (perf record) directly into numpy arrays, without the
+'perf script --per-event-dump' text round-trip. Used parts of the file:
+    - file header and event attributes (perf_event_attr, sample ids)
+    - HEADER_TRACING_DATA feature with the tracepoint format descriptions
+    - PERF_RECORD_COMM records for task names
+    - PERF_RECORD_SAMPLE records with PERF_SAMPLE_RAW tracepoint data
+
+"""
+
+import mmap
+import re
+import struct
+import numpy as np
+
+PERF_FILE_MAGIC = b'PERFILE2'
+
+PERF_TYPE_TRACEPOINT = 2
+
+PERF_RECORD_COMM = 3
+PERF_RECORD_SAMPLE = 9
+PERF_RECORD_COMPRESSED = 81
+
+PERF_SAMPLE_IP = 1 << 0
+PERF_SAMPLE_TID = 1 << 1
+PERF_SAMPLE_TIME = 1 << 2
+PERF_SAMPLE_ADDR = 1 << 3
+PERF_SAMPLE_READ = 1 << 4
+PERF_SAMPLE_CALLCHAIN = 1 << 5
+PERF_SAMPLE_ID = 1 << 6
+PERF_SAMPLE_CPU = 1 << 7
+PERF_SAMPLE_PERIOD = 1 << 8
+PERF_SAMPLE_STREAM_ID = 1 << 9
+PERF_SAMPLE_RAW = 1 << 10
+PERF_SAMPLE_IDENTIFIER = 1 << 16
+
+HEADER_TRACING_DATA = 1
+
+TRACING_DATA_MAGIC = b'\x17\x08Dtracing'
+
+
+class PerfDataError(Exception):
+    """ Raised if a perf.data file can't be decoded by the PerfDataReader """
+
+
+def parse_tracepoint_format(format_text):
+    """
+    Parse the format description of a tracepoint (/sys/kernel/tracing/events/<system>/<event>/format)
+    :param format_text: Content of the format description
+    :return: name, id and list of fields (name, offset, size, signed, is_string, is_data_loc) of the tracepoint
+    """
+    name = re.search(r'^name: (\S+)', format_text, re.MULTILINE).group(1)
+    event_id = int(re.search(r'^ID: (\d+)', format_text, re.MULTILINE).group(1))
+
+    fields = []
+    for declaration, offset, size, signed in re.findall(
+            r'field:([^;]+);\s*offset:(\d+);\s*size:(\d+);\s*signed:(\d+);', format_text):
+        is_data_loc = declaration.startswith('__data_loc')
+        is_string = 'char' in declaration and '[' in declaration
+        field_name = re.sub(r'\[.*?\]', '', declaration).split()[-1]
+        fields.append((field_name, int(offset), int(size), signed == '1', is_string, is_data_loc))
+
+    return name, event_id, fields
+
+
+class PerfDataReader:
+    """ perf.data Reader Class """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.attrs = []
+        self.tracepoints = dict()
+        self.comms = dict()
+
+        with open(filename, 'rb') as perf_data_file:
+            self.buffer = mmap.mmap(perf_data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.read_header()
+        self.read_attrs()
+        self.read_tracing_data()
+
+    def read_header(self):
+        """ Read perf_file_header """
+        if self.buffer[:8] != PERF_FILE_MAGIC:
+            raise PerfDataError(self.filename + " is not a perf.data file in file mode")
+
+        header_size, self.attr_size = struct.unpack_from('<QQ', self.buffer, 8)
+        self.attrs_offset, self.attrs_size, self.data_offset, self.data_size = \
+            struct.unpack_from('<QQQQ', self.buffer, 24)
+        self.features = int.from_bytes(self.buffer[72:104], 'little')
+
+    def read_attrs(self):
+        """ Read perf_event_attr and the sample ids of each event """
+        for attr_offset in range(self.attrs_offset, self.attrs_offset + self.attrs_size, self.attr_size):
+            attr_type, = struct.unpack_from('<I', self.buffer, attr_offset)
+            config, = struct.unpack_from('<Q', self.buffer, attr_offset + 8)
+            sample_type, = struct.unpack_from('<Q', self.buffer, attr_offset + 24)
+            ids_offset, ids_size = struct.unpack_from('<QQ', self.buffer, attr_offset + self.attr_size - 16)
+            ids = struct.unpack_from('<' + str(ids_size // 8) + 'Q', self.buffer, ids_offset)
+            self.attrs.append({'type': attr_type, 'config': config, 'sample_type': sample_type, 'ids': ids})
+
+    def get_feature_section(self, feature):
+        """ Return (offset, size) of a feature section, None if the feature isn't part of the file """
+        if not self.features & (1 << feature):
+            return None
+        index = bin(self.features & ((1 << feature) - 1)).count('1')
+        return struct.unpack_from('<QQ', self.buffer, self.data_offset + self.data_size + index * 16)
+
+    def read_tracing_data(self):
+        """ Read tracepoint format descriptions and saved cmdlines of HEADER_TRACING_DATA """
+        section = self.get_feature_section(HEADER_TRACING_DATA)
+        if section is None:
+            raise PerfDataError(self.filename + " contains no tracing data")
+        offset = section[0]
+
+        if self.buffer[offset:offset + 10] != TRACING_DATA_MAGIC:
+            raise PerfDataError(self.filename + " contains invalid tracing data")
+        offset += 10
+        version_end = self.buffer.find(b'\0', offset)
+        version = float(self.buffer[offset:version_end])
+        offset = version_end + 1
+        if self.buffer[offset]:
+            raise PerfDataError(self.filename + " was recorded on a big endian target")
+        offset += 6     # big endian flag, long size, page size
+
+        for header_name in (b'header_page\0', b'header_event\0'):
+            offset += len(header_name)
+            size, = struct.unpack_from('<Q', self.buffer, offset)
+            offset += 8 + size
+
+        # ftrace formats
+        count, = struct.unpack_from('<I', self.buffer, offset)
+        offset += 4
+        for i in range(count):
+            size, = struct.unpack_from('<Q', self.buffer, offset)
+            offset += 8 + size
+
+        # event formats of each system
+        systems, = struct.unpack_from('<I', self.buffer, offset)
+        offset += 4
+        for i in range(systems):
+            system_end = self.buffer.find(b'\0', offset)
+            system = self.buffer[offset:system_end].decode()
+            offset = system_end + 1
+            count, = struct.unpack_from('<I', self.buffer, offset)
+            offset += 4
+            for k in range(count):
+                size, = struct.unpack_from('<Q', self.buffer, offset)
+                offset += 8
+                name, event_id, fields = parse_tracepoint_format(self.buffer[offset:offset + size].decode())
+                self.tracepoints[event_id] = (system + ':' + name, fields)
+                offset += size
+
+        # kallsyms and printk formats
+        for i in range(2):
+            size, = struct.unpack_from('<I', self.buffer, offset)
+            offset += 4 + size
+
+        if version >= 0.6:
+            size, = struct.unpack_from('<Q', self.buffer, offset)
+            for line in self.buffer[offset + 8:offset + 8 + size].decode(errors='replace').splitlines():
+                pid, _, comm = line.partition(' ')
+                if pid.isdigit():
+                    self.comms[int(pid)] = comm
+
+    def get_sample_layout(self, sample_type):
+        """ Return offsets of the sample fields within a PERF_RECORD_SAMPLE record """
+        if sample_type & (PERF_SAMPLE_READ | PERF_SAMPLE_CALLCHAIN):
+            raise PerfDataError("Samples with read values or callchains are not supported")
+        if not sample_type & PERF_SAMPLE_RAW:
+            raise PerfDataError("Samples without raw tracepoint data are not supported")
+        if sample_type & (PERF_SAMPLE_TID | PERF_SAMPLE_TIME | PERF_SAMPLE_CPU) != \
+                PERF_SAMPLE_TID | PERF_SAMPLE_TIME | PERF_SAMPLE_CPU:
+            raise PerfDataError("Samples without tid, time or cpu are not supported")
+
+        layout = dict()
+        offset = 8      # perf_event_header
+        for field, bit in (('identifier', PERF_SAMPLE_IDENTIFIER), ('ip', PERF_SAMPLE_IP), ('tid', PERF_SAMPLE_TID),
+                           ('time', PERF_SAMPLE_TIME), ('addr', PERF_SAMPLE_ADDR), ('id', PERF_SAMPLE_ID),
+                           ('stream_id', PERF_SAMPLE_STREAM_ID), ('cpu', PERF_SAMPLE_CPU),
+                           ('period', PERF_SAMPLE_PERIOD)):
+            if sample_type & bit:
+                layout[field] = offset
+                offset += 8
+        layout['raw'] = offset + 4  # raw data follows its u32 size
+        return layout
+
+    def walk_records(self):
+        """
+        Walk all records of the data section, collect task names of PERF_RECORD_COMM
+        :return: numpy array of the offsets of all PERF_RECORD_SAMPLE records
+        """
+        sample_offsets = []
+        offset = self.data_offset
+        data_end = self.data_offset + self.data_size
+        unpack_header = struct.Struct('<IHH').unpack_from
+
+        while offset < data_end:
+            record_type, misc, size = unpack_header(self.buffer, offset)
+            if size == 0:
+                raise PerfDataError("Invalid record in " + self.filename)
+            if record_type == PERF_RECORD_SAMPLE:
+                sample_offsets.append(offset)
+            elif record_type == PERF_RECORD_COMM:
+                pid, tid = struct.unpack_from('<II', self.buffer, offset + 8)
+                comm_end = self.buffer.find(b'\0', offset + 16, offset + size)
+                self.comms[tid] = self.buffer[offset + 16:comm_end].decode(errors='replace')
+            elif record_type == PERF_RECORD_COMPRESSED:
+                raise PerfDataError("Compressed perf.data files (perf record -z) are not supported")
+            offset += size
+
+        return np.array(sample_offsets, dtype=np.int64)
+
+    def read_tracepoint_samples(self, window=None):
+        """
+        Decode all tracepoint samples
+        :param window: (start, stop) timestamps in nanoseconds, both included. None for an open end. Only the time of
+                       the samples is decoded outside of the window.
+        :return: Dictionary of event name ('system:tracepoint'): dictionary of numpy arrays with the sample fields
+                 tid, pid, cpu, time and the tracepoint fields, sorted by time
+        """
+        buffer = np.frombuffer(self.buffer, dtype=np.uint8)
+        sample_offsets = self.walk_records()
+
+        sample_type = self.attrs[0]['sample_type']
+        if any(attr['sample_type'] != sample_type for attr in self.attrs) and \
+                not sample_type & PERF_SAMPLE_IDENTIFIER:
+            raise PerfDataError("Events with different sample types require PERF_SAMPLE_IDENTIFIER")
+
+        def gather(offsets, field_offset, dtype):
+            """
+            Gather a field of fixed size at offsets + field_offset of all samples. Records are 8 byte aligned, so
+            the field is read in the largest words its positions are aligned to.
+            """
+            dtype = np.dtype(dtype)
+            positions = offsets + field_offset
+            if len(positions) == 0:
+                return np.empty(0, dtype=dtype)
+
+            shift = int(positions[0]) % 8
+            word_size = 8
+            while dtype.itemsize % word_size or np.any(positions % word_size != shift % word_size):
+                word_size //= 2
+            shift %= word_size
+            words = buffer[shift:shift + (len(buffer) - shift) // word_size * word_size].view('<u' + str(word_size))
+
+            indices = (positions - shift) // word_size
+            values = np.empty((len(positions), dtype.itemsize // word_size), dtype=words.dtype)
+            for word in range(values.shape[1]):
+                values[:, word] = words[indices + word]
+            return values.view(dtype).reshape(len(positions))
+
+        # Assign samples to their event attribute
+        if len(self.attrs) == 1:
+            sample_attrs = np.zeros(len(sample_offsets), dtype=np.int64)
+        else:
+            # The identifier is the first field of all samples, the id has the same offset in all samples as their
+            # sample types are equal
+            if sample_type & PERF_SAMPLE_IDENTIFIER:
+                id_offset = 8
+            else:
+                id_offset = self.get_sample_layout(sample_type).get('id')
+            if id_offset is None:
+                raise PerfDataError("Samples of several events require PERF_SAMPLE_ID or PERF_SAMPLE_IDENTIFIER")
+            attr_ids = np.array([sample_id for attr in self.attrs for sample_id in attr['ids']], dtype=np.uint64)
+            attr_indices = np.array([index for index, attr in enumerate(self.attrs) for sample_id in attr['ids']],
+                                    dtype=np.int64)
+            order = np.argsort(attr_ids)
+            attr_ids, attr_indices = attr_ids[order], attr_indices[order]
+            sample_ids = gather(sample_offsets, id_offset, '<u8')
+            position = np.minimum(np.searchsorted(attr_ids, sample_ids), max(len(attr_ids) - 1, 0))
+            sample_attrs = np.where(attr_ids[position] == sample_ids, attr_indices[position], -1)
+
+        events = dict()
+        for index, attr in enumerate(self.attrs):
+            if attr['type'] != PERF_TYPE_TRACEPOINT or attr['config'] not in self.tracepoints:
+                continue
+            event_name, fields = self.tracepoints[attr['config']]
+            layout = self.get_sample_layout(attr['sample_type'])
+            offsets = sample_offsets[sample_attrs == index]
+            if window is not None:
+                time = gather(offsets, layout['time'], '<u8').astype(np.int64)
+                start, stop = window
+                in_window = np.ones(len(offsets), dtype=bool)
+                if start is not None:
+                    in_window &= time >= start
+                if stop is not None:
+                    in_window &= time <= stop
+                offsets = offsets[in_window]
+
+            samples = dict()
+            samples['pid'] = gather(offsets, layout['tid'], '<u4').astype(np.int64)
+            samples['tid'] = gather(offsets, layout['tid'] + 4, '<u4').astype(np.int64)
+            samples['time'] = gather(offsets, layout['time'], '<u8').astype(np.int64)
+            samples['cpu'] = gather(offsets, layout['cpu'], '<u4').astype(np.int64)
+
+            for field_name, offset, size, signed, is_string, is_data_loc in fields:
+                if field_name.startswith('common_'):
+                    continue
+                if is_data_loc:
+                    # __data_loc: u32 with offset of the data in the lower and length in the upper 16 bit
+                    data_loc = gather(offsets, layout['raw'] + offset, '<u4').astype(np.int64)
+                    data_length = data_loc >> 16
+                    positions = offsets + layout['raw'] + (data_loc & 0xffff)
+                    max_length = max(int(data_length.max()) if len(data_loc) else 0, 1)
+                    values = np.zeros((len(offsets), max_length), dtype=np.uint8)
+                    for byte in range(max_length):
+                        in_string = byte < data_length
+                        values[in_string, byte] = buffer[positions[in_string] + byte]
+                    samples[field_name] = values.view('S' + str(max_length)).reshape(len(offsets))
+                elif is_string:
+                    samples[field_name] = gather(offsets, layout['raw'] + offset, 'S' + str(size))
+                elif size in (1, 2, 4, 8):
+                    samples[field_name] = gather(offsets, layout['raw'] + offset,
+                                                 ('<i' if signed else '<u') + str(size)).astype(np.int64)
+
+            # Samples are written per CPU buffer, sort them only if the buffers interleave
+            if np.any(samples['time'][1:] < samples['time'][:-1]):
+                order = np.argsort(samples['time'], kind='stable')
+                samples = {name: values[order] for name, values in samples.items()}
+            events[event_name] = samples
+
+        return events
+
+    def get_task_name(self, tid):
+        """ Return task name of a tid, as printed by perf script """
+        return self.comms.get(tid, 'swapper' if tid == 0 else ':' + str(tid))
+
+    def close(self):
+        self.buffer.close()
@@ -0,0 +1,702 @@
+"""
+perfViewer
+Module: perfdumpparser
+Responsible: Brandtner Philipp
+Description:
+Parses a perf per-event dump file straight from its bytes, without splitting the lines into tokens. All lines of a
+per-event dump share the layout of the first line:
+    - the header 'task tid [cpu] seconds.fraction: event: ' at fixed byte offsets. Lines with a wider tid or seconds
+      field are searched for the separators and parsed as a group of their own.
+    - the fields of the column layout, 'key=value' or a plain token, separated by single blanks
+The lines are parsed in blocks which keep the intermediate arrays in the cache of the processor. The fields of a block
+are parsed column by column: a window of a fixed width is copied from every line at the position of the field and
+handled as 64 bit words of eight characters. Numbers are converted eight digits at a time, strings are factorized on
+their words after the last block. Most dumps repeat few payloads, ex. the pairs of tasks of sched_switch: the payloads
+of a block are factorized on their words and only the first line of every distinct payload is parsed, until a block
+holds mostly distinct payloads. The parse gives up with None as soon as a line does not match the layout of the
+first line.
+
+"""
+
+import re
+import numpy as np
+import pandas as pd
+
+PERF_DUMP_HEADER_NAMES = ['task', 'tid', 'cpu', 'timestamp', 'event']
+
+# Header of a dump line, ex. b'       swapper/1      0 [001]  1630.000377: sched:sched_switch:'
+PERF_DUMP_LINE_HEADER = re.compile(rb' *(.+?)( +)(\d+)( +)\[(\d+)\]( +)(\d+)\.(\d+): (\S+):')
+
+# Number of lines parsed at once
+BLOCK_LINES = 16384
+
+# Number of bytes searched for line feeds at once, a multiple of 8
+SCAN_SIZE = 1024 * 1024
+
+# Widest field searched for its end, wider fields make the parse give up
+MAX_FIELD_WIDTH = 256
+
+# Last bytes of a dump file copied with zero padding for the windows reaching over its end
+TAIL_SIZE = MAX_FIELD_WIDTH + 64
+
+# Windows of fields hold the last bytes of the key in the first word, the value starts with the second word
+KEY_WIDTH = 8
+
+# Names of tasks have up to 15 characters (TASK_COMM_LEN)
+MAX_TASK_NAME_LENGTH = 15
+
+# Integers are converted from up to two words of digits
+MAX_DIGITS = 16
+
+# Payloads may be longer than the one of the first line by PAYLOAD_SLACK bytes to be factorized
+PAYLOAD_SLACK = 32
+
+# Payloads are parsed once per distinct payload while a block holds at least PAYLOAD_REPEATS lines per distinct payload
+PAYLOAD_REPEATS = 4
+
+BYTE_ONES = 0x0101010101010101
+ZERO_DIGITS = np.uint64(0x30 * BYTE_ONES)
+WORD_HIGH_BITS = np.uint64(0x80 * BYTE_ONES)
+WORD_LOW_BITS = np.uint64(0x7F * BYTE_ONES)
+DIGIT_LIMIT = np.uint64(0x76 * BYTE_ONES)
+BLANK_LIMIT = np.uint64(0x21 * BYTE_ONES)
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# Masks of the 0 to 8 low bytes of a little-endian word, the low byte holds the first character
+LOW_BYTE_MASKS = np.array([(1 << 8 * count) - 1 for count in range(9)], dtype=np.uint64)
+
+POWERS_OF_TEN = 10 ** np.arange(MAX_DIGITS + 1, dtype=np.int64)
+
+# Odd multipliers of the words of a payload for its hash key
+PAYLOAD_HASH_MULTIPLIERS = np.cumprod(np.full(TAIL_SIZE // 8, HASH_MULTIPLIER))
+
+class DumpBuffer:
+    """
+    Bytes of a dump file with copies of windows at line positions. Windows starting in the last bytes of the file are
+    copied from a zero padded copy of them.
+    """
+    def __init__(self, data):
+        self.bytes = np.frombuffer(data, dtype=np.uint8)
+        self.tail_start = max(len(self.bytes) - TAIL_SIZE, 0)
+        self.tail = np.zeros(2 * TAIL_SIZE, dtype=np.uint8)
+        self.tail[:len(self.bytes) - self.tail_start] = self.bytes[self.tail_start:]
+
+    def get_line_ends(self):
+        """
+        Search the line ends in chunks of SCAN_SIZE bytes. The line feeds are located word by word, a word holds at
+        most one of them for lines of eight bytes and more.
+        :return: numpy int64 array of byte offsets of the line feeds and of the end of an unterminated last line
+        """
+        size = len(self.bytes) // 8 * 8
+        line_ends = []
+        scan = np.empty(SCAN_SIZE, dtype=bool)
+        for start in range(0, size, SCAN_SIZE):
+            chunk = self.bytes[start:min(start + SCAN_SIZE, size)]
+            is_line_feed = np.equal(chunk, ord('\n'), out=scan[:len(chunk)])
+            flags = is_line_feed.view(np.uint64)
+            word_rows = np.flatnonzero(flags)
+            flags = flags[word_rows]
+            if (np.bitwise_count(flags) > 1).any():
+                line_ends.append(start + np.flatnonzero(is_line_feed))
+            else:
+                line_ends.append(start + word_rows * 8 + (np.bitwise_count(flags - np.uint64(1)) >> 3))
+        line_ends.append(size + np.flatnonzero(self.bytes[size:] == ord('\n')))
+        line_ends = np.concatenate(line_ends).astype(np.int64)
+        if not len(line_ends) or line_ends[-1] != len(self.bytes) - 1:
+            line_ends = np.append(line_ends, len(self.bytes))
+        return line_ends
+
+    def get_windows(self, positions, width):
+        """
+        Copy the bytes [position, position + width) of every position
+        :param positions: numpy int64 array of ascending byte offsets up to the end of the file
+        :param width: Width of the windows in bytes, a multiple of 8 up to TAIL_SIZE
+        :return: numpy uint8 array of len(positions) x width
+        """
+        inside = np.searchsorted(positions, self.tail_start)
+        if inside == len(positions):
+            return get_windows(self.bytes, positions, width)
+        windows = get_windows(self.bytes if inside else self.tail, np.concatenate((
+            positions[:inside], np.zeros(len(positions) - inside, dtype=np.int64))), width)
+        windows[inside:] = get_windows(self.tail, positions[inside:] - self.tail_start, width)
+        return windows
+
+def get_windows(buffer, positions, width):
+    """ Copy the bytes [position, position + width) of every position of a numpy uint8 array """
+    view = np.ndarray((len(buffer) - width + 1,), dtype='V%d' % width, buffer=buffer, strides=(1,))
+    return view[positions].view(np.uint8).reshape(len(positions), width)
+
+def round_up_to_word(size):
+    return (size + 7) // 8 * 8
+
+def get_word(words, offset):
+    """ Word of the bytes [offset, offset + 8) of every row of a matrix of words """
+    index, shift = divmod(offset, 8)
+    if not shift:
+        return words[:, index]
+    return (words[:, index] >> np.uint64(8 * shift)) | (words[:, index + 1] << np.uint64(64 - 8 * shift))
+
+def flag_bytes(words, byte):
+    """ High bit of every byte of the words equal to byte """
+    differences = words ^ np.uint64(byte * BYTE_ONES)
+    return ~(((differences & WORD_LOW_BITS) + WORD_LOW_BITS) | differences) & WORD_HIGH_BITS
+
+def flag_non_digits(words):
+    """ High bit of every byte of the words which is no ASCII digit """
+    digits = words ^ ZERO_DIGITS
+    return (((digits & WORD_LOW_BITS) + DIGIT_LIMIT) | digits) & WORD_HIGH_BITS
+
+def get_first_flagged_byte(flags):
+    """ Index of the first byte with high bit of flags, 8 for no flag """
+    return (np.bitwise_count((flags & -flags) - np.uint64(1)) >> 3).astype(np.int64)
+
+def get_last_flagged_byte(flags):
+    """ Index of the last byte with high bit of flags, -1 for no flag """
+    return (np.frexp(flags.astype(np.float64))[1].astype(np.int64) - 8) >> 3
+
+def get_byte_shifts(lengths, index):
+    """ Shifts of the word of index of strings of lengths which move the bytes behind the strings out of its high end """
+    shifts = 64 * (index + 1) - 8 * lengths
+    if np.isscalar(shifts):
+        return np.uint64(min(max(shifts, 0), 64))
+    # The shifts are clipped in place, afterwards their bits are read as unsigned
+    np.maximum(shifts, 0, out=shifts)
+    np.minimum(shifts, 64, out=shifts)
+    return shifts.view(np.uint64)
+
+def get_word_counts(lengths, index):
+    """ Number of bytes of strings of lengths in their word of index """
+    return np.minimum(np.maximum(lengths - 8 * index, 0), 8)
+
+def convert_digits(words, lengths):
+    """
+    Convert left aligned ASCII digits to integers
+    :param words: List of numpy uint64 arrays of consecutive words, the first digit in the low byte of the first word
+    :param lengths: Number of digits per row, 1 to 8 * len(words), as numpy int64 array or int
+    :return: numpy int64 array, None if one of the digits is no digit
+    """
+    values = None
+    non_digits = np.uint64(0)
+    for index, word in enumerate(words):
+        # The digits are shifted to the high end of the word, the bytes behind them are dropped and the digit values
+        # in front of them are zero
+        digits = (word ^ ZERO_DIGITS) << get_byte_shifts(lengths, index)
+        non_digits = non_digits | (((digits & WORD_LOW_BITS) + DIGIT_LIMIT) | digits)
+        digits = convert_digit_values(digits)
+        values = digits if values is None else values * POWERS_OF_TEN[get_word_counts(lengths, index)] + digits
+    if (non_digits & WORD_HIGH_BITS).any():
+        return None
+    return values
+
+def convert_digit_values(digits):
+    """ Convert words of digit values 0 to 9 per byte to integers, the last byte holds the lowest digit """
+    digits = (digits * np.uint64(10) + (digits >> np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    digits = (digits * np.uint64(100) + (digits >> np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    return ((digits * np.uint64(10000) + (digits >> np.uint64(32))) & np.uint64(0xFFFFFFFF)).astype(np.int64)
+
+def convert_signed_digits(words, lengths):
+    """ Convert left aligned ASCII digits with an optional leading '-' to integers, see convert_digits """
+    negative = (words[0] & np.uint64(0xFF)) == ord('-')
+    words = [words[0] ^ np.where(negative, np.uint64(ord('-') ^ ord('0')), np.uint64(0))] + words[1:]
+    values = convert_digits(words, lengths)
+    return None if values is None else np.where(negative, -values, values)
+
+def mask_words(words, lengths):
+    """
+    Clear the bytes behind byte strings held in words
+    :param words: List of numpy uint64 arrays of consecutive words, the first byte in the low byte of the first word
+    :param lengths: numpy int64 array of the lengths of the strings, up to 8 * len(words)
+    :return: numpy uint64 array of strings x words
+    """
+    masked_words = np.empty((len(lengths), len(words)), dtype=np.uint64)
+    # Words inside of all strings are copied without a mask
+    full_words = lengths.min() // 8
+    for index, word in enumerate(words):
+        if index < full_words:
+            masked_words[:, index] = word
+        else:
+            shifts = get_byte_shifts(lengths, index)
+            masked_words[:, index] = (word << shifts) >> shifts
+    return masked_words
+
+def make_strings(words, lengths):
+    """
+    Strings of a block of dump lines
+    :param words: numpy uint64 array of strings x words, the bytes behind the strings are cleared
+    :param lengths: numpy int64 array of the lengths of the strings
+    :return: Tuple of hash keys, words and lengths of the strings
+    """
+    keys = words[:, 0]
+    for index in range(1, words.shape[1]):
+        keys = (keys * HASH_MULTIPLIER) ^ words[:, index]
+    return keys, words, lengths
+
+def factorize_words(strings):
+    """
+    Factorize byte strings of blocks by their hash keys, the exact factorization word by word is the fallback for a
+    hash collision
+    :param strings: List of strings per block, see make_strings
+    :return: numpy int64 array of codes in order of appearance and list of distinct byte strings per code
+    """
+    keys, words, lengths = zip(*strings)
+    codes = pd.factorize(np.concatenate(keys))[0]
+    lengths = np.concatenate(lengths)
+    block_sizes = [len(block_keys) for block_keys in keys]
+    block_starts = np.cumsum([0] + block_sizes)
+
+    # New codes appear in few blocks, the blocks without a new code are skipped
+    first_rows = []
+    for start, size in zip(block_starts.tolist(), block_sizes):
+        if size and codes[start:start + size].max() >= len(first_rows):
+            first_rows.extend((start + get_first_rows(codes[start:start + size], len(first_rows))).tolist())
+    first_rows = np.array(first_rows, dtype=np.int64)
+    word_count = max(block_words.shape[1] for block_words in words)
+    blocks = np.searchsorted(block_starts, first_rows, side='right') - 1
+    uniques = np.zeros((len(first_rows), word_count), dtype=np.uint64)
+    for index, (block, row) in enumerate(zip(blocks.tolist(), (first_rows - block_starts[blocks]).tolist())):
+        uniques[index, :words[block].shape[1]] = words[block][row]
+
+    # Every string is compared with the first string of its code
+    for block_words, start, size in zip(words, block_starts.tolist(), block_sizes):
+        block_codes = codes[start:start + size]
+        for index in range(word_count):
+            if index < block_words.shape[1]:
+                collision = (uniques[:, index][block_codes] != block_words[:, index]).any()
+            else:
+                collision = uniques[:, index][block_codes].any()
+            if collision:
+                return factorize_word_matrix(concatenate_words(words), lengths)
+
+    characters = uniques.view(np.uint8)
+    return codes, [characters[index, :length].tobytes()
+                   for index, length in enumerate(lengths[first_rows].tolist())]
+
+def factorize_word_matrix(words, lengths):
+    """
+    Factorize byte strings held in words word by word
+    :param words: numpy uint64 array of strings x words, the bytes behind the strings are cleared
+    :param lengths: numpy int64 array of the lengths of the strings
+    :return: numpy int64 array of codes in order of appearance and list of distinct byte strings per code
+    """
+    codes = np.zeros(len(words), dtype=np.int64)
+    for index in range(words.shape[1]):
+        word_codes, uniques = pd.factorize(words[:, index])
+        codes = pd.factorize(codes * len(uniques) + word_codes)[0]
+    first_rows = get_first_rows(codes)
+    characters = np.ascontiguousarray(words[first_rows]).view(np.uint8)
+    return codes, [characters[index, :length].tobytes()
+                   for index, length in enumerate(lengths[first_rows].tolist())]
+
+def get_first_rows(codes, known_codes=0):
+    """ Row of the first appearance of every code of codes numbered in order of appearance after known_codes codes """
+    previous_maximum = np.empty(len(codes), dtype=codes.dtype)
+    previous_maximum[0] = known_codes - 1
+    np.maximum.accumulate(codes[:-1], out=previous_maximum[1:])
+    return np.flatnonzero(codes > previous_maximum)
+
+def make_categorical(codes, strings):
+    """
+    Categorical with sorted categories of codes and their strings, strings equal after decoding share a category
+    :param codes: numpy int64 array of codes
+    :param strings: List of byte strings per code
+    :return: pandas Categorical
+    """
+    names = [string.decode('utf-8', errors='replace') for string in strings]
+    categories = sorted(set(names))
+    ranks = {name: rank for rank, name in enumerate(categories)}
+    code_ranks = np.array([ranks[name] for name in names], dtype=np.int32)
+    return pd.Categorical.from_codes(code_ranks[codes], categories=categories)
+
+def concatenate_words(words):
+    """ Concatenate matrices of words of strings, narrower matrices are padded with cleared words """
+    count = max(block_words.shape[1] for block_words in words)
+    return np.concatenate([np.pad(block_words, ((0, 0), (0, count - block_words.shape[1])))
+                           for block_words in words])
+
+def find_header_columns(headers, first_columns):
+    """
+    Search the columns of '[', ']', '.' and ':' of the timestamp in dump line headers
+    :param headers: numpy uint8 array of header windows
+    :param first_columns: Columns of the first line, the search of a separator starts behind the previous one
+    :return: numpy int64 array of rows x 4 columns, None if a separator is missing
+    """
+    columns = np.empty((len(headers), len(first_columns)), dtype=np.int64)
+    begin = np.zeros(len(headers), dtype=np.int64)
+    for index, separator in enumerate(b'[].:'):
+        found = (headers == separator) & (np.arange(headers.shape[1]) >= begin[:, np.newaxis])
+        columns[:, index] = found.argmax(axis=1)
+        if not found[np.arange(len(headers)), columns[:, index]].all():
+            return None
+        begin = columns[:, index] + 1
+    return columns
+
+def match_header_template(words, separators, layout):
+    """
+    Compare the constant characters of dump line headers: the blanks in front of '[', the separators of the timestamp
+    and the event
+    :param words: numpy uint64 array of header windows as words
+    :param separators: Columns of '[', ']', '.' and ':' of the timestamp
+    :param layout: Layout of the dump lines, see get_dump_layout
+    :return: numpy bool array of the matching headers, None if the windows are too narrow
+    """
+    bracket_open, bracket_close, dot, colon = separators
+    event_separator = b': ' + layout['event'] + b': '
+    if colon + len(event_separator) + 8 > 8 * words.shape[1]:
+        return None
+    template = np.zeros(8 * words.shape[1], dtype=np.uint8)
+    template[bracket_open - layout['tid_gap']:bracket_open] = ord(' ')
+    template[[bracket_open, bracket_close, bracket_close + 1, dot]] = np.frombuffer(b'[] .', np.uint8)
+    template[colon:colon + len(event_separator)] = np.frombuffer(event_separator, np.uint8)
+    masks = np.where(template != 0, np.uint8(0xFF), np.uint8(0)).view(np.uint64)
+    template = template.view(np.uint64)
+
+    differences = np.zeros(len(words), dtype=np.uint64)
+    for index in np.flatnonzero(masks).tolist():
+        differences |= (words[:, index] ^ template[index]) & masks[index]
+    return differences == 0
+
+def parse_header_group(words, separators, layout):
+    """
+    Parse the headers of dump lines with the same columns of the separators, their template is already matched
+    :param words: numpy uint64 array of header windows as words
+    :param separators: Columns of '[', ']', '.' and ':' of the timestamp
+    :param layout: Layout of the dump lines, see get_dump_layout
+    :return: Dictionary of tid, cpu, timestamp, task words and lengths and payload column, None on a mismatch
+    """
+    bracket_open, bracket_close, dot, colon = separators
+    tid_end = bracket_open - layout['tid_gap']
+    seconds_width = dot - bracket_close - 1
+    fraction_width = colon - dot - 1
+    if not 0 < bracket_close - bracket_open - 1 <= 8 or tid_end < 8 or not 1 < seconds_width <= 16 or \
+            not 0 < fraction_width <= 16:
+        return None
+
+    cpus = convert_digits([get_word(words, bracket_open + 1)], bracket_close - bracket_open - 1)
+    fractions = convert_digits([get_word(words, dot + 1 + offset) for offset in range(0, fraction_width, 8)],
+                               fraction_width)
+
+    # Blanks in front of the seconds count as '0', they are followed by digits only
+    seconds_words = []
+    blank_counts = 0
+    last_blanks = np.full(len(words), -1)
+    for offset in range(0, seconds_width, 8):
+        word = get_word(words, bracket_close + 1 + offset) & LOW_BYTE_MASKS[min(seconds_width - offset, 8)]
+        blanks = flag_bytes(word, ord(' '))
+        blank_counts = blank_counts + np.bitwise_count(blanks)
+        last_blanks = np.where(blanks != 0, offset + get_last_flagged_byte(blanks), last_blanks)
+        seconds_words.append(word ^ (blanks >> np.uint64(3)))
+    if not (blank_counts == last_blanks + 1).all() or not (last_blanks < seconds_width - 1).all():
+        return None
+    seconds = convert_digits(seconds_words, seconds_width)
+
+    # The tid is the run of digits in front of tid_end behind a blank, the task name fills the columns in front
+    tid_word = get_word(words, tid_end - 8)
+    last_non_digits = get_last_flagged_byte(flag_non_digits(tid_word))
+    if not (last_non_digits >= 0).all() or not (last_non_digits < 7).all() or \
+            ((flag_bytes(tid_word, ord(' ')) >> (8 * last_non_digits + 7).astype(np.uint64)) & np.uint64(1) == 0).any():
+        return None
+    # Only digits follow the last non-digit, they are converted without a check
+    tid_shifts = (8 * last_non_digits + 8).astype(np.uint64)
+    tids = convert_digit_values((((tid_word ^ ZERO_DIGITS) >> tid_shifts) << tid_shifts))
+    if cpus is None or seconds is None or fractions is None:
+        return None
+
+    task_lengths = tid_end - 8 + last_non_digits
+    task_words = mask_words([words[:, index] for index in range(round_up_to_word(task_lengths.max()) // 8)],
+                            task_lengths)
+    if fraction_width <= 9:
+        fractions = fractions * 10 ** (9 - fraction_width)
+    else:
+        fractions = fractions // 10 ** (fraction_width - 9)
+    return {'tid': tids, 'cpu': cpus, 'timestamp': seconds * 1000000000 + fractions, 'task': task_words,
+            'task_lengths': task_lengths, 'payload_column': colon + len(layout['event']) + 4}
+
+def parse_header_block(dump_buffer, line_starts, layout):
+    """
+    Parse the headers 'task tid [cpu] seconds.fraction: event: ' of a block of dump lines
+    :param dump_buffer: DumpBuffer of the dump file
+    :param line_starts: numpy int64 array of the byte offsets of the lines
+    :param layout: Layout of the dump lines, see get_dump_layout
+    :return: Dictionary of the header columns with the task names as strings (see make_strings) and the byte offsets of
+             the payloads, None on a mismatch
+    """
+    headers = dump_buffer.get_windows(line_starts, layout['header_width'])
+    words = headers.view(np.uint64)
+    regular = match_header_template(words, layout['separators'], layout)
+    if regular.all():
+        header = parse_header_group(words, layout['separators'], layout)
+        if header is not None:
+            header['payload_start'] = line_starts + header.pop('payload_column')
+            header['task'] = make_strings(header['task'], header.pop('task_lengths'))
+        return header
+
+    # Lines with a wider tid or seconds field are grouped by the columns of their separators
+    irregular_rows = np.flatnonzero(~regular)
+    separators = find_header_columns(headers[irregular_rows], layout['separators'])
+    if separators is None:
+        return None
+    group_separators, group_inverse = np.unique(separators, axis=0, return_inverse=True)
+    groups = [(layout['separators'], np.flatnonzero(regular))]
+    for index, group_separator in enumerate(group_separators.tolist()):
+        rows = irregular_rows[group_inverse.ravel() == index]
+        matching = match_header_template(words[rows], tuple(group_separator), layout)
+        if matching is None or not matching.all():
+            return None
+        groups.append((tuple(group_separator), rows))
+
+    header = {name: np.empty(len(headers), dtype=np.int64)
+              for name in ('tid', 'cpu', 'timestamp', 'task_lengths', 'payload_start')}
+    task_words = []
+    for separators, rows in groups:
+        if not len(rows):
+            task_words.append(np.zeros((0, 1), dtype=np.uint64))
+            continue
+        group = parse_header_group(words[rows], separators, layout)
+        if group is None:
+            return None
+        for name in ('tid', 'cpu', 'timestamp', 'task_lengths'):
+            header[name][rows] = group[name]
+        header['payload_start'][rows] = line_starts[rows] + group['payload_column']
+        task_words.append(group['task'])
+    header_words = np.zeros((len(headers), max(group_words.shape[1] for group_words in task_words)), dtype=np.uint64)
+    for (separators, rows), group_words in zip(groups, task_words):
+        header_words[rows, :group_words.shape[1]] = group_words
+    header['task'] = make_strings(header_words, header.pop('task_lengths'))
+    return header
+
+def get_dump_layout(first_line, columns):
+    """
+    Layout of the dump lines from the column layout and the first line
+    :param first_line: First line of the dump as bytes
+    :param columns: Column layout of the dump file
+    :return: Dictionary of event, columns of the header separators, number of blanks between tid and '[', width of the
+             header windows, fields and payload windows, None if the first line does not match the column layout. A
+             field is (column name, key, dtype, window width, skipped width). The skipped width is the width of a
+             dropped field without digits in the first line, which is skipped without a window.
+    """
+    match = PERF_DUMP_LINE_HEADER.match(first_line)
+    if match is None or [name for name, prefix, dtype in columns[:len(PERF_DUMP_HEADER_NAMES)]] != \
+            PERF_DUMP_HEADER_NAMES:
+        return None
+    tokens = first_line[match.end() + 1:].split(b' ') if match.end() < len(first_line) else []
+    columns = columns[len(PERF_DUMP_HEADER_NAMES):]
+    if first_line[match.end():match.end() + 1] not in (b' ', b'') or len(tokens) != len(columns) or \
+            not all(tokens):
+        return None
+
+    fields = []
+    for (name, prefix, dtype), token in zip(columns, tokens):
+        key = b'' if prefix is None else prefix.encode()
+        if not token.startswith(key) or len(token) == len(key):
+            return None
+        if dtype is None and not re.search(rb'\d', token):
+            fields.append((name, key, dtype, None, len(token)))
+            continue
+        value_length = len(token) - len(key)
+        if dtype == 'category':
+            value_length = max(value_length, MAX_TASK_NAME_LENGTH)
+        fields.append((name, key, dtype, KEY_WIDTH + round_up_to_word(value_length + 1), None))
+
+    header_width = round_up_to_word(match.end() + 2 + 16)
+    if header_width > TAIL_SIZE:
+        return None
+    payload_width = round_up_to_word(len(first_line) - match.end() + PAYLOAD_SLACK)
+    return {'event': match.group(9), 'separators': (match.start(5) - 1, match.end(5), match.end(7), match.end(8)),
+            'tid_gap': len(match.group(4)), 'header_width': header_width, 'fields': fields,
+            'payload_width': payload_width if payload_width <= TAIL_SIZE else None}
+
+def find_value_ends(words):
+    """
+    Search the blank or line end behind the values of field windows
+    :param words: numpy uint64 array of field windows as words
+    :return: numpy int64 array of value lengths, None if a window holds no end
+    """
+    first_flags, offsets = 0, 0
+    for index in range(words.shape[1] - 1, 0, -1):
+        word = words[:, index]
+        # The lowest flag is exact, a borrow only flags bytes behind a byte below '!'
+        flags = (word - BLANK_LIMIT) & ~word & WORD_HIGH_BITS
+        if index == words.shape[1] - 1:
+            first_flags, offsets = flags, 8 * (index - 1)
+        else:
+            found = flags != 0
+            first_flags, offsets = np.where(found, flags, first_flags), np.where(found, 8 * (index - 1), offsets)
+    if not first_flags.all():
+        return None
+    lengths = get_first_flagged_byte(first_flags)
+    return lengths if words.shape[1] == 2 else offsets + lengths
+
+def factorize_payloads(dump_buffer, payload_starts, line_ends, width):
+    """
+    Factorize the payloads of a block of dump lines, ex. sched_switch repeats few pairs of tasks
+    :param dump_buffer: DumpBuffer of the dump file
+    :param payload_starts: numpy int64 array of the byte offsets of the payloads
+    :param line_ends: numpy int64 array of the byte offsets of the line ends
+    :param width: Maximum width of the payload windows
+    :return: numpy int64 array of codes in order of appearance and rows of the first payload per code, None if a
+             payload does not fit into its window or on a hash collision
+    """
+    lengths = line_ends - payload_starts
+    if lengths.min() < 1 or lengths.max() > width:
+        return None
+    words = dump_buffer.get_windows(payload_starts, round_up_to_word(lengths.max())).view(np.uint64)
+    for index in range(lengths.min() // 8, words.shape[1]):
+        shifts = get_byte_shifts(lengths, index)
+        words[:, index] = (words[:, index] << shifts) >> shifts
+    codes = pd.factorize(words @ PAYLOAD_HASH_MULTIPLIERS[:words.shape[1]])[0]
+    first_rows = get_first_rows(codes)
+    if len(first_rows) * PAYLOAD_REPEATS > len(codes):
+        return codes, first_rows
+
+    # Every payload is compared with the first payload of its code
+    if (lengths[first_rows][codes] != lengths).any() or (words[first_rows][codes] != words).any():
+        return None
+    return codes, first_rows
+
+def parse_payload_block(dump_buffer, payload_starts, line_ends, layout):
+    """
+    Parse the payloads of a block of dump lines
+    :param dump_buffer: DumpBuffer of the dump file
+    :param payload_starts: numpy int64 array of the byte offsets of the payloads
+    :param line_ends: numpy int64 array of the byte offsets of the line ends
+    :param layout: Layout of the dump lines, see get_dump_layout
+    :return: Dictionary of integer arrays per number column and of strings per string column (see make_strings), None
+             on a mismatch
+    """
+    values = {}
+    cursors = payload_starts
+    # A cursor behind the end of its line never comes back to it, the line ends are only compared after the last field
+    for name, key, dtype, width, skipped_width in layout['fields']:
+        if skipped_width is not None:
+            cursors = cursors + skipped_width + 1
+            continue
+
+        # Every window holds the last bytes of the key in the first word and the value from the second word on,
+        # all windows are widened while the blank or line end behind a value is missing
+        value_starts = cursors + len(key)
+        while True:
+            words = dump_buffer.get_windows(value_starts - KEY_WIDTH, width).view(np.uint64)
+            lengths = find_value_ends(words)
+            if lengths is not None:
+                break
+            if width >= KEY_WIDTH + MAX_FIELD_WIDTH:
+                return None
+            width = KEY_WIDTH + min(2 * (width - KEY_WIDTH), MAX_FIELD_WIDTH)
+
+        key_tail = (b' ' + key)[-KEY_WIDTH:]
+        key_word = np.frombuffer(key_tail.rjust(KEY_WIDTH, b'\0'), dtype=np.uint64)[0]
+        if not ((words[:, 0] & ~LOW_BYTE_MASKS[KEY_WIDTH - len(key_tail)]) == key_word).all() or not lengths.all():
+            return None
+        cursors = value_starts + lengths + 1
+
+        value_words = [words[:, word] for word in range(1, round_up_to_word(lengths.max()) // 8 + 1)]
+        if dtype == 'category':
+            values[name] = make_strings(mask_words(value_words, lengths), lengths)
+        elif dtype is not None:
+            if lengths.max() > MAX_DIGITS:
+                return None
+            # Negative numbers are rare, they are only searched if a value is no number
+            values[name] = convert_digits(value_words, lengths)
+            if values[name] is None:
+                values[name] = convert_signed_digits(value_words, lengths)
+            if values[name] is None:
+                return None
+
+    if not (cursors - 1 == line_ends).all():
+        return None
+    return values
+
+def parse_dump_block(dump_buffer, line_starts, line_ends, layout):
+    """
+    Parse a block of dump lines, repeated payloads are parsed once
+    :param dump_buffer: DumpBuffer of the dump file
+    :param line_starts: numpy int64 array of the byte offsets of the lines
+    :param line_ends: numpy int64 array of the byte offsets of the line ends
+    :param layout: Layout of the dump lines, see get_dump_layout, the payload width is cleared at the first block with
+                   few repeated payloads
+    :return: Dictionary of integer arrays per number column and of strings per string column (see make_strings), None
+             on a mismatch. The payload columns hold a value per distinct payload, 'payload_codes' the payload per
+             line or None if every payload is parsed and 'payload_count' the number of payloads.
+    """
+    values = parse_header_block(dump_buffer, line_starts, layout)
+    if values is None:
+        return None
+    payload_starts = values.pop('payload_start')
+    codes = None
+    if layout['payload_width'] is not None:
+        payloads = factorize_payloads(dump_buffer, payload_starts, line_ends, layout['payload_width'])
+        # Dumps with distinct payloads, ex. sched_stat_runtime, are parsed line by line after their first block
+        if payloads is not None and len(payloads[1]) * PAYLOAD_REPEATS > len(line_starts):
+            layout['payload_width'] = None
+        elif payloads is not None:
+            codes, first_rows = payloads
+            payload_starts, line_ends = payload_starts[first_rows], line_ends[first_rows]
+
+    fields = parse_payload_block(dump_buffer, payload_starts, line_ends, layout)
+    if fields is None:
+        return None
+    values.update(fields)
+    values['payload_codes'], values['payload_count'] = codes, len(payload_starts)
+    return values
+
+def expand_payload_values(values, blocks):
+    """
+    Values per line of the values per payload of the blocks of dump lines
+    :param values: numpy array of the values per payload of all blocks, see parse_dump_block
+    :param blocks: List of parsed blocks
+    :return: numpy array of the values per line
+    """
+    lines = []
+    start = 0
+    for block in blocks:
+        block_values = values[start:start + block['payload_count']]
+        lines.append(block_values if block['payload_codes'] is None else block_values[block['payload_codes']])
+        start += block['payload_count']
+    return np.concatenate(lines)
+
+def parse_dump_lines(data, columns):
+    """
+    Parse the lines of a perf per-event dump file with the layout of its first line
+    :param data: Content of the dump file as bytes or mmap
+    :param columns: Column layout of the dump file, ex. SCHED_SWITCH_COLUMNS of dataimporterexporter
+    :return: Pandas dataframe of events, None if a line does not match the layout of the first line
+    """
+    dump_buffer = DumpBuffer(data)
+    line_ends = dump_buffer.get_line_ends()
+    line_starts = np.empty(len(line_ends), dtype=np.int64)
+    line_starts[0] = 0
+    line_starts[1:] = line_ends[:-1] + 1
+    layout = get_dump_layout(bytes(data[:line_ends[0]]), columns)
+    if layout is None:
+        return None
+
+    blocks = []
+    for start in range(0, len(line_starts), BLOCK_LINES):
+        block = parse_dump_block(dump_buffer, line_starts[start:start + BLOCK_LINES],
+                                 line_ends[start:start + BLOCK_LINES], layout)
+        if block is None:
+            return None
+        blocks.append(block)
+
+    events = {}
+    for name, prefix, dtype in columns:
+        if name == 'event':
+            events[name] = pd.Categorical.from_codes(np.zeros(len(line_starts), dtype=np.int8),
+                                                     categories=[layout['event'].decode('utf-8', errors='replace')])
+        elif dtype == 'category':
+            codes, strings = factorize_words([block[name] for block in blocks])
+            if name == 'task':
+                strings = [string.strip(b' ') for string in strings]
+            else:
+                codes = expand_payload_values(codes, blocks)
+            events[name] = make_categorical(codes, strings)
+        elif dtype is not None:
+            values = np.concatenate([block[name] for block in blocks])
+            limits = np.iinfo(dtype)
+            if values.min() < limits.min or values.max() > limits.max:
+                return None
+            if name not in PERF_DUMP_HEADER_NAMES:
+                values = expand_payload_values(values, blocks)
+            events[name] = values.astype(dtype)
+    # The columns are new arrays, they are not copied into blocks of equal dtypes
+    return pd.DataFrame(events, copy=False)
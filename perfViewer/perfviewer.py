@@ -4,42 +4,80 @@ Module: perfviewer
 Responsible: Brandtner Philipp
 """
 
+import contextlib
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
 import sshscpcommander
 import dataimporterexporter
 import inputparser
 import drawplots
 import listtableprocessing
 import probe
+from timestamps import NS_PER_SECOND
 
-def import_target_files(perf_import_dir):
-    """ Import scheduler, irq and cpu-idle data for later processing """
-    imported_files = dict()
-
-    sched_migrate_df = dataimporterexporter.import_data_from_sched_migrate(perf_import_dir,
-                                                                             conf.get("SCHED_MIGRATE_FILENAME"))
-    sched_runtime_df = dataimporterexporter.import_data_from_sched_runtime(perf_import_dir,
-                                                                             conf.get("SCHED_RUNTIME_FILENAME"))
-    sched_switch_df = dataimporterexporter.import_data_from_sched_switch(perf_import_dir,
-                                                                           conf.get("SCHED_SWITCH_FILENAME"))
-    sched_waking_df = dataimporterexporter.import_data_from_sched_waking(perf_import_dir,
-                                                                           conf.get("SCHED_WAKING_FILENAME"))
-    sched_wakeup_df = dataimporterexporter.import_data_from_sched_wakeup(perf_import_dir,
-                                                                         conf.get("SCHED_WAKEUP_FILENAME"))
-    irq_handler_entry_df = dataimporterexporter.import_data_from_irq(perf_import_dir,
-                                                                       conf.get("IRQ_HANDLER_ENTRY_FILENAME"))
-    irq_handler_exit_df = dataimporterexporter.import_data_from_irq(perf_import_dir,
-                                                                     conf.get("IRQ_HANDLER_EXIT_FILENAME"))
-    cpu_idle_df = dataimporterexporter.import_data_from_cpu_idle(perf_import_dir,
-                                                                       conf.get("CPU_IDLE_FILENAME"))
-
-    imported_files['SCHED_MIGRATE_DF'] = sched_migrate_df
-    imported_files['SCHED_RUNTIME_DF'] = sched_runtime_df
-    imported_files['SCHED_SWITCH_DF'] = sched_switch_df
-    imported_files['SCHED_WAKING_DF'] = sched_waking_df
-    imported_files['SCHED_WAKEUP_DF'] = sched_wakeup_df
-    imported_files['IRQ_HANDLER_ENTRY_DF'] = irq_handler_entry_df
-    imported_files['IRQ_HANDLER_EXIT_DF'] = irq_handler_exit_df
-    imported_files['CPU_IDLE_DF'] = cpu_idle_df
+def import_target_files(perf_import_dir, jobs=1, stream=False, window=None, executor=None):
+    """
+    Import scheduler, irq and cpu-idle data for later processing. In stream mode no dump file is imported completely,
+    the task runtime calculation reads the dump files chunk by chunk from PERF_EVENT_STREAM and the CPU, wakeup,
+    latency, migration, idle and probe analyses from DUMP_FILE_STREAM (see dataimporterexporter.get_event_chunks).
+    With USE_NATIVE_PERF_DATA_READER all events are decoded from perf.data instead of the dump files. The string
+    columns of all dataframes share the string table STRING_TABLE. With a time window only the events inside the
+    window are imported.
+    """
+    if conf.get("USE_NATIVE_PERF_DATA_READER"):
+        imported_files = dataimporterexporter.import_perf_data(perf_import_dir, conf.get("PERF_DATA_FILENAME"),
+                                                              window)
+        dataimporterexporter.unify_imported_files(imported_files)
+        return imported_files
+
+    if stream:
+        stream_files = {'SCHED_RUNTIME_DF': (dataimporterexporter.SCHED_RUNTIME_COLUMNS,
+                                             conf.get("SCHED_RUNTIME_FILENAME")),
+                        'SCHED_SWITCH_DF': (dataimporterexporter.SCHED_SWITCH_COLUMNS,
+                                            conf.get("SCHED_SWITCH_FILENAME")),
+                        'SCHED_WAKEUP_DF': (dataimporterexporter.SCHED_WAKEUP_COLUMNS,
+                                            conf.get("SCHED_WAKEUP_FILENAME")),
+                        'SCHED_WAKING_DF': (dataimporterexporter.SCHED_WAKEUP_COLUMNS,
+                                            conf.get("SCHED_WAKING_FILENAME")),
+                        'IRQ_HANDLER_ENTRY_DF': (dataimporterexporter.IRQ_COLUMNS,
+                                                 conf.get("IRQ_HANDLER_ENTRY_FILENAME")),
+                        'IRQ_HANDLER_EXIT_DF': (dataimporterexporter.IRQ_COLUMNS,
+                                                conf.get("IRQ_HANDLER_EXIT_FILENAME")),
+                        'CPU_IDLE_DF': (dataimporterexporter.CPU_IDLE_COLUMNS, conf.get("CPU_IDLE_FILENAME"))}
+        imported_files = dict()
+        imported_files['PERF_EVENT_STREAM'] = functools.partial(dataimporterexporter.stream_perf_events,
+                                                                perf_import_dir, list(stream_files.values()),
+                                                                conf.get("IMPORT_CHUNK_SIZE"), window)
+        stream_files['SCHED_MIGRATE_DF'] = (dataimporterexporter.SCHED_MIGRATE_COLUMNS,
+                                            conf.get("SCHED_MIGRATE_FILENAME"))
+        imported_files['DUMP_FILE_STREAM'] = functools.partial(dataimporterexporter.stream_dump_files,
+                                                               perf_import_dir, stream_files,
+                                                               conf.get("IMPORT_CHUNK_SIZE"), window)
+        dataimporterexporter.unify_imported_files(imported_files)
+        return imported_files
+
+    dump_files = dict()
+    dump_files['SCHED_MIGRATE_DF'] = (dataimporterexporter.import_data_from_sched_migrate,
+                                      conf.get("SCHED_MIGRATE_FILENAME"))
+    dump_files['SCHED_RUNTIME_DF'] = (dataimporterexporter.import_data_from_sched_runtime,
+                                      conf.get("SCHED_RUNTIME_FILENAME"))
+    dump_files['SCHED_WAKING_DF'] = (dataimporterexporter.import_data_from_sched_waking,
+                                     conf.get("SCHED_WAKING_FILENAME"))
+    dump_files['IRQ_HANDLER_EXIT_DF'] = (dataimporterexporter.import_data_from_irq,
+                                         conf.get("IRQ_HANDLER_EXIT_FILENAME"))
+    dump_files['SCHED_SWITCH_DF'] = (dataimporterexporter.import_data_from_sched_switch,
+                                     conf.get("SCHED_SWITCH_FILENAME"))
+    dump_files['SCHED_WAKEUP_DF'] = (dataimporterexporter.import_data_from_sched_wakeup,
+                                     conf.get("SCHED_WAKEUP_FILENAME"))
+    dump_files['IRQ_HANDLER_ENTRY_DF'] = (dataimporterexporter.import_data_from_irq,
+                                          conf.get("IRQ_HANDLER_ENTRY_FILENAME"))
+    dump_files['CPU_IDLE_DF'] = (dataimporterexporter.import_data_from_cpu_idle,
+                                 conf.get("CPU_IDLE_FILENAME"))
+
+    imported_files = dataimporterexporter.import_dump_files(perf_import_dir, dump_files, jobs,
+                                                            conf.get("USE_IMPORT_CACHE"), window, executor)
+    dataimporterexporter.unify_imported_files(imported_files)
 
     return imported_files
 
@@ -50,42 +88,81 @@ def load_files_from_target_with_tracing(ip, username, password, pid, record_dura
     ssh_scp_commander.connect_to_target(ip, username, password)
     probe_list = dataimporterexporter.import_probe_list(conf, probe_list_filename)
     ssh_scp_commander.load_files_with_probes(pid, record_duration, probe_list, perf_import_dir, local_executables,
-                                             conf.get("PERF_PROBE_MAX_FUNCTION_LEN"))
-
-    dataimporterexporter.import_probe_tracing_data(perf_import_dir, probe_list)
-
-    imported_files = import_target_files(perf_import_dir)
-    imported_files["PROBE_LIST"] = probe_list
+                                             conf.get("PERF_PROBE_MAX_FUNCTION_LEN"),
+                                             not conf.get("USE_NATIVE_PERF_DATA_READER"))
 
-    return imported_files, ssh_scp_commander
+    return probe_list, ssh_scp_commander
 
 def load_files_from_target_without_tracing(ip, username, password, pid, record_duration, perf_import_dir):
     """ Load files from target and without tracing utilities"""
     ssh_scp_commander = sshscpcommander.SSHSCPCommander()
     ssh_scp_commander.connect_to_target(ip, username, password)
-    ssh_scp_commander.load_files_without_probes(pid, record_duration, perf_import_dir)
+    ssh_scp_commander.load_files_without_probes(pid, record_duration, perf_import_dir,
+                                                not conf.get("USE_NATIVE_PERF_DATA_READER"))
 
-    imported_files = import_target_files(perf_import_dir)
+    return ssh_scp_commander
 
-    return imported_files, ssh_scp_commander
+def import_loaded_files_with_tracing(perf_import_dir, probe_list, jobs, stream, window, executor):
+    """ Import the files loaded from target with the probes of the probe list """
+    imported_files = import_target_files(perf_import_dir, jobs, stream, window, executor)
+    if conf.get("USE_NATIVE_PERF_DATA_READER"):
+        dataimporterexporter.import_probe_tracing_data_from_perf_data(imported_files["PERF_DATA_EVENTS"], probe_list)
+    else:
+        dataimporterexporter.import_probe_tracing_data(perf_import_dir, probe_list, jobs, window, executor)
+    dataimporterexporter.unify_imported_files(imported_files, probe_list)
+    imported_files["PROBE_LIST"] = probe_list
 
-def offline_usage_with_tracing(perf_import_dir):
+    return imported_files
+
+def offline_usage_with_tracing(perf_import_dir, jobs, stream, window, executor):
     """ Use files from perf_import_dir and activate tracing utilities """
-    probe_list = dataimporterexporter.import_offline_probe_tracing_data(perf_import_dir, conf)
-    scheduler_irq_tracing_files = import_target_files(perf_import_dir)
+    scheduler_irq_tracing_files = import_target_files(perf_import_dir, jobs, stream, window, executor)
 
-    dataimporterexporter.import_probe_tracing_data(perf_import_dir, probe_list)
+    if conf.get("USE_NATIVE_PERF_DATA_READER"):
+        perf_data_events = scheduler_irq_tracing_files["PERF_DATA_EVENTS"]
+        probe_list = dataimporterexporter.import_offline_probe_list_from_perf_data(perf_data_events)
+        dataimporterexporter.import_probe_tracing_data_from_perf_data(perf_data_events, probe_list)
+    else:
+        probe_list = dataimporterexporter.import_offline_probe_tracing_data(perf_import_dir, conf)
+        dataimporterexporter.import_probe_tracing_data(perf_import_dir, probe_list, jobs, window, executor)
+    dataimporterexporter.unify_imported_files(scheduler_irq_tracing_files, probe_list)
 
     scheduler_irq_tracing_files["PROBE_LIST"] = probe_list
 
     return scheduler_irq_tracing_files
 
-def offline_usage_without_tracing(perf_import_dir):
+def offline_usage_without_tracing(perf_import_dir, jobs, stream, window, executor):
     """ Use files from perf_import_dir and deactivate tracing utilities """
-    scheduler_irq_tracing_files = import_target_files(perf_import_dir)
+    scheduler_irq_tracing_files = import_target_files(perf_import_dir, jobs, stream, window, executor)
 
     return scheduler_irq_tracing_files
 
+def get_window_duration(window, imported_files):
+    """
+    Duration of the analyzed time window in seconds. An open end of the window is limited by the first or last
+    imported event.
+    :param window: (start, stop) timestamps in nanoseconds, None for an open end
+    :param imported_files: Dictionary of imported files
+    :return: Duration in seconds
+    """
+    first_timestamps, last_timestamps = dict(), dict()
+    keys = [key for key, columns in dataimporterexporter.PERF_DATA_EVENTS.values()]
+    for event_chunks in dataimporterexporter.get_event_chunks(imported_files, keys):
+        for key, events_df in event_chunks.items():
+            if not events_df.empty:
+                first_timestamps.setdefault(key, int(events_df['timestamp'].iloc[0]))
+                last_timestamps[key] = int(events_df['timestamp'].iloc[-1])
+    if not first_timestamps:
+        print("Error: No events in the time window")
+        os.sys.exit()
+
+    start, stop = window
+    if start is None:
+        start = min(first_timestamps.values())
+    if stop is None:
+        stop = max(last_timestamps.values())
+    return (stop - start) / NS_PER_SECOND
+
 def print_welcome_string(ip,username,password,load_files_from_target, tracing, perf_import_dir, probe_list_filename,
                          local_executables):
     print("perfViewer Version: " + conf.get("VERSION"))
@@ -122,6 +199,9 @@ def Application():
     tracing = additional_args["TRACING"]
     probe_list_filename = additional_args["PROBE_LIST_FILENAME"]
     local_executables = args.executable
+    jobs = args.jobs
+    stream = args.stream
+    window = args.time_window
 
     ssh_scp_commander = None
     tid_pid_mapping = None
@@ -130,29 +210,53 @@ def Application():
                          local_executables)
 
     if load_files_from_target and tracing:
-        scheduler_irq_tracing_files, ssh_scp_commander = load_files_from_target_with_tracing(
+        probe_list, ssh_scp_commander = load_files_from_target_with_tracing(
             ip, args.username, password, pid, record_duration, perf_import_dir, probe_list_filename, local_executables)
-        probe_list, tracing_table = listtableprocessing.create_tracing_list_and_table(scheduler_irq_tracing_files)
         dataimporterexporter.export_input_args(perf_import_dir, record_duration)
     elif load_files_from_target and not tracing:
-        scheduler_irq_tracing_files, ssh_scp_commander = load_files_from_target_without_tracing(
+        ssh_scp_commander = load_files_from_target_without_tracing(
             ip, args.username, password, pid, record_duration, perf_import_dir)
         dataimporterexporter.export_input_args(perf_import_dir, record_duration)
-    elif not load_files_from_target and tracing:
-        record_duration = dataimporterexporter.import_input_args(perf_import_dir)
-        tid_pid_mapping = dataimporterexporter.import_tid_pid(perf_import_dir)
-        scheduler_irq_tracing_files = offline_usage_with_tracing(perf_import_dir)
-        probe_list, tracing_table = listtableprocessing.create_tracing_list_and_table(scheduler_irq_tracing_files)
-    elif not load_files_from_target and not tracing:
+    else:
         record_duration = dataimporterexporter.import_input_args(perf_import_dir)
         tid_pid_mapping = dataimporterexporter.import_tid_pid(perf_import_dir)
-        scheduler_irq_tracing_files = offline_usage_without_tracing(perf_import_dir)
 
-    print("Starting file processing...")
-    task_list, task_table, task_table_wakeup = listtableprocessing.create_task_list_and_table(
-        scheduler_irq_tracing_files, ssh_scp_commander, tid_pid_mapping)
-    cpu_list, cpu_table, cpu_idle_table = listtableprocessing.create_cpu_list_and_table(
+    # One process pool for the import of the dump files and the task runtime calculation, shut down on errors too
+    with ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else contextlib.nullcontext() as executor:
+        if load_files_from_target and tracing:
+            scheduler_irq_tracing_files = import_loaded_files_with_tracing(perf_import_dir, probe_list, jobs, stream,
+                                                                           window, executor)
+        elif load_files_from_target and not tracing:
+            scheduler_irq_tracing_files = import_target_files(perf_import_dir, jobs, stream, window, executor)
+        elif not load_files_from_target and tracing:
+            scheduler_irq_tracing_files = offline_usage_with_tracing(perf_import_dir, jobs, stream, window, executor)
+        elif not load_files_from_target and not tracing:
+            scheduler_irq_tracing_files = offline_usage_without_tracing(perf_import_dir, jobs, stream, window,
+                                                                        executor)
+        if tracing:
+            probe_list, tracing_table = listtableprocessing.create_tracing_list_and_table(scheduler_irq_tracing_files)
+
+        if window is not None:
+            record_duration = get_window_duration(window, scheduler_irq_tracing_files)
+
+        print("Starting file processing...")
+        task_list, task_table, task_table_wakeup = listtableprocessing.create_task_list_and_table(
+            scheduler_irq_tracing_files, ssh_scp_commander, tid_pid_mapping, jobs, executor)
+    cpu_list, cpu_table, cpu_idle_table, cpu_idle_residency_table = listtableprocessing.create_cpu_list_and_table(
         record_duration, scheduler_irq_tracing_files, task_list)
+    latency_df, task_latencies, latency_table = listtableprocessing.create_latency_list_and_table(
+        scheduler_irq_tracing_files)
+    migrations_df, task_migration_table, migration_matrix_table, migration_rate_table = \
+        listtableprocessing.create_migration_list_and_table(record_duration, scheduler_irq_tracing_files)
+    analysis_tables = {"Scheduling Latency Information": latency_table,
+                       "Task Migration Information": task_migration_table,
+                       "CPU Migration Matrix": migration_matrix_table,
+                       "Migration Rate": migration_rate_table}
+    bin_starts, utilization, utilization_table = listtableprocessing.create_cpu_utilization_list_and_table(
+        record_duration, cpu_list, conf.get("UTILIZATION_BIN_SIZE_MS"), conf.get("UTILIZATION_PEAK_WINDOW_MS"))
+    analysis_tables["CPU Utilization Peak Information"] = utilization_table
+    if cpu_idle_residency_table is not None:
+        analysis_tables["CPU Idle Residency Information"] = cpu_idle_residency_table
 
     if ssh_scp_commander is not None:
         ssh_scp_commander.close_connection()
@@ -162,7 +266,7 @@ def Application():
 
     if tracing:
         listtableprocessing.print_table(record_duration, task_table, task_table_wakeup, cpu_table, cpu_idle_table,
-                                        tracing_table)
+                                        tracing_table, analysis_tables)
 
         probes_delta = input("Calculate delta in execution between probe entries? Format: 1,2; 1,3\n").split(";")
         tracing_delta_table = probe.calculate_probe_deltas(scheduler_irq_tracing_files, probes_delta)
@@ -170,21 +274,31 @@ def Application():
 
         if load_files_from_target:
             dataimporterexporter.export_console_output_txt(perf_import_dir, cpu_table, cpu_idle_table, task_table,
-                                                       task_table_wakeup, time, tracing_table,tracing_delta_table)
+                                                       task_table_wakeup, time, tracing_table,tracing_delta_table,
+                                                       analysis_tables)
             dataimporterexporter.export_console_output_csv(perf_import_dir, cpu_table, cpu_idle_table, task_table,
-                                                       task_table_wakeup, time, tracing_table, tracing_delta_table)
+                                                       task_table_wakeup, time, tracing_table, tracing_delta_table,
+                                                       analysis_tables)
             dataimporterexporter.export_tracing_data_txt(scheduler_irq_tracing_files, perf_import_dir, time)
             dataimporterexporter.export_tracing_data_csv(scheduler_irq_tracing_files, perf_import_dir, time)
-        drawplots.draw_task_plot(task_list, probe_list)
+            dataimporterexporter.export_latency_data_csv(latency_df, task_latencies, perf_import_dir, time)
+            dataimporterexporter.export_cpu_utilization_csv(cpu_list, bin_starts, utilization, perf_import_dir, time)
+        drawplots.draw_task_plot(task_list, probe_list, migrations_df)
+        drawplots.draw_probe_histogram_plot(probe_list)
+        drawplots.draw_cpu_utilization_plot(cpu_list, bin_starts, utilization)
         drawplots.draw_cpu_plot(cpu_list)
     else:
-        listtableprocessing.print_table(record_duration, task_table, task_table_wakeup, cpu_table, cpu_idle_table)
+        listtableprocessing.print_table(record_duration, task_table, task_table_wakeup, cpu_table, cpu_idle_table,
+                                        analysis_tables=analysis_tables)
         if load_files_from_target:
             dataimporterexporter.export_console_output_txt(perf_import_dir, cpu_table, cpu_idle_table, task_table,
-                                                       task_table_wakeup, time)
+                                                       task_table_wakeup, time, analysis_tables=analysis_tables)
             dataimporterexporter.export_console_output_csv(perf_import_dir, cpu_table, cpu_idle_table, task_table,
-                                                       task_table_wakeup, time)
-        drawplots.draw_task_plot(task_list)
+                                                       task_table_wakeup, time, analysis_tables=analysis_tables)
+            dataimporterexporter.export_latency_data_csv(latency_df, task_latencies, perf_import_dir, time)
+            dataimporterexporter.export_cpu_utilization_csv(cpu_list, bin_starts, utilization, perf_import_dir, time)
+        drawplots.draw_task_plot(task_list, migrations_df=migrations_df)
+        drawplots.draw_cpu_utilization_plot(cpu_list, bin_starts, utilization)
         drawplots.draw_cpu_plot(cpu_list)
 
 def conf_init():
@@ -7,11 +7,16 @@ Definition of Class for perf probes
 
 """
 
-import subprocess
-import statistics
+import os
 import prettytable
-import re
+import numpy as np
 import pandas as pd
+from timestamps import NS_PER_MS, format_timestamp
+
+PROBE_ENTRY_SUFFIX = '_entry'
+PROBE_EXIT_SUFFIX = '_exit__return'
+PROBE_RUNTIME_PERCENTILES = (90, 99, 99.9)
+PROBE_HISTOGRAM_BINS = 50   # number of logarithmic bins between the min and max runtime
 
 def calculate_probe_deltas(scheduler_irq_tracing_files, probes_delta):
     """
@@ -36,15 +41,17 @@ def calculate_probe_deltas(scheduler_irq_tracing_files, probes_delta):
             if probe_entry_index == probe_exit_index:
                 for runtime_entry_1, runtime_entry_2 in zip(probe_entry.function_runtimes,
                                                             probe_entry.function_runtimes[1:]):
-                    delta += str(round((runtime_entry_2[0] - runtime_entry_1[0])*1e3,3)) + "\n"
+                    delta += str(round((runtime_entry_2[0] - runtime_entry_1[0]) / NS_PER_MS, 3)) + "\n"
             else:
                 for runtime_entry, runtime_exit in zip(probe_entry.function_runtimes, probe_exit.function_runtimes):
-                    delta += str(round((runtime_entry[0] - runtime_exit[0])*1e3, 3)) + "\n"
+                    delta += str(round((runtime_entry[0] - runtime_exit[0]) / NS_PER_MS, 3)) + "\n"
             delta = delta.rstrip()
             tracing_delta_table.add_row([probe_entry.function,
-                                         ('\n').join([str(runtime[0]) for runtime in probe_entry.function_runtimes]),
+                                         ('\n').join([format_timestamp(runtime[0])
+                                                      for runtime in probe_entry.function_runtimes]),
                                          probe_exit.function,
-                                         ('\n').join([str(runtime[0]) for runtime in probe_exit.function_runtimes]),
+                                         ('\n').join([format_timestamp(runtime[0])
+                                                      for runtime in probe_exit.function_runtimes]),
                                          delta])
     else:
         tracing_delta_table = None
@@ -52,6 +59,160 @@ def calculate_probe_deltas(scheduler_irq_tracing_files, probes_delta):
         tracing_delta_table = None
     return tracing_delta_table
 
+def get_probe_event_mask(events, suffix):
+    """
+    Events of a probe with the name ending with suffix
+    :param events: pandas series of event names, categorical or strings
+    :param suffix: Suffix of the event name, ex. PROBE_ENTRY_SUFFIX
+    :return: numpy bool array
+    """
+    if isinstance(events.dtype, pd.CategoricalDtype):
+        codes = events.cat.codes.to_numpy()
+        matching = np.append(np.asarray(events.cat.categories.str.endswith(suffix), dtype=bool), False)
+        return matching[np.where(codes < 0, len(matching) - 1, codes)]
+    return events.astype(str).str.endswith(suffix).to_numpy(dtype=bool)
+
+def pair_probe_events(tids, entries):
+    """
+    Pair entry and exit events of a probe per thread. The events of a thread are matched like a stack, nested and
+    recursive calls are paired with their own exit. Exits without entry (ex. the record started within the function)
+    and entries without exit are dropped.
+    :param tids: numpy array of the tid of each event, events sorted by timestamp
+    :param entries: numpy bool array, True for entry events and False for exit events
+    :return: numpy arrays of the indices of the paired entry and exit events, sorted by entry
+    """
+    if len(tids) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # Probes of a single thread are already in thread order
+    order = np.arange(len(tids)) if (tids == tids[0]).all() else np.argsort(tids, kind='stable')
+    thread_entries = entries[order]
+    new_thread = np.concatenate(([True], tids[order][1:] != tids[order][:-1]))
+    threads = np.cumsum(new_thread) - 1
+
+    # Depth before each event within its thread, clamped at 0 for exits without entry:
+    # depth = sum - min(0, lowest sum before), the lowest sum is searched with one offset per thread
+    steps = np.where(thread_entries, 1, -1)
+    sums = np.cumsum(steps) - steps
+    sums -= np.repeat(sums[new_thread], np.diff(np.append(np.flatnonzero(new_thread), len(order))))
+    offset = 2 * len(order) + 2
+    depths = sums - (np.minimum.accumulate(sums - threads * offset) + threads * offset)
+    # Level of the call: an entry opens level depth + 1, an exit closes level depth, level 0 are exits without entry
+    levels = depths + thread_entries
+
+    if levels.max() > 1:
+        # Nested calls: the entries and exits of one level of a thread alternate
+        by_level = np.lexsort((levels, threads))
+        order, thread_entries, threads, levels = order[by_level], thread_entries[by_level], threads[by_level], \
+                                                 levels[by_level]
+    pairs = np.flatnonzero(thread_entries[:-1] & ~thread_entries[1:] & (threads[:-1] == threads[1:]) &
+                           (levels[:-1] == levels[1:]))
+    entry_indices = order[pairs]
+    exit_indices = order[pairs + 1]
+    by_entry = np.argsort(entry_indices, kind='stable')
+    return entry_indices[by_entry], exit_indices[by_entry]
+
+def get_interval_rows(timestamps, starts, stops):
+    """
+    Positions of the timestamps within intervals, start and stop excluded, found with searchsorted
+    :param timestamps: numpy array of sorted timestamps in nanoseconds
+    :param starts: numpy array of interval starts in nanoseconds
+    :param stops: numpy array of interval stops in nanoseconds
+    :return: numpy array of positions in timestamps grouped by interval, numpy array of positions per interval
+    """
+    first = np.searchsorted(timestamps, starts, side='right')
+    counts = np.maximum(np.searchsorted(timestamps, stops, side='left') - first, 0)
+    return np.repeat(first - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum()), counts
+
+def get_rows_by_time(events_df, column):
+    """
+    Rows of the events per value of a column, ex. the sched_switch events per prev_pid
+    :param events_df: Dataframe of events with timestamp column
+    :param column: Name of the column
+    :return: Dictionary of value: numpy array of positional rows sorted by timestamp
+    """
+    if len(events_df) == 0:
+        return {}
+    order = np.argsort(events_df['timestamp'].to_numpy(), kind='stable')
+    values = events_df[column].to_numpy()[order]
+    by_value = np.argsort(values, kind='stable')
+    values = values[by_value]
+    bounds = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1], [True])))
+    return {int(values[first]): order[by_value[first:last]] for first, last in zip(bounds[:-1], bounds[1:])}
+
+def get_thread_collisions(sched_switch_df, irq_handler_entry_df, starts, stops, tids, cpus):
+    """
+    Preemptions of threads and interrupts on the CPU a thread was running on during intervals (ex. probe calls). A
+    preemption is a sched_switch with prev_pid == tid and lasts until the next switch-in of the thread, the thread is
+    followed across migrations: after a preemption it runs on the CPU of its switch-in.
+    :param sched_switch_df: Dataframe of sched_switch events
+    :param irq_handler_entry_df: Dataframe of irq_handler_entry events
+    :param starts: numpy array of interval starts in nanoseconds
+    :param stops: numpy array of interval stops in nanoseconds
+    :param tids: numpy array of the thread of each interval
+    :param cpus: numpy array of the CPU of each thread at the interval start
+    :return: sched_switch rows grouped by interval, sched_switch rows per interval, irq_handler_entry rows grouped by
+             interval, irq_handler_entry rows per interval, preempted time per interval in nanoseconds
+    """
+    empty = np.empty(0, dtype=np.int64)
+    switch_timestamps = sched_switch_df['timestamp'].to_numpy(dtype=np.int64)
+    switch_cpus = sched_switch_df['cpu'].to_numpy(dtype=np.int64)
+    irq_timestamps = irq_handler_entry_df['timestamp'].to_numpy(dtype=np.int64)
+    switch_outs = get_rows_by_time(sched_switch_df, 'prev_pid')
+    switch_ins = get_rows_by_time(sched_switch_df, 'next_pid')
+    cpu_irqs = get_rows_by_time(irq_handler_entry_df, 'cpu')
+
+    csw_intervals, csw_rows, irq_intervals, irq_rows = [empty], [empty], [empty], [empty]
+    preempted_times = np.zeros(len(starts), dtype=np.int64)
+    for tid in np.unique(tids):
+        intervals = np.flatnonzero(tids == tid)
+        out_rows = switch_outs.get(int(tid), empty)
+        in_rows = switch_ins.get(int(tid), empty)
+        out_timestamps = switch_timestamps[out_rows]
+        # Switch-in after each preemption, the last element is a sentinel for preemptions without switch-in
+        back = np.searchsorted(switch_timestamps[in_rows], out_timestamps, side='right')
+        back_timestamps = np.append(switch_timestamps[in_rows], np.iinfo(np.int64).max)[back]
+        back_cpus = np.append(switch_cpus[in_rows], -1)[back]
+
+        preemptions, counts = get_interval_rows(out_timestamps, starts[intervals], stops[intervals])
+        preemption_intervals = np.repeat(intervals, counts)
+        csw_intervals.append(preemption_intervals)
+        csw_rows.append(out_rows[preemptions])
+        np.add.at(preempted_times, preemption_intervals, np.minimum(back_timestamps[preemptions],
+                                                                    stops[preemption_intervals]) -
+                  out_timestamps[preemptions])
+
+        # Running segments of an interval: from the start or a switch-in to the next preemption or the stop
+        segments = counts + 1
+        segment_intervals = np.repeat(intervals, segments)
+        segment_numbers = np.arange(segments.sum()) - np.repeat(np.cumsum(segments) - segments, segments)
+        first = segment_numbers == 0
+        last = segment_numbers == np.repeat(counts, segments)
+        padded = np.append(preemptions, 0)
+        before = padded[np.maximum(np.repeat(np.cumsum(counts) - counts, segments) + segment_numbers - 1, 0)]
+        after = padded[np.repeat(np.cumsum(counts) - counts, segments) + segment_numbers]
+        segment_starts = np.where(first, starts[segment_intervals], np.append(back_timestamps, 0)[before])
+        segment_stops = np.where(last, stops[segment_intervals], np.append(out_timestamps, 0)[after])
+        segment_cpus = np.where(first, cpus[segment_intervals], np.append(back_cpus, -1)[before])
+
+        for cpu in np.unique(segment_cpus):
+            selected = np.flatnonzero(segment_cpus == cpu)
+            rows = cpu_irqs.get(int(cpu), empty)
+            positions, irq_counts = get_interval_rows(irq_timestamps[rows], segment_starts[selected],
+                                                      segment_stops[selected])
+            irq_intervals.append(np.repeat(segment_intervals[selected], irq_counts))
+            irq_rows.append(rows[positions])
+
+    def group_by_interval(interval_list, row_list, timestamps):
+        """ Rows grouped by interval and sorted by timestamp, number of rows per interval """
+        row_intervals = np.concatenate(interval_list)
+        rows = np.concatenate(row_list)
+        rows = rows[np.lexsort((timestamps[rows], row_intervals))]
+        return rows, np.bincount(row_intervals, minlength=len(starts))
+
+    csw_rows, csw_counts = group_by_interval(csw_intervals, csw_rows, switch_timestamps)
+    irq_rows, irq_counts = group_by_interval(irq_intervals, irq_rows, irq_timestamps)
+    return csw_rows, csw_counts, irq_rows, irq_counts, preempted_times
+
 
 class Probe:
     """ Probe Class """
@@ -68,12 +229,21 @@ class Probe:
         self.probe_name = ''
         self.probe_commands = []
         self.trace_data = pd.DataFrame(columns=['task', 'tid', 'cpu', 'timestamp', 'event', 'address'])
-        self.function_runtimes = []
+        self.function_runtimes = np.empty((0, 3), dtype=np.int64)
+        # Thread and CPU at the entry and preempted time in ns of each function runtime
+        self.function_tids = np.empty(0, dtype=np.int64)
+        self.function_cpus = np.empty(0, dtype=np.int64)
+        self.function_preempted_times = np.empty(0, dtype=np.int64)
 
         self.runtime_min = 0
         self.runtime_max = 0
         self.runtime_avg = 0
         self.runtime_median = 0
+        self.runtime_std = 0
+        self.runtime_percentiles = [0] * len(PROBE_RUNTIME_PERCENTILES)
+        self.runtime_jitter = 0
+        self.runtime_histogram = (np.zeros(0, dtype=np.int64), np.zeros(1))
+        self.preempted_time_max_runtime = 0
 
         self.csw_collision_events = pd.DataFrame(columns=['task', 'tid', 'cpu', 'timestamp', 'event',
                                                                      'prev_comm', 'prev_pid', 'prev_prio', 'prev_state',
@@ -91,6 +261,9 @@ class Probe:
                                                           'irq_source'])
         self.irq_collision_events_min_runtime = pd.DataFrame(columns=['task', 'tid', 'cpu', 'timestamp', 'event', 'irq',
                                                                       'irq_source'])
+        # Positional rows of the collisions in sched_switch_df and irq_handler_entry_df
+        self.csw_collision_rows = np.empty(0, dtype=np.int64)
+        self.irq_collision_rows = np.empty(0, dtype=np.int64)
 
 
     def __eq__(self, other):
@@ -111,56 +284,35 @@ class Probe:
     def set_local_executable_path(self, local_executable_path):
         self.executable_path_local = local_executable_path
 
-    def mangle_function_name(self, perf_export_dir):
-        """ Return the g++ mangled function name """
+    def get_local_executable(self, perf_export_dir):
+        """ Return the path of the local copy of the executable """
         if self.executable_path_local.endswith(self.executable):
             self.executable_path_local = self.executable_path_local[:-len(self.executable)]
         if self.executable_path_local != '':
-            command = 'cd ' + self.executable_path_local + '; readelf -sW ' + self.executable + ' | c++filt |grep ' + self.function
-        else:
-            command = 'cd ' + perf_export_dir + '; readelf -sW ' + self.executable + ' | c++filt |grep ' + self.function
-        proc = subprocess.Popen(command, shell=True, executable='/bin/bash', stdout=subprocess.PIPE)
-        std_out = str(proc.communicate()[0]).split('\\n')
-
-        index = []
-        for line in std_out:
-            if self.namespace == '':
-                if self.function in line and not '::' + self.function in line and 'FUNC' in line:
-                    index.append(std_out.index(line))
-            else:
-                if self.namespace + '::' + self.function in line and not 'non-virtual thunk to ' in line:
-                    index.append(std_out.index(line))
-
-        if len(index) > 1:
-            index_filtered = []
-            for i in index:
-                if [] != re.findall('\\b'+ self.function + '\\b', std_out[i]):
-                    index_filtered.append(i)
-            if len(index_filtered) == 1:
-                index = int(index_filtered[0])
-            else:
-                print("Warning: Can not mangel names of overloaded functions.")
-                print("Please choose correct function prototype:")
-                for i in index:
-                    print(str(i)+": "+ std_out[i])
-                index = int(input("Number of correct function:"))
-        elif len(index) == 1:
-            index = index[0]
-        elif len(index) == 0:
+            return os.path.join(self.executable_path_local, self.executable)
+        return os.path.join(perf_export_dir, self.executable)
+
+    def mangle_function_name(self, symbol_index):
+        """
+        Set the g++ mangled function name and function address from the symbol index of the executable
+        :param symbol_index: SymbolIndex of the executable
+        """
+        keys = symbol_index.find(self.namespace, self.function, self.arguments)
+        if len(keys) > 1:
+            print("Warning: Can not mangel names of overloaded functions.")
+            print("Please choose correct function prototype:")
+            for i, (qualified, signature) in enumerate(keys):
+                print(str(i) + ": " + qualified + signature)
+            choice = input("Number of correct function:").strip()
+            while not choice.isdecimal() or int(choice) >= len(keys):
+                choice = input("Please enter a number from 0 to " + str(len(keys) - 1) + ":").strip()
+            keys = [keys[int(choice)]]
+        elif len(keys) == 0:
             print('Failure: Could not find any match for function: ' + self.namespace + "::" + self.function)
             print('Usually this failure occurs due to namespace not equal to namespace in executable')
+            return
 
-        if self.executable_path_local != '':
-            command = 'cd ' + self.executable_path_local + '; readelf -sW ' + self.executable + ' |grep ' + self.function
-        else:
-            command = 'cd ' + perf_export_dir + '; readelf -sW ' + self.executable + ' |grep ' + self.function
-
-        proc = subprocess.Popen(command, shell=True, executable='/bin/bash', stdout=subprocess.PIPE)
-        std_out = str(proc.communicate()[0]).split('\\n')
-        std_out[0] = std_out[0][3:]
-
-        self.mangled_function = std_out[index].split(" ")[-1]
-        self.function_address = [x for x in std_out[index].split(" ") if x][1]
+        self.mangled_function, self.function_address = symbol_index.get(*keys[0])
 
     def create_probe_command(self, x, max_probe_function_len):
         if self.namespace == '':
@@ -184,31 +336,48 @@ class Probe:
                 "perf probe -x ../.." + self.executable_path + self.executable + " " + self.probe_name + "_exit=" + self.mangled_function + "%return" + "\n")
 
     def calculate_function_runtimes(self):
-        if not self.trace_data.empty:
-            i = 0
-            while i < len(self.trace_data) and i != (len(self.trace_data)-1):
-                entry_i = self.trace_data.iloc[i]
-                entry_next = self.trace_data.iloc[i+1]
-
-                if '_entry' in entry_i['event'] and '_exit__return' in entry_next['event']:
-                    self.function_runtimes.append([entry_i['timestamp'], entry_next['timestamp'],
-                                                   entry_next['timestamp'] - entry_i['timestamp']])
-                    i += 1
-                i += 1
+        """ Pair entry and exit events per thread, function_runtimes rows are [entry, exit, runtime] in ns """
+        entries = get_probe_event_mask(self.trace_data['event'], PROBE_ENTRY_SUFFIX)
+        exits = get_probe_event_mask(self.trace_data['event'], PROBE_EXIT_SUFFIX)
+        events = np.flatnonzero(entries | exits)
+        timestamps = self.trace_data['timestamp'].to_numpy(dtype=np.int64)[events]
+        tids = self.trace_data['tid'].to_numpy(dtype=np.int64)[events]
+        entry_indices, exit_indices = pair_probe_events(tids, entries[events])
+        self.function_runtimes = np.column_stack((timestamps[entry_indices], timestamps[exit_indices],
+                                                  timestamps[exit_indices] - timestamps[entry_indices]))
+        self.function_tids = tids[entry_indices]
+        self.function_cpus = self.trace_data['cpu'].to_numpy(dtype=np.int64)[events][entry_indices]
+        self.function_preempted_times = np.zeros(len(entry_indices), dtype=np.int64)
 
     def calculate_tracepoint_statistics(self):
-
+        """
+        Statistics of the function runtimes: min, max, average, standard deviation, median and PROBE_RUNTIME_PERCENTILES
+        (exact), jitter as mean absolute difference of consecutive runtimes and the histogram of PROBE_HISTOGRAM_BINS
+        logarithmic bins (counts, bin edges in ns)
+        """
         if len(self.function_runtimes) != 0:
-            self.runtime_min = min(self.function_runtimes, key=lambda x: x[2])
-            self.runtime_max = max(self.function_runtimes, key=lambda x: x[2])
-
-            self.runtime_avg = statistics.mean([runtime[2] for runtime in self.function_runtimes])
-            self.runtime_median = statistics.median([runtime[2] for runtime in self.function_runtimes])
+            runtimes = self.function_runtimes[:, 2]
+            self.runtime_min = self.function_runtimes[np.argmin(runtimes)].tolist()
+            self.runtime_max = self.function_runtimes[np.argmax(runtimes)].tolist()
+
+            self.runtime_avg = float(runtimes.mean())
+            self.runtime_std = float(runtimes.std())
+            self.runtime_median, *self.runtime_percentiles = \
+                np.percentile(runtimes, (50,) + PROBE_RUNTIME_PERCENTILES).tolist()
+            self.runtime_jitter = float(np.abs(np.diff(runtimes)).mean()) if len(runtimes) > 1 else 0.0
+            lowest = max(self.runtime_min[2], 1)
+            highest = max(self.runtime_max[2], 2 * lowest)
+            self.runtime_histogram = np.histogram(np.clip(runtimes, lowest, highest),
+                                                  bins=np.geomspace(lowest, highest, PROBE_HISTOGRAM_BINS + 1))
         else:
             self.runtime_min = 'no Data'
             self.runtime_max = 'no Data'
             self.runtime_avg = 'no Data'
             self.runtime_median = 'no Data'
+            self.runtime_std = 'no Data'
+            self.runtime_percentiles = ['no Data'] * len(PROBE_RUNTIME_PERCENTILES)
+            self.runtime_jitter = 'no Data'
+            self.runtime_histogram = (np.zeros(0, dtype=np.int64), np.zeros(1))
 
 
     def get_probe_table_entry(self):
@@ -218,7 +387,8 @@ class Probe:
                     event_sources = events['next_comm']
                 elif 'irq_source' in events.columns:
                     event_sources = events['irq_source']
-                event_comm_sources_filtered = event_sources.value_counts().to_dict()
+                event_counts = event_sources.value_counts()
+                event_comm_sources_filtered = event_counts[event_counts > 0].to_dict()
                 event_output=''
                 for key in event_comm_sources_filtered:
                     event_output+= key + ":" + str(event_comm_sources_filtered[key]) + '\n'
@@ -236,39 +406,50 @@ class Probe:
 
         if self.runtime_min == 'no Data' and self.runtime_max == 'no Data' and self.runtime_median == 'no Data':
             return [self.function, len(self.function_runtimes), self.runtime_min,self.runtime_max, self.runtime_median,
+                    self.runtime_avg, self.runtime_std, *self.runtime_percentiles, self.runtime_jitter,
                     str(len(self.csw_collision_events)), csw_output, csw_max_runtime_output, csw_min_runtime_output,
+                    'no Data',
                     str(len(self.irq_collision_events)), irq_output, irq_max_runtime_output, irq_min_runtime_output]
         else:
-            return [self.function, len(self.function_runtimes), round(self.runtime_min[2] * 1e3, 3),
-                    round(self.runtime_max[2] * 1e3, 3), round(self.runtime_median * 1e3, 3),
+            return [self.function, len(self.function_runtimes), round(self.runtime_min[2] / NS_PER_MS, 3),
+                    round(self.runtime_max[2] / NS_PER_MS, 3), round(self.runtime_median / NS_PER_MS, 3),
+                    round(self.runtime_avg / NS_PER_MS, 3), round(self.runtime_std / NS_PER_MS, 3),
+                    *[round(runtime / NS_PER_MS, 3) for runtime in self.runtime_percentiles],
+                    round(self.runtime_jitter / NS_PER_MS, 3),
                     str(len(self.csw_collision_events)), csw_output, csw_max_runtime_output, csw_min_runtime_output,
+                    round(self.preempted_time_max_runtime / NS_PER_MS, 3),
                     str(len(self.irq_collision_events)), irq_output, irq_max_runtime_output, irq_min_runtime_output]
 
     def evaluate_contextswitch_irq_collisions(self, sched_switch_df, irq_handler_entry_df):
-        if len(self.trace_data) != 0:
-            for runtime in self.function_runtimes:
-                self.csw_collision_events = self.csw_collision_events.append(sched_switch_df.loc[
-                    (sched_switch_df['timestamp'] < runtime[1]) &
-                    (sched_switch_df['timestamp'] > runtime[0])])
+        """
+        Preemptions of the probed thread and interrupts on the CPU it was running on during the function runtimes,
+        during the max and during the min runtime. The preempted time of each runtime is set as well.
+        :param sched_switch_df: Dataframe of sched_switch events
+        :param irq_handler_entry_df: Dataframe of irq_handler_entry events
+        """
+        if len(self.function_runtimes) != 0:
+            self.csw_collision_rows, csw_counts, self.irq_collision_rows, irq_counts, self.function_preempted_times = \
+                get_thread_collisions(sched_switch_df, irq_handler_entry_df, self.function_runtimes[:, 0],
+                                      self.function_runtimes[:, 1], self.function_tids, self.function_cpus)
+            self.csw_collision_events = sched_switch_df.iloc[self.csw_collision_rows]
+            self.irq_collision_events = irq_handler_entry_df.iloc[self.irq_collision_rows]
 
-                self.irq_collision_events=self.irq_collision_events.append(irq_handler_entry_df.loc[
-                        (irq_handler_entry_df['timestamp'] < runtime[1]) &
-                        (irq_handler_entry_df['timestamp'] > runtime[0])])
+            def get_runtime_rows(rows, counts, runtime_index):
+                """ Collision rows of a single runtime """
+                first = int(counts[:runtime_index].sum())
+                return rows[first:first + counts[runtime_index]]
 
             # Search for interrupts and context_switches at max runtime element
-            self.csw_collision_events_max_runtime = self.csw_collision_events_max_runtime.append(
-                sched_switch_df.loc[(sched_switch_df['timestamp'] < self.runtime_max[1]) &
-                                    (sched_switch_df['timestamp'] > self.runtime_max[0])])
-
-            self.irq_collision_events_max_runtime = self.irq_collision_events_max_runtime.append(
-                irq_handler_entry_df.loc[(irq_handler_entry_df['timestamp'] < self.runtime_max[1]) &
-                                         (irq_handler_entry_df['timestamp'] > self.runtime_max[0])])
+            max_index = int(np.argmax(self.function_runtimes[:, 2]))
+            self.csw_collision_events_max_runtime = sched_switch_df.iloc[
+                get_runtime_rows(self.csw_collision_rows, csw_counts, max_index)]
+            self.irq_collision_events_max_runtime = irq_handler_entry_df.iloc[
+                get_runtime_rows(self.irq_collision_rows, irq_counts, max_index)]
+            self.preempted_time_max_runtime = int(self.function_preempted_times[max_index])
 
             # Search for interrupts and context_switches at min runtime element
-            self.csw_collision_events_min_runtime = self.csw_collision_events_min_runtime.append(
-                sched_switch_df.loc[(sched_switch_df['timestamp'] < self.runtime_min[1]) &
-                                    (sched_switch_df['timestamp'] > self.runtime_min[0])])
-
-            self.irq_collision_events_min_runtime = self.irq_collision_events_min_runtime.append(
-                irq_handler_entry_df.loc[(irq_handler_entry_df['timestamp'] < self.runtime_min[1]) &
-                                         (irq_handler_entry_df['timestamp'] > self.runtime_min[0])])
+            min_index = int(np.argmin(self.function_runtimes[:, 2]))
+            self.csw_collision_events_min_runtime = sched_switch_df.iloc[
+                get_runtime_rows(self.csw_collision_rows, csw_counts, min_index)]
+            self.irq_collision_events_min_runtime = irq_handler_entry_df.iloc[
+                get_runtime_rows(self.irq_collision_rows, irq_counts, min_index)]
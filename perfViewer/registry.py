@@ -0,0 +1,36 @@
+"""
+perfViewer
+Module: registry
+Responsible: Brandtner Philipp
+Description:
+Registry of tasks and CPUs shared by the task, cpu and wakeup processing. Objects are looked up by a hash of their
+key instead of comparing them with every object in a list, iteration follows the insertion order.
+
+"""
+
+class Registry:
+    """
+    Registry of objects keyed by their constructor arguments, ex. Registry(Task) with the key (name, tid) or
+    Registry(CPU) with the key (cpu number,)
+    """
+    def __init__(self, object_class):
+        self.object_class = object_class
+        self.objects = dict()
+
+    def __iter__(self):
+        return iter(self.objects.values())
+
+    def __len__(self):
+        return len(self.objects)
+
+    def get(self, *key):
+        """ Return the object of key, a new object is created and registered if there is none """
+        registered_object = self.objects.get(key)
+        if registered_object is None:
+            registered_object = self.object_class(*key)
+            self.objects[key] = registered_object
+        return registered_object
+
+    def to_list(self):
+        """ Return the objects as list in insertion order """
+        return list(self.objects.values())
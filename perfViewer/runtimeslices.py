@@ -0,0 +1,52 @@
+"""
+perfViewer
+Module: runtimeslices
+Responsible: Brandtner Philipp
+Description:
+Runtime slices of tasks and CPUs stored in a growable numpy structured array. Each slice takes 24 bytes: start and
+duration in nanoseconds, cpu and tid of the task.
+
+"""
+
+import numpy as np
+
+RUNTIME_SLICE_DTYPE = np.dtype([('start', np.int64), ('duration', np.int64), ('cpu', np.int32), ('tid', np.int32)])
+
+class RuntimeSlices:
+    """ Growable array of runtime slices, the capacity is doubled when it is exceeded """
+    __slots__ = ('data', 'length')
+
+    def __init__(self, capacity=16):
+        self.data = np.empty(capacity, dtype=RUNTIME_SLICE_DTYPE)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def reserve(self, count):
+        """ Make room for count more slices """
+        if self.length + count > len(self.data):
+            data = np.empty(max(2 * len(self.data), self.length + count), dtype=RUNTIME_SLICE_DTYPE)
+            data[:self.length] = self.data[:self.length]
+            self.data = data
+
+    def extend(self, start, duration, cpu, tid):
+        """ Append slices from arrays of start, duration, cpu and tid """
+        count = len(start)
+        self.reserve(count)
+        block = self.data[self.length:self.length + count]
+        block['start'] = start
+        block['duration'] = duration
+        block['cpu'] = cpu
+        block['tid'] = tid
+        self.length += count
+
+    def extend_slices(self, slices):
+        """ Append slices from a structured array of RUNTIME_SLICE_DTYPE """
+        self.reserve(len(slices))
+        self.data[self.length:self.length + len(slices)] = slices
+        self.length += len(slices)
+
+    def view(self):
+        """ Return the slices as structured array, a view without copy """
+        return self.data[:self.length]
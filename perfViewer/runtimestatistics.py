@@ -0,0 +1,98 @@
+"""
+perfViewer
+Module: runtimestatistics
+Responsible: Brandtner Philipp
+Description:
+Online statistics of runtime durations: count, sum, minimum, maximum and a log-linear histogram for quantiles.
+Statistics are updated as runtime slices arrive and can be merged, ex. the statistics of separate records of the
+same task.
+
+Histogram: durations below 2 * HISTOGRAM_SUB_BUCKETS ns have a bucket each. Above, each power of two is split into
+HISTOGRAM_SUB_BUCKETS buckets, the relative error of a quantile is below 1 / HISTOGRAM_SUB_BUCKETS.
+
+"""
+
+import numpy as np
+
+HISTOGRAM_SUB_BUCKET_BITS = 5
+HISTOGRAM_SUB_BUCKETS = 1 << HISTOGRAM_SUB_BUCKET_BITS
+
+def get_histogram_buckets(durations):
+    """
+    Histogram bucket of durations
+    :param durations: numpy array of durations in nanoseconds, negative durations are counted in bucket 0
+    :return: numpy array of bucket indices
+    """
+    durations = np.maximum(np.asarray(durations, dtype=np.int64), 0)
+    _, exponents = np.frexp(durations.astype(np.float64))
+    shifts = np.maximum(exponents.astype(np.int64) - HISTOGRAM_SUB_BUCKET_BITS - 1, 0)
+    # Durations above 2^53 may be rounded up to the next power of two by the float conversion
+    shifts -= (shifts > 0) & ((durations >> shifts) < HISTOGRAM_SUB_BUCKETS)
+    return HISTOGRAM_SUB_BUCKETS * shifts + (durations >> shifts)
+
+def get_histogram_bucket_range(buckets):
+    """
+    Range of durations of histogram buckets
+    :param buckets: numpy array of bucket indices
+    :return: numpy arrays of lowest and highest duration in nanoseconds of the buckets
+    """
+    buckets = np.asarray(buckets, dtype=np.int64)
+    shifts = np.maximum(buckets // HISTOGRAM_SUB_BUCKETS - 1, 0)
+    lowest = (buckets - HISTOGRAM_SUB_BUCKETS * shifts) << shifts
+    return lowest, lowest + (np.int64(1) << shifts) - 1
+
+class RuntimeStatistics:
+    """ Online statistics of runtime durations in nanoseconds """
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self.histogram = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return self.count
+
+    def add_durations(self, durations):
+        """ Add a numpy array of durations """
+        if len(durations) == 0:
+            return
+        batch = RuntimeStatistics()
+        batch.count = len(durations)
+        batch.total = int(durations.sum())
+        batch.minimum = int(durations.min())
+        batch.maximum = int(durations.max())
+        batch.add_to_histogram(np.bincount(get_histogram_buckets(durations)))
+        self.merge(batch)
+
+    def add_to_histogram(self, counts):
+        """ Add counts per bucket to histogram, histogram grows to the highest bucket """
+        if len(counts) > len(self.histogram):
+            self.histogram = np.concatenate((self.histogram, np.zeros(len(counts) - len(self.histogram),
+                                                                      dtype=np.int64)))
+        self.histogram[:len(counts)] += counts
+
+    def merge(self, other):
+        """ Merge statistics of other into this statistics """
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+        self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        self.add_to_histogram(other.histogram)
+
+    def get_quantile(self, quantile):
+        """
+        Quantile of the durations from the histogram, exact below 2 * HISTOGRAM_SUB_BUCKETS ns
+        :param quantile: Quantile between 0 and 1, ex. 0.99
+        :return: Duration in nanoseconds, None without durations
+        """
+        if self.count == 0:
+            return None
+        rank = max(int(np.ceil(quantile * self.count)), 1)
+        bucket = int(np.searchsorted(np.cumsum(self.histogram), rank))
+        lowest, highest = get_histogram_bucket_range([bucket])
+        return min(max((int(lowest[0]) + int(highest[0])) // 2, self.minimum), self.maximum)
@@ -9,6 +9,7 @@ import time
 import paramiko
 from paramiko import SSHClient
 from scp import SCPClient
+from symbolindex import SymbolIndex
 from os import sys
 import subprocess
 
@@ -107,7 +108,8 @@ class SSHSCPCommander:
             sys.exit()
 
 
-    def load_files_with_probes(self, pid, perf_record_seconds, probes_list, perf_export_dir, local_executables, max_probe_function_len):
+    def load_files_with_probes(self, pid, perf_record_seconds, probes_list, perf_export_dir, local_executables, max_probe_function_len,
+                               per_event_dump=True):
         command_directory = 'cd ../../tmp \n'
         if pid is None:
             command_sched_record = "perf record -e sched:* -e irq:* -e power:cpu_idle"
@@ -155,8 +157,15 @@ class SSHSCPCommander:
                     command_sched_record += " -e probe_" + probe.executable + ":*"
         command_sched_record += " --exclude-perf " + "\n"
 
+        # Symbol table of each executable is read once for all of its probes
+        symbol_indexes = dict()
+        for probe in probes_list:
+            executable = probe.get_local_executable(perf_export_dir)
+            if executable not in symbol_indexes:
+                symbol_indexes[executable] = SymbolIndex(executable)
+            probe.mangle_function_name(symbol_indexes[executable])
+
         for probe in probes_list:
-            probe.mangle_function_name(perf_export_dir)
             probe.create_probe_command('address', max_probe_function_len)
 
             # Send command for function entry
@@ -181,14 +190,15 @@ class SSHSCPCommander:
         try:
             print("Starting download of perf files")
             self.scp_client.get('../../tmp/perf.data', perf_export_dir)
-            command = 'cd ' + perf_export_dir + '; ../perfViewer/perf script --per-event-dump <<< :q'
-            subprocess.run(command, shell=True, executable='/bin/bash')
+            if per_event_dump:
+                command = 'cd ' + perf_export_dir + '; ../perfViewer/perf script --per-event-dump <<< :q'
+                subprocess.run(command, shell=True, executable='/bin/bash')
 
         except:
             print('Download of perf data failed...')
             sys.exit()
 
-    def load_files_without_probes(self, pid, perf_record_seconds, perf_export_dir):
+    def load_files_without_probes(self, pid, perf_record_seconds, perf_export_dir, per_event_dump=True):
         print('Starting file download without probes')
         command_directory = 'cd ../../tmp \n'
         if pid is None:
@@ -211,8 +221,9 @@ class SSHSCPCommander:
 
         try:
             self.scp_client.get('../../tmp/perf.data', perf_export_dir)
-            command = 'cd ' + perf_export_dir + '; ../perfViewer/perf script --per-event-dump <<< :q'
-            subprocess.run(command, shell=True, executable='/bin/bash')
+            if per_event_dump:
+                command = 'cd ' + perf_export_dir + '; ../perfViewer/perf script --per-event-dump <<< :q'
+                subprocess.run(command, shell=True, executable='/bin/bash')
         except:
             print('Error: Download of perf data failed')
             sys.exit()
@@ -0,0 +1,140 @@
+"""
+perfViewer
+Module: symbolindex
+Responsible: Brandtner Philipp
+Description:
+Function symbols of an executable for the perf probes. The symbol table is read with one readelf call and all names
+are demangled with one c++filt call, probes are resolved from a dictionary by qualified name and signature.
+
+"""
+
+import re
+import subprocess
+
+def split_demangled_name(demangled):
+    """
+    Split a demangled function name into qualified name and signature
+    Ex. 'ns::Class::run(int, double) const' -> ('ns::Class::run', '(int, double) const')
+    :param demangled: Demangled name
+    :return: qualified name, signature ('' for names without argument list, ex. C functions)
+    """
+    end = demangled.rfind(')')
+    if end == -1:
+        return demangled, ''
+    # Opening parenthesis of the argument list, argument types may contain parentheses as well
+    depth = 0
+    for start in range(end, -1, -1):
+        if demangled[start] == ')':
+            depth += 1
+        elif demangled[start] == '(':
+            depth -= 1
+            if depth == 0:
+                break
+    qualified = demangled[:start]
+    # Function templates are demangled with return type, ex. 'int ns::get<int>(int)'
+    depth = 0
+    for position in range(len(qualified) - 1, -1, -1):
+        if qualified[position] in '>)':
+            depth += 1
+        elif qualified[position] in '<(':
+            depth -= 1
+        elif qualified[position] == ' ' and depth == 0 and not qualified[:position].endswith('operator'):
+            qualified = qualified[position + 1:]
+            break
+    return qualified, demangled[start:]
+
+def run_tool(command, tool_input=None):
+    """
+    Run a binutils tool and return its output
+    :param command: Command line as list, ex. ['readelf', '-sW', executable]
+    :param tool_input: Text passed to the standard input of the tool
+    :return: Standard output of the tool, None if the tool failed
+    """
+    try:
+        proc = subprocess.run(command, input=tool_input, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True)
+    except OSError as err:
+        print("OS error: {0}".format(err))
+        return None
+    if proc.returncode != 0:
+        print("Error: " + ' '.join(command) + " failed: " + proc.stderr.strip())
+        return None
+    return proc.stdout
+
+def normalize_signature(signature):
+    """ Signature without whitespace for comparisons, ex. '(int, double) const' -> '(int,double)const' """
+    return re.sub(r'\s+', '', signature)
+
+class SymbolIndex:
+    """ Function symbols of an executable by qualified name and signature """
+    __slots__ = ('symbols', 'signatures')
+
+    def __init__(self, executable):
+        """
+        :param executable: Path to the executable
+        """
+        self.symbols = dict()     # (qualified name, signature): (mangled name, address)
+        self.signatures = dict()  # qualified name: list of signatures
+
+        symbol_table = run_tool(['readelf', '-sW', executable])
+        if symbol_table is None:
+            return
+        functions = dict()
+        for line in symbol_table.splitlines():
+            # Num: Value Size Type Bind Vis Ndx Name
+            fields = line.split()
+            if len(fields) < 8 or not fields[0].endswith(':') or fields[3] != 'FUNC' or fields[6] == 'UND':
+                continue
+            mangled = fields[-1].split('@')[0]
+            functions.setdefault(mangled, fields[1])
+        if len(functions) == 0:
+            return
+
+        mangled_names = list(functions)
+        demangled_names = run_tool(['c++filt'], '\n'.join(mangled_names) + '\n')
+        if demangled_names is None:
+            return
+        demangled_names = demangled_names.splitlines()
+        if len(demangled_names) != len(mangled_names):
+            print("Error: c++filt returned " + str(len(demangled_names)) + " names for " + str(len(mangled_names)) +
+                  " symbols of " + executable)
+            return
+        for mangled, demangled in zip(mangled_names, demangled_names):
+            # Thunks and clones (ex. '.cold' parts) are not the entry of the function
+            if ' thunk to ' in demangled or ' [clone ' in demangled:
+                continue
+            qualified, signature = split_demangled_name(demangled)
+            if (qualified, signature) not in self.symbols:
+                self.symbols[(qualified, signature)] = (mangled, functions[mangled])
+                self.signatures.setdefault(qualified, []).append(signature)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def get(self, qualified, signature):
+        """ Return (mangled name, address) of a function, None if there is no such function """
+        return self.symbols.get((qualified, signature))
+
+    def find(self, namespace, function, arguments=None):
+        """
+        Find the functions of a probe
+        :param namespace: Namespace or class of the function, '' for functions without namespace
+        :param function: Name of the function
+        :param arguments: Argument list of the function without parentheses, None to find all overloads
+        :return: List of (qualified name, signature) keys
+        """
+        name = namespace + '::' + function if namespace != '' else function
+        keys = [(name, signature) for signature in self.signatures.get(name, [])]
+        if len(keys) == 0:
+            # Instances of function templates, ex. get<int> of get. The namespace of the probe may be the innermost
+            # of the function, ex. Class of ns::Class::run
+            keys = [(qualified, signature) for qualified in self.signatures
+                    if re.sub('<.*>$', '', qualified) == name or
+                    (namespace != '' and re.sub('<.*>$', '', qualified).endswith('::' + name))
+                    for signature in self.signatures[qualified]]
+        if arguments is not None:
+            matching = [key for key in keys
+                        if normalize_signature(key[1]).startswith('(' + normalize_signature(arguments) + ')')]
+            if len(matching) > 0:
+                keys = matching
+        return keys
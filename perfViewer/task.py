@@ -4,7 +4,13 @@ Module: Task
 Responsible: Brandtner Philipp
 """
 
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from registry import Registry
+from runtimeslices import RuntimeSlices
+from runtimestatistics import RuntimeStatistics
+from timestamps import NS_PER_MS
 
 def import_pid_from_file(tasks_list, tid_pid_mapping):
     """
@@ -40,147 +46,319 @@ def get_pid_from_target(tasks_list, ssh_scp_commander):
     return tasks_list
 
 
-def process_task_runtime(scheduler_irq_tracing_files):
+# Events which interrupt the running task, mapped to the event which ends the interruption
+INTERRUPTING_EVENTS = {'sched:sched_waking': 'sched:sched_wakeup',
+                       'irq:softirq_raise': 'irq:softirq_exit',
+                       'irq:irq_handler_entry': 'irq:irq_handler_exit',
+                       'power:cpu_idle': 'power:cpu_idle'}
+
+def process_task_runtime(scheduler_irq_tracing_files, task_registry=None, jobs=1, executor=None):
     """
     Routine to calculate runtime of tasks from perf dump files.
-    :param scheduler_irq_tracing_files: Dictonary of files
-    :param ssh_scp_commander: Instance of ssh_scp_commander to download files
+    :param scheduler_irq_tracing_files: Dictonary of files. If it contains a PERF_EVENT_STREAM, the events are consumed
+                                        chunk by chunk from the stream instead of the imported dataframes
+    :param task_registry: Registry of tasks keyed by (name, tid), new tasks are added to it
+    :param jobs: Number of worker processes to reconstruct the runtime elements of the CPUs concurrently
+    :param executor: Process pool with jobs workers, ex. the pool of the dump file import. None to create one for
+                     jobs > 1
     :return: List of tasks
     """
-    tasks_list = []
-    sched_migrate_df = scheduler_irq_tracing_files["SCHED_MIGRATE_DF"]
-    sched_runtime_df = scheduler_irq_tracing_files["SCHED_RUNTIME_DF"]
-    sched_switch_df = scheduler_irq_tracing_files["SCHED_SWITCH_DF"]
-    sched_wakeup_df = scheduler_irq_tracing_files["SCHED_WAKEUP_DF"]
-    sched_waking_df = scheduler_irq_tracing_files["SCHED_WAKING_DF"]
-    irq_handler_entry_df = scheduler_irq_tracing_files['IRQ_HANDLER_ENTRY_DF']
-    irq_handler_exit_df = scheduler_irq_tracing_files['IRQ_HANDLER_EXIT_DF']
-    cpu_idle_df = scheduler_irq_tracing_files['CPU_IDLE_DF']
-
-    perf_data_df = pd.concat([sched_migrate_df, sched_runtime_df, sched_switch_df, sched_wakeup_df, sched_waking_df,
-                              irq_handler_entry_df, irq_handler_exit_df, cpu_idle_df], ignore_index=True)
-    perf_data_df = perf_data_df.sort_values('timestamp')
-
-    perf_data_df = perf_data_df.reset_index(drop=True)
-    # process all perf events
-    i = 0
-
-    while i < len(perf_data_df):
-        entry_i = perf_data_df.iloc[i]
-        entry_i_event = entry_i['event']
-
-        if entry_i_event == 'sched:sched_switch':
-            runtime_correction = 0
-            k = i + 1
-            while k < len(perf_data_df):
-                entry_k = perf_data_df.iloc[k]
-                entry_k_event = entry_k['event']
-
-                if entry_k_event == 'sched:sched_stat_runtime':
-                    newtask = Task(entry_k['task'], entry_k['tid'])
-                    if newtask not in tasks_list:
-                        tasks_list.append(newtask)
-                    index = tasks_list.index(newtask)
-
-                    tasks_list[index].set_task_runtime(entry_k['timestamp'], entry_k['timestamp'] + entry_k['runtime'] * 1e-9,
-                                                       entry_k['cpu'])
-                    while perf_data_df.iloc[k]['event'] != 'sched:sched_switch':
-                        k += 1
-                    i = k-1
-                    break
-
-                elif entry_k_event == 'sched:sched_waking':
-                    x = k + 1
-                    while True:
-                        entry_x = perf_data_df.iloc[x]
-                        entry_x_event = entry_x['event']
-
-                        if entry_x_event == 'sched:sched_wakeup':
-                            runtime_correction += entry_x['timestamp'] - entry_k['timestamp']
-                            k = x + 1
-                            break
-                        x += 1
-
-                elif entry_k_event == 'irq:softirq_raise':
-                    x = k + 1
-                    while True:
-                        entry_x = perf_data_df.iloc[x]
-                        entry_x_event = entry_x['event']
-
-                        if entry_x_event == 'irq:softirq_exit':
-                            runtime_correction += entry_x['timestamp'] - entry_k['timestamp']
-                            k = x + 1
-                            break
-                        x += 1
-
-                elif entry_k_event == 'irq:irq_handler_entry':
-                    x = k + 1
-                    while True:
-                        entry_x = perf_data_df.iloc[x]
-                        entry_x_event = entry_x['event']
-
-                        if entry_x_event == 'irq:irq_handler_exit':
-                            runtime_correction += entry_x['timestamp'] - entry_k['timestamp']
-                            k = x + 1
-                            break
-                        x += 1
-
-                elif entry_k_event == 'power:cpu_idle':
-                    x = k + 1
-                    while True:
-                        entry_x = perf_data_df.iloc[x]
-                        entry_x_event = entry_x['event']
-
-                        if entry_x_event == 'power:cpu_idle':
-                            runtime_correction += entry_x['timestamp'] - entry_k['timestamp']
-                            k = x + 1
-                            break
-                        x += 1
-
-                elif entry_k_event == 'sched:sched_switch':
-                    newtask = Task(entry_k['task'], entry_k['tid'])
-                    if newtask not in tasks_list:
-                        tasks_list.append(newtask)
-                    index = tasks_list.index(newtask)
-
-                    tasks_list[index].set_task_runtime(entry_i['timestamp'],
-                                                       entry_k['timestamp'] - runtime_correction,
-                                                       entry_i['cpu'])
-                    i = k-1
-                    break
-
-        elif entry_i_event == 'sched:sched_stat_runtime':
-            newtask = Task(entry_i['task'], entry_i['tid'])
-            if newtask not in tasks_list:
-                tasks_list.append(newtask)
-            index = tasks_list.index(newtask)
-
-            tasks_list[index].set_task_runtime(entry_i['timestamp'], entry_i['timestamp'] + entry_i['runtime'] * 1e-9,
-                                              entry_i['cpu'])
-        i+=1
-    return tasks_list
-
-def process_sched_wakeup_list_for_tasks(sched_wakeup_df, tasks_list):
-    """ Extracts task data from sched:wakeup event """
-    for item_index, item in sched_wakeup_df.iterrows():
-        newtask = Task(item['comm'], item['pid'])
+    if "PERF_EVENT_STREAM" in scheduler_irq_tracing_files:
+        perf_data_chunks = scheduler_irq_tracing_files["PERF_EVENT_STREAM"]()
+    else:
+        sched_migrate_df = scheduler_irq_tracing_files["SCHED_MIGRATE_DF"]
+        sched_runtime_df = scheduler_irq_tracing_files["SCHED_RUNTIME_DF"]
+        sched_switch_df = scheduler_irq_tracing_files["SCHED_SWITCH_DF"]
+        sched_wakeup_df = scheduler_irq_tracing_files["SCHED_WAKEUP_DF"]
+        sched_waking_df = scheduler_irq_tracing_files["SCHED_WAKING_DF"]
+        irq_handler_entry_df = scheduler_irq_tracing_files['IRQ_HANDLER_ENTRY_DF']
+        irq_handler_exit_df = scheduler_irq_tracing_files['IRQ_HANDLER_EXIT_DF']
+        cpu_idle_df = scheduler_irq_tracing_files['CPU_IDLE_DF']
+
+        perf_data_df = pd.concat([sched_migrate_df, sched_runtime_df, sched_switch_df, sched_wakeup_df,
+                                  sched_waking_df, irq_handler_entry_df, irq_handler_exit_df, cpu_idle_df],
+                                 ignore_index=True)
+        perf_data_df = perf_data_df.sort_values('timestamp', kind='mergesort')
+        perf_data_chunks = [perf_data_df]
+
+    return process_perf_events(perf_data_chunks, task_registry, jobs, executor)
+
+def process_perf_events(perf_data_chunks, task_registry=None, jobs=1, executor=None):
+    """
+    Calculate runtime of tasks from perf events sorted by timestamp. Timestamps and runtimes are integer nanoseconds.
+    The runtime elements are reconstructed per chunk with reconstruct_runtime_slices. The events of runtime elements
+    which are still open at the end of a chunk are carried over to the next chunk.
+    :param perf_data_chunks: Iterable of pandas dataframes of events, sorted by timestamp over all chunks
+    :param task_registry: Registry of tasks keyed by (name, tid), new tasks are added to it
+    :param jobs: Number of worker processes. With jobs > 1 the events are partitioned by CPU and the partitions are
+                 reconstructed concurrently on a process pool (see reconstruct_runtime_slices_per_cpu)
+    :param executor: Process pool with jobs workers, None to create one for jobs > 1
+    :return: List of tasks
+    """
+    if task_registry is None:
+        task_registry = Registry(Task)
+    own_executor = executor is None and jobs > 1
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        process_perf_event_chunks(perf_data_chunks, task_registry, executor, jobs)
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return task_registry.to_list()
+
+def process_perf_event_chunks(perf_data_chunks, task_registry, executor, partitions):
+    """
+    Reconstruct the runtime elements of the chunks and add them to the tasks of task_registry
+    :param perf_data_chunks: Iterable of pandas dataframes of events, sorted by timestamp over all chunks
+    :param task_registry: Registry of tasks keyed by (name, tid), new tasks are added to it
+    :param executor: Process pool to reconstruct the CPU partitions on, None to reconstruct in this process
+    :param partitions: Number of CPU partitions submitted to executor
+    """
 
-        if newtask not in tasks_list:
-            tasks_list.append(newtask)
-        index = tasks_list.index(newtask)
-        tasks_list[index].inc_number_of_wakeup()
+    pending_events = None       # events of the runtime elements still open at the end of the previous chunk
+    skipping_cpus = set()       # CPUs whose runtime element was already reported by sched_stat_runtime
+    sequence = 0
+
+    for perf_data_df in perf_data_chunks:
+        # Events and task names are compared by their codes in the string table of the chunk. The string table
+        # only grows between chunks, so the codes of carried over events stay valid.
+        event_codes = {event: code for code, event in enumerate(perf_data_df['event'].cat.categories)}
+        task_names = perf_data_df['task'].cat.categories.tolist()
+        interrupting_codes = {event_codes[event]: event_codes.get(end_event, -2)
+                              for event, end_event in INTERRUPTING_EVENTS.items() if event in event_codes}
+
+        events = dict()
+        events['event'] = perf_data_df['event'].cat.codes.to_numpy()
+        events['task'] = perf_data_df['task'].cat.codes.to_numpy()
+        events['tid'] = perf_data_df['tid'].to_numpy()
+        events['cpu'] = perf_data_df['cpu'].to_numpy()
+        events['timestamp'] = perf_data_df['timestamp'].to_numpy()
+        if 'runtime' in perf_data_df.columns:
+            events['runtime'] = perf_data_df['runtime'].fillna(0).to_numpy(dtype=np.int64)
+        else:
+            events['runtime'] = np.zeros(len(perf_data_df), dtype=np.int64)
+        events['sequence'] = np.arange(sequence, sequence + len(perf_data_df))
+        sequence += len(perf_data_df)
+        if pending_events is not None:
+            events = {name: np.concatenate((pending_events[name], values)) for name, values in events.items()}
+
+        if executor is None:
+            runtime_elements, pending, skipping_cpus = reconstruct_runtime_slices(
+                events, event_codes.get('sched:sched_switch', -2), event_codes.get('sched:sched_stat_runtime', -2),
+                interrupting_codes, skipping_cpus)
+        else:
+            runtime_elements, pending, skipping_cpus = reconstruct_runtime_slices_per_cpu(
+                executor, partitions, events, event_codes.get('sched:sched_switch', -2),
+                event_codes.get('sched:sched_stat_runtime', -2), interrupting_codes, skipping_cpus)
+        pending_events = {name: values[pending] for name, values in events.items()}
+
+        # Runtime elements are added per task, tasks in order of their first runtime element
+        task_keys = (runtime_elements['task'].astype(np.int64) << 32) | runtime_elements['tid'].astype(np.uint32)
+        _, first_elements, task_indices, task_counts = np.unique(task_keys, return_index=True, return_inverse=True,
+                                                                 return_counts=True)
+        elements_by_task = np.argsort(task_indices.reshape(-1), kind='stable')
+        task_ends = np.cumsum(task_counts)
+        for key_index in np.argsort(first_elements).tolist():
+            elements = elements_by_task[task_ends[key_index] - task_counts[key_index]:task_ends[key_index]]
+            first_element = first_elements[key_index]
+            task_registry.get(task_names[runtime_elements['task'][first_element]],
+                              int(runtime_elements['tid'][first_element])).add_task_runtimes(
+                runtime_elements['start'][elements], runtime_elements['stop'][elements],
+                runtime_elements['cpu'][elements])
+
+def reconstruct_runtime_slices_per_cpu(executor, partitions, events, switch_code, runtime_code, interrupting_codes,
+                                       skipping_cpus=frozenset()):
+    """
+    Reconstruct the runtime elements with reconstruct_runtime_slices on a process pool. Events on a CPU only affect
+    the runtime elements of this CPU, so the events are partitioned by cpu modulo partitions, each partition is
+    reconstructed by a worker and the results are merged in order of the reporting events.
+    :param executor: Process pool
+    :param partitions: Number of CPU partitions
+    :param events: Dictionary of numpy arrays event, task, tid, cpu, timestamp, runtime and sequence of events sorted
+                   by timestamp
+    :param switch_code: Code of sched:sched_switch
+    :param runtime_code: Code of sched:sched_stat_runtime
+    :param interrupting_codes: Dictionary of interrupting event code: end event code
+    :param skipping_cpus: CPUs which ignore their events up to the next sched_switch
+    :return: Same as reconstruct_runtime_slices
+    """
+    cpu_partition = events['cpu'] % partitions
+    submitted = []
+    next_skipping_cpus = set()
+    for partition in range(partitions):
+        partition_skipping_cpus = {cpu for cpu in skipping_cpus if cpu % partitions == partition}
+        selected = np.flatnonzero(cpu_partition == partition)
+        if len(selected) == 0:
+            next_skipping_cpus.update(partition_skipping_cpus)
+            continue
+        partition_events = {name: values[selected] for name, values in events.items()}
+        submitted.append((selected, executor.submit(reconstruct_runtime_slices, partition_events, switch_code,
+                                                    runtime_code, interrupting_codes, partition_skipping_cpus)))
+
+    results = []
+    pending = []
+    for selected, future in submitted:
+        partition_elements, partition_pending, partition_skipping_cpus = future.result()
+        results.append(partition_elements)
+        pending.append(selected[partition_pending])
+        next_skipping_cpus.update(partition_skipping_cpus)
+
+    if not results:
+        return reconstruct_runtime_slices(events, switch_code, runtime_code, interrupting_codes, skipping_cpus)
+    runtime_elements = {name: np.concatenate([elements[name] for elements in results]) for name in results[0]}
+    reporting_order = np.argsort(runtime_elements['sequence'], kind='stable')
+    runtime_elements = {name: values[reporting_order] for name, values in runtime_elements.items()}
+    pending = np.sort(np.concatenate(pending))
+
+    return runtime_elements, pending, next_skipping_cpus
+
+def reconstruct_runtime_slices(events, switch_code, runtime_code, interrupting_codes, skipping_cpus=frozenset()):
+    """
+    Reconstruct the runtime elements of tasks independently per CPU:
+    - A runtime element starts at a sched_switch and ends at the following sched_switch of the CPU. It belongs to the
+      task switched out by the later sched_switch.
+    - The intervals from an interrupting event (INTERRUPTING_EVENTS) to its end event are subtracted, events within
+      an interruption are ignored.
+    - If a sched_stat_runtime event is reported before the following sched_switch, its runtime is used instead and
+      the events up to the next sched_switch are ignored. Before the first sched_switch of a CPU sched_stat_runtime
+      events are used directly.
+    The events are grouped per CPU and the interruption chains are resolved with pointer jumping on numpy arrays.
+    Only the chain of sched_switch events which start a runtime element is followed in Python.
+    :param events: Dictionary of numpy arrays event, task, tid, cpu, timestamp, runtime and sequence of events sorted
+                   by timestamp. Event and task are codes of the string table.
+    :param switch_code: Code of sched:sched_switch
+    :param runtime_code: Code of sched:sched_stat_runtime
+    :param interrupting_codes: Dictionary of interrupting event code: end event code
+    :param skipping_cpus: CPUs which ignore their events up to the next sched_switch
+    :return: Runtime elements as dictionary of numpy arrays task, tid, start, stop, cpu and sequence of the reporting
+             event in order of the reporting events, indices of the events of runtime elements which are not
+             finished, CPUs which ignore the events of the next chunk up to the next sched_switch
+    """
+    order = np.argsort(events['cpu'], kind='stable')
+    event = events['event'][order]
+    cpu = events['cpu'][order].astype(np.int64)
+    timestamp = events['timestamp'][order]
+    n = len(order)
+
+    # Index n marks a missing event, arrays indexed with it are extended by one element
+    cpu_ext = np.append(cpu, -1)
+    is_switch = np.append(event == switch_code, False)
+    is_runtime = np.append(event == runtime_code, False)
+    is_interrupting = np.append(np.isin(event, list(interrupting_codes)), False)
+
+    def find_next(candidates, start, start_cpu):
+        """ First index of sorted candidates at or after start on start_cpu, n if there is none """
+        found = np.append(candidates, n)[np.searchsorted(candidates, start)]
+        return np.where(cpu_ext[found] == start_cpu, found, n)
+
+    # Each interruption jumps to the next event which is not ignored, chains of interruptions are followed by pointer
+    # jumping until the jump target is no interruption. The correction sums up the interrupted time.
+    decisions = np.flatnonzero(is_switch | is_runtime | is_interrupting)
+    interruptions = np.flatnonzero(is_interrupting)
+    interruption_end = np.full(len(interruptions), n)
+    for interrupting_code, end_code in interrupting_codes.items():
+        selected = event[interruptions] == interrupting_code
+        interruption_end[selected] = find_next(np.flatnonzero(event == end_code), interruptions[selected] + 1,
+                                               cpu[interruptions[selected]])
+    ended = interruption_end < n
+    jump = np.full(n + 1, n)
+    correction = np.zeros(n + 1, dtype=np.int64)
+    jump[interruptions[ended]] = find_next(decisions, interruption_end[ended] + 1, cpu[interruptions[ended]])
+    correction[interruptions[ended]] = timestamp[interruption_end[ended]] - timestamp[interruptions[ended]]
+    chained = interruptions[is_interrupting[jump[interruptions]]]
+    while len(chained):
+        correction[chained] += correction[jump[chained]]
+        jump[chained] = jump[jump[chained]]
+        chained = chained[is_interrupting[jump[chained]]]
+
+    # Event which ends the runtime element started by each sched_switch and the next sched_switch starting one
+    switches = np.flatnonzero(is_switch)
+    first_decision = find_next(decisions, switches + 1, cpu[switches])
+    interrupted = is_interrupting[first_decision]
+    element_end = np.where(interrupted, jump[first_decision], first_decision)
+    element_correction = np.where(interrupted, correction[first_decision], 0)
+    ends_with_switch = is_switch[element_end]
+    ends_with_runtime = is_runtime[element_end]
+    next_start = np.where(ends_with_runtime, find_next(switches, element_end + 1, cpu_ext[element_end]), element_end)
+    next_node = np.searchsorted(switches, next_start).tolist()
+
+    # Follow the chain from the first sched_switch of each CPU
+    first_nodes = np.flatnonzero(np.diff(cpu[switches], prepend=-1) != 0).tolist()
+    chain = []
+    last_nodes = []
+    for node in first_nodes:
+        while node < len(switches):
+            chain.append(node)
+            last_node, node = node, next_node[node]
+        last_nodes.append(last_node)
+    in_chain = np.zeros(len(switches), dtype=bool)
+    in_chain[chain] = True
+
+    # sched_stat_runtime events before the first sched_switch of their CPU
+    runtimes = np.flatnonzero(is_runtime)
+    previous_switch = np.searchsorted(switches, runtimes) - 1
+    leading = (previous_switch < 0) | (cpu_ext[switches[np.maximum(previous_switch, 0)]] != cpu[runtimes]) \
+        if len(switches) else np.ones(len(runtimes), dtype=bool)
+    leading &= ~np.isin(cpu[runtimes], list(skipping_cpus))
+    runtimes = runtimes[leading]
+
+    by_switch = in_chain & ends_with_switch
+    by_runtime = in_chain & ends_with_runtime
+    reported = np.concatenate((element_end[by_switch], element_end[by_runtime], runtimes))
+    reporting_order = order[reported]
+    runtime = events['runtime'][reporting_order]
+    start = np.concatenate((timestamp[switches[by_switch]], timestamp[element_end[by_runtime]], timestamp[runtimes]))
+    stop = np.concatenate((timestamp[element_end[by_switch]] - element_correction[by_switch],
+                           start[by_switch.sum():] + runtime[by_switch.sum():]))
+    element_cpu = np.concatenate((cpu[switches[by_switch]], cpu[element_end[by_runtime]], cpu[runtimes]))
+
+    sorted_elements = np.argsort(events['sequence'][reporting_order], kind='stable')
+    runtime_elements = {'task': events['task'][reporting_order][sorted_elements],
+                        'tid': events['tid'][reporting_order][sorted_elements],
+                        'start': start[sorted_elements], 'stop': stop[sorted_elements],
+                        'cpu': element_cpu[sorted_elements],
+                        'sequence': events['sequence'][reporting_order][sorted_elements]}
+
+    # Events of open runtime elements are carried over, runtime elements reported by sched_stat_runtime skip the
+    # events up to the next sched_switch
+    pending = []
+    next_skipping_cpus = set(skipping_cpus).difference(cpu[switches].tolist())
+    for last_node in last_nodes:
+        if element_end[last_node] == n:
+            cpu_end = np.searchsorted(cpu, cpu[switches[last_node]], side='right')
+            pending.append(order[switches[last_node]:cpu_end])
+        elif ends_with_runtime[last_node]:
+            next_skipping_cpus.add(int(cpu[switches[last_node]]))
+    pending = np.sort(np.concatenate(pending)) if pending else np.empty(0, dtype=np.int64)
+
+    return runtime_elements, pending, next_skipping_cpus
+
+def process_sched_wakeup_list_for_tasks(sched_wakeup_df, task_registry):
+    """
+    Extracts task data from sched:wakeup event
+    :param sched_wakeup_df: Dataframe of sched_wakeup events
+    :param task_registry: Registry of tasks keyed by (name, tid), new tasks are added in order of their first wakeup
+    :return: List of tasks
+    """
+    wakeups = sched_wakeup_df.groupby(['comm', 'pid'], sort=False, observed=True, dropna=False).size()
+    for (task_name, task_number), number_of_wakeups in wakeups.items():
+        task_registry.get(task_name, int(task_number)).inc_number_of_wakeup(int(number_of_wakeups))
 
-    return tasks_list
+    return task_registry.to_list()
 
 class Task:
     """ Tasks Class """
+    __slots__ = ('name', 'number', 'pid', 'total_runtime', 'runtime', 'statistics', 'numberofwakeups')
+
     def __init__(self, task_name, task_number):
         self.name = task_name
         self.number = task_number
         self.pid = 0
         self.total_runtime = 0
-        self.runtime = []
-        self.cpu_to_runtime = []
+        self.runtime = RuntimeSlices()
+        self.statistics = RuntimeStatistics()
         self.numberofwakeups = 0
 
     def __eq__(self, other_task):
@@ -202,36 +380,41 @@ class Task:
         return self.pid
 
     def get_cpu_to_runtime(self):
-        """ Return CPUs of runtime data"""
-        return self.cpu_to_runtime
+        """ Return CPUs of runtime data, numpy view of the runtime slices """
+        return self.runtime.view()['cpu']
 
     def get_task_runtime(self):
-        """ Return runtime array of task"""
-        runtime_data = []
-        runtime_data.append([tuple(row) for row in self.runtime])
-        return runtime_data
+        """ Return runtime slices of task, numpy structured array view (start, duration, cpu, tid) """
+        return self.runtime.view()
+
+    def get_task_statistics(self):
+        """ Return online statistics of the runtime element durations """
+        return self.statistics
 
     def get_task_table_entry(self):
-        """ Return entry for task table """
-        if len(self.runtime)>0:
-            min_runtime = min(x[1] for x in self.runtime)
-            max_runtime = max(x[1] for x in self.runtime)
-            average_runtime = sum(x[1] for x in self.runtime)/len(self.runtime)
-            return [self.name, self.number, self.pid, round(self.total_runtime*1e3, 3),
-                round(min_runtime*1e3, 3), round(max_runtime*1e3, 3), round(average_runtime*1e3, 3)]
+        """ Return entry for task table, computed from the online statistics of the task """
+        if len(self.statistics)>0:
+            average_runtime = self.statistics.total/self.statistics.count
+            return [self.name, self.number, self.pid, round(self.total_runtime / NS_PER_MS, 3),
+                round(self.statistics.minimum / NS_PER_MS, 3), round(self.statistics.maximum / NS_PER_MS, 3),
+                round(average_runtime / NS_PER_MS, 3),
+                round(self.statistics.get_quantile(0.5) / NS_PER_MS, 3),
+                round(self.statistics.get_quantile(0.99) / NS_PER_MS, 3),
+                round(self.statistics.get_quantile(0.999) / NS_PER_MS, 3)]
         else:
-            return [self.name, self.number, self.pid, '-', '-', '-', '-']
+            return [self.name, self.number, self.pid, '-', '-', '-', '-', '-', '-', '-']
 
     def get_task_wakeup_table_entry(self):
         """ Returns entry for task wakeup table """
         return [self.name, self.number, self.pid, self.numberofwakeups]
 
-    def set_task_runtime(self, start_time, stop_time, cpu):
-        """  Add a runtime element to task """
-        self.runtime.append([start_time, stop_time-start_time])
-        self.cpu_to_runtime.append(cpu)
-        self.total_runtime += stop_time-start_time
+    def add_task_runtimes(self, start_times, stop_times, cpus):
+        """  Add runtime elements to task from numpy arrays, times in nanoseconds """
+        durations = stop_times - start_times
+        self.runtime.extend(start_times, durations, cpus, self.number)
+        self.statistics.add_durations(durations)
+        self.total_runtime += int(durations.sum())
 
-    def inc_number_of_wakeup(self):
+    def inc_number_of_wakeup(self, number_of_wakeups=1):
         """  Increment number of wakeups """
-        self.numberofwakeups += 1
+        self.numberofwakeups += number_of_wakeups
@@ -0,0 +1,180 @@
+"""
+perfViewer
+Module: timelinelod
+Responsible: Brandtner Philipp
+Description:
+Level of detail rendering of timeline plots with millions of runtime slices and events. Slices and points of a row
+are summarized once in multiple resolutions, each level merges slices with gaps below its resolution and keeps the
+first point per resolution bin. On xlim_changed and resize only the level matching the width of a pixel is drawn and
+only its visible part, the number of drawn bars and points is bound by the width of the axes in pixels.
+
+"""
+
+import numpy as np
+from timestamps import NS_PER_SECOND
+
+LOD_FINEST_RESOLUTION_BITS = 8     # resolution of the first summary level, 2^8 ns
+LOD_LEVEL_FACTOR_BITS = 1          # resolution factor between two summary levels, 2^1
+LOD_COARSEST_RESOLUTION_BITS = 44  # resolution of the last summary level, 2^44 ns ~ 4.9 h
+
+def get_lod_resolutions():
+    """ Resolutions of the summary levels in nanoseconds, level 0 are the unmerged slices or points """
+    return [0] + [1 << bits for bits in range(LOD_FINEST_RESOLUTION_BITS, LOD_COARSEST_RESOLUTION_BITS + 1,
+                                              LOD_LEVEL_FACTOR_BITS)]
+
+class SliceSummary:
+    """ Multi-resolution summary of the slices of one timeline row """
+    __slots__ = ('resolutions', 'starts', 'ends', 'max_ends')
+
+    def __init__(self, starts, durations):
+        """
+        :param starts: numpy array of slice starts in nanoseconds
+        :param durations: numpy array of slice durations in nanoseconds
+        """
+        order = np.argsort(starts, kind='stable')
+        starts = np.asarray(starts, dtype=np.int64)[order]
+        ends = starts + np.asarray(durations, dtype=np.int64)[order]
+        self.resolutions = []
+        self.starts = []
+        self.ends = []
+        self.max_ends = []
+        for resolution in get_lod_resolutions():
+            if resolution > 0 and len(starts) > 1:
+                # Each level is merged from the previous one, gaps only grow with merging
+                max_ends = self.max_ends[-1]
+                first = np.flatnonzero(np.concatenate(([True], starts[1:] - max_ends[:-1] >= resolution)))
+                if len(first) == len(starts):
+                    continue
+                starts = starts[first]
+                ends = np.maximum.reduceat(max_ends, first)
+            elif resolution > 0:
+                break
+            self.resolutions.append(resolution)
+            self.starts.append(starts)
+            self.ends.append(ends)
+            self.max_ends.append(np.maximum.accumulate(ends) if len(ends) > 0 else ends)
+
+    def get_bars(self, start, stop, pixel):
+        """
+        Merged slices between start and stop at the resolution of a pixel
+        :param start: Start of the visible range in nanoseconds
+        :param stop: End of the visible range in nanoseconds
+        :param pixel: Width of a pixel in nanoseconds
+        :return: numpy arrays of bar starts and ends in nanoseconds
+        """
+        level = max(int(np.searchsorted(self.resolutions, pixel, side='right')) - 1, 0)
+        first = int(np.searchsorted(self.max_ends[level], start, side='right'))
+        last = int(np.searchsorted(self.starts[level], stop, side='left'))
+        return self.starts[level][first:last], self.ends[level][first:last]
+
+class PointSummary:
+    """ Multi-resolution summary of points (time, y), the first point of each row and resolution bin is kept """
+    __slots__ = ('resolutions', 'times', 'yvalues')
+
+    def __init__(self, times, yvalues):
+        """
+        :param times: numpy array of point times in nanoseconds
+        :param yvalues: numpy array of the y value of each point, the row of the point
+        """
+        times = np.asarray(times, dtype=np.int64)
+        yvalues = np.asarray(yvalues)
+        order = np.lexsort((times, yvalues))
+        row_times = times[order]
+        row_yvalues = yvalues[order]
+        row_changes = np.concatenate(([True], row_yvalues[1:] != row_yvalues[:-1]))[:len(row_times)]
+        self.resolutions = []
+        self.times = []
+        self.yvalues = []
+        for resolution in get_lod_resolutions():
+            if resolution > 0:
+                # Points of a level are sorted by row and time, the first point of a bin is the first of its sub-bins
+                bins = row_times >> (resolution.bit_length() - 1)
+                keep = row_changes | np.concatenate(([True], bins[1:] != bins[:-1]))[:len(row_times)]
+                if keep.all():
+                    continue
+                row_times = row_times[keep]
+                row_yvalues = row_yvalues[keep]
+                row_changes = row_changes[keep]
+            time_order = np.argsort(row_times, kind='stable')
+            self.resolutions.append(resolution)
+            self.times.append(row_times[time_order])
+            self.yvalues.append(row_yvalues[time_order])
+            if row_changes.all():
+                break
+
+    def get_points(self, start, stop, pixel):
+        """
+        Points between start and stop with at most one point per row and pixel
+        :param start: Start of the visible range in nanoseconds
+        :param stop: End of the visible range in nanoseconds
+        :param pixel: Width of a pixel in nanoseconds
+        :return: numpy arrays of point times in nanoseconds and y values
+        """
+        level = max(int(np.searchsorted(self.resolutions, pixel, side='right')) - 1, 0)
+        first = int(np.searchsorted(self.times[level], start, side='left'))
+        last = int(np.searchsorted(self.times[level], stop, side='right'))
+        return self.times[level][first:last], self.yvalues[level][first:last]
+
+class TimelineRenderer:
+    """ Draws bars and scatters of a timeline axes (time in seconds) from their summaries at the current zoom """
+    __slots__ = ('ax', 'bars', 'scatters')
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.bars = []
+        self.scatters = []
+
+    def add_bars(self, runtime_slices, yrange, **kwargs):
+        """
+        Add a row of runtime slices drawn with broken_barh
+        :param runtime_slices: numpy structured array of runtime slices (start, duration in nanoseconds)
+        :param yrange: (ymin, height) of the bars
+        :param kwargs: Further arguments of broken_barh, ex. facecolors
+        :return: Collection of the bars
+        """
+        summary = SliceSummary(runtime_slices['start'], runtime_slices['duration'])
+        # The coarsest level covers the same range as the slices, it is drawn until the first update
+        level = len(summary.resolutions) - 1
+        collection = self.ax.broken_barh(np.column_stack((summary.starts[level],
+                                                          summary.ends[level] - summary.starts[level])) / NS_PER_SECOND,
+                                         yrange, **kwargs)
+        self.bars.append((summary, yrange, collection))
+        return collection
+
+    def add_points(self, times, yvalues, **kwargs):
+        """
+        Add points drawn with scatter
+        :param times: numpy array of point times in nanoseconds
+        :param yvalues: numpy array of y values
+        :param kwargs: Further arguments of scatter, ex. c, s and label
+        :return: PathCollection of the scatter
+        """
+        summary = PointSummary(times, yvalues)
+        # All points are set for the autoscaling of the axes, only the visible level is drawn after the first update
+        scatter = self.ax.scatter(summary.times[0] / NS_PER_SECOND, summary.yvalues[0], **kwargs)
+        self.scatters.append((summary, scatter))
+        return scatter
+
+    def connect(self):
+        """ Update on changes of the x limits and size of the axes, draw the current zoom level """
+        self.ax.callbacks.connect('xlim_changed', lambda ax: self.update())
+        self.ax.figure.canvas.mpl_connect('resize_event', lambda event: self.update())
+        self.update()
+
+    def update(self):
+        """ Replace the bars and points by the summary level of the current pixel width """
+        xmin, xmax = self.ax.get_xlim()
+        width = max(self.ax.get_window_extent().width, 1)
+        start = int(np.floor(xmin * NS_PER_SECOND))
+        stop = int(np.ceil(xmax * NS_PER_SECOND))
+        pixel = (stop - start) / width
+
+        for summary, (ymin, height), collection in self.bars:
+            bar_starts, bar_ends = summary.get_bars(start, stop, pixel)
+            xs = np.column_stack((bar_starts, bar_starts, bar_ends, bar_ends)) / NS_PER_SECOND
+            ys = np.broadcast_to(np.array([ymin, ymin + height, ymin + height, ymin], dtype=np.float64), xs.shape)
+            collection.set_verts(np.stack((xs, ys), axis=-1))
+
+        for summary, scatter in self.scatters:
+            point_times, point_yvalues = summary.get_points(start, stop, pixel)
+            scatter.set_offsets(np.column_stack((point_times / NS_PER_SECOND, point_yvalues)))
@@ -0,0 +1,54 @@
+"""
+perfViewer
+Module: timestamps
+Responsible: Brandtner Philipp
+Description:
+Timestamps and durations are handled as integer nanoseconds (int64) from the import to the analysis. They are
+converted to milliseconds or seconds only for tables, plots and exported files.
+
+"""
+
+import numpy as np
+
+NS_PER_SECOND = 1000000000
+NS_PER_MS = 1000000
+
+def parse_timestamps(values):
+    """
+    Parse timestamps in seconds as printed by perf script, ex. '1630.000377', exactly to integer nanoseconds.
+    The digits are accumulated column by column over the characters of all timestamps, no float is involved.
+    :param values: Array of timestamp strings or bytes
+    :return: numpy int64 array of nanoseconds
+    """
+    values = np.asarray(values)
+    if values.dtype.kind != 'S':
+        values = values.astype('S')
+    characters = values.view(np.uint8).reshape(len(values), values.dtype.itemsize)
+
+    nanoseconds = np.zeros(len(values), dtype=np.int64)
+    fraction_digits = np.zeros(len(values), dtype=np.int64)
+    in_fraction = np.zeros(len(values), dtype=bool)
+    for column in characters.T:
+        is_digit = (column >= ord('0')) & (column <= ord('9')) & (fraction_digits < 9)
+        nanoseconds = np.where(is_digit, nanoseconds * 10 + (column.astype(np.int64) - ord('0')), nanoseconds)
+        fraction_digits += is_digit & in_fraction
+        in_fraction |= column == ord('.')
+
+    return nanoseconds * 10 ** (9 - fraction_digits)
+
+def parse_timestamp(value):
+    """
+    Parse a single timestamp in seconds, ex. b'1630.000377', exactly to integer nanoseconds
+    :param value: Timestamp string or bytes
+    :return: Nanoseconds
+    """
+    if isinstance(value, bytes):
+        value = value.decode('ascii')
+    seconds, _, fraction = value.strip().partition('.')
+    return int(seconds or 0) * NS_PER_SECOND + int(fraction[:9].ljust(9, '0'))
+
+def format_timestamp(timestamp):
+    """ Format a timestamp in nanoseconds as seconds with nanosecond resolution, ex. '1630.000377000' """
+    sign = '-' if timestamp < 0 else ''
+    seconds, nanoseconds = divmod(abs(int(timestamp)), NS_PER_SECOND)
+    return "{0}{1}.{2:09d}".format(sign, seconds, nanoseconds)
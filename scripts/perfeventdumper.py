@@ -4,28 +4,58 @@ Responsible: Brandtner Philipp
 """
 
 import argparse
+import io
+import mmap
 import os
+import sys
 import pandas as pd
 import re
 import prettytable
 
+# The dump index and the timestamp parsing are shared with perfViewer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import dataimporterexporter
+import timestamps
+
 # Filenames for perf exports
 SCHED_SWITCH_FILENAME = 'perf.data.sched:sched_switch.dump'
 IRQ_HANDLER_ENTRY_FILENAME = 'perf.data.irq:irq_handler_entry.dump'
 IRQ_HANDLER_EXIT_FILENAME = 'perf.data.irq:irq_handler_exit.dump'
 
-def import_data_from_sched_switch(perf_export_dir, filename):
+def read_dump(perf_export_dir, filename, window):
+    """
+    Read the lines of a dump file with the events inside a time window. The lines are found by binary search in the
+    memory mapped file, limited to the buckets of the dump index if perfViewer wrote one (see
+    dataimporterexporter.get_dump_window_offsets).
+    :param perf_export_dir: Path to file
+    :param filename: name of file
+    :param window: (entry, exit) timestamps in nanoseconds
+    :return: File object with the content
+    """
+    dump_index = dataimporterexporter.import_dump_index(perf_export_dir, filename)
+    with open(perf_export_dir + filename, 'rb') as dump_file:
+        if os.fstat(dump_file.fileno()).st_size == 0:
+            return io.BytesIO(b'')
+        with mmap.mmap(dump_file.fileno(), 0, access=mmap.ACCESS_READ) as dump_map:
+            begin, end = dataimporterexporter.get_dump_window_offsets(dump_map, window, dump_index)
+            return io.BytesIO(dump_map[begin:end])
+
+def import_data_from_sched_switch(perf_export_dir, filename, window):
     """
     Open sched:sched_switch.dump file and import data
     :param perf_export_dir: Path to file
     :param filename: name of file
+    :param window: (entry, exit) timestamps in nanoseconds
     :return: pandas dataframe of events on success, otherwise -1
     """
     try:
         colnames = ['task', 'tid', 'cpu', 'timestamp', 'event', 'prev_comm', 'prev_pid', 'prev_prio', 'prev_state', '-',
                     'next_comm', 'next_pid', 'next_prio']
-        sched_switch_df = pd.read_csv(perf_export_dir + filename, index_col=False, names=colnames, header=None,
-                                       delim_whitespace=True)
+        dump = read_dump(perf_export_dir, filename, window)
+        if dump.getbuffer().nbytes == 0:
+            return pd.DataFrame(columns=[colname for colname in colnames if colname != '-'])
+        sched_switch_df = pd.read_csv(dump, index_col=False, names=colnames, header=None, sep=r'\s+')
         del sched_switch_df['-']
 
         sched_switch_df['tid'] = pd.to_numeric(sched_switch_df['tid'])
@@ -53,17 +83,20 @@ def import_data_from_sched_switch(perf_export_dir, filename):
         os.sys.exit()
     return sched_switch_df
 
-def import_data_from_irq(perf_export_dir, filename):
+def import_data_from_irq(perf_export_dir, filename, window):
     """
     Open irq:irq_handler_entry.dump file and import data
     :param perf_export_dir: Path to file
     :param filename: name of file
+    :param window: (entry, exit) timestamps in nanoseconds
     :return: pandas dataframe of events on success, otherwise -1
     """
     try:
         colnames = ['task', 'tid', 'cpu', 'timestamp', 'event', 'irq', 'irq_source']
-        irq_handler_entry_list = pd.read_csv(perf_export_dir + filename, index_col=False, names=colnames, header=None,
-                                             delim_whitespace=True)
+        dump = read_dump(perf_export_dir, filename, window)
+        if dump.getbuffer().nbytes == 0:
+            return pd.DataFrame(columns=colnames)
+        irq_handler_entry_list = pd.read_csv(dump, index_col=False, names=colnames, header=None, sep=r'\s+')
 
         irq_handler_entry_list['tid'] = pd.to_numeric(irq_handler_entry_list['tid'])
         irq_handler_entry_list['cpu'] = irq_handler_entry_list['cpu'].map(lambda cpu: re.sub("[^0-9]", "", cpu))
@@ -83,15 +116,16 @@ def import_data_from_irq(perf_export_dir, filename):
 
 def Application():
     perf_import_dir = args.perf_dir
-    entry_timestamp = args.timestamp[0]
-    exit_timestamp = args.timestamp[1]
+    entry_timestamp = float(args.timestamp[0])
+    exit_timestamp = float(args.timestamp[1])
+    window = (timestamps.parse_timestamp(args.timestamp[0]), timestamps.parse_timestamp(args.timestamp[1]))
 
     print("perfEventDumper")
     print("Importing Files from: " + perf_import_dir)
 
-    sched_switch_df = import_data_from_sched_switch(perf_import_dir, SCHED_SWITCH_FILENAME)
-    irq_handler_entry_df = import_data_from_irq(perf_import_dir, IRQ_HANDLER_ENTRY_FILENAME)
-    irq_handler_exit_df = import_data_from_irq(perf_import_dir, IRQ_HANDLER_EXIT_FILENAME)
+    sched_switch_df = import_data_from_sched_switch(perf_import_dir, SCHED_SWITCH_FILENAME, window)
+    irq_handler_entry_df = import_data_from_irq(perf_import_dir, IRQ_HANDLER_ENTRY_FILENAME, window)
+    irq_handler_exit_df = import_data_from_irq(perf_import_dir, IRQ_HANDLER_EXIT_FILENAME, window)
 
     perf_data_df = pd.concat([sched_switch_df, irq_handler_entry_df, irq_handler_exit_df], ignore_index=True)
     perf_data_df = perf_data_df.sort_values('timestamp')
@@ -118,7 +152,7 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("-d", "--perf_dir", nargs="?", action='store', const='true',
                         help="Folder to load files from")
-    parser.add_argument("-t", "--timestamp", nargs='*', action='store', type=float,
+    parser.add_argument("-t", "--timestamp", nargs='*', action='store',
                         help="Specify entry and exit timestamp. Format: time_entry time_exit")
     args = parser.parse_args()
 
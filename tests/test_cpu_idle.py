@@ -0,0 +1,111 @@
+"""
+perfViewer
+Module: test_cpu_idle
+Responsible: Brandtner Philipp
+Description:
+Compares the idle residency of cpu.get_cpu_idle_residency with the per-event loop of the first release, fixed to
+keep one accumulator per CPU and idle state. An idle exit is paired with the idle entry directly before it on its
+CPU. Unlike the first release, an exit without such an entry is not counted from timestamp 0 or from an entry
+already paired.
+
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import cpu
+import dataimporterexporter
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+EXIT = cpu.CPU_IDLE_EXIT_STATE
+
+def make_cpu_idle(rows):
+    """ power:cpu_idle events of rows (timestamp, cpu, state) """
+    timestamps, cpus, states = zip(*rows) if rows else ((),) * 3
+    return pd.DataFrame({'cpu': np.array(cpus, dtype=np.int16), 'timestamp': np.array(timestamps, dtype=np.int64),
+                         'state': np.array(states, dtype=np.int64)})
+
+def reference_idle_residency(cpu_idle_df):
+    """ Idle entries per (cpu, state) and residencies per (cpu, state) of a loop over the events """
+    entries = dict()
+    residencies = dict()
+    last_entry = dict()
+    for row in cpu_idle_df.sort_values('timestamp', kind='mergesort').itertuples():
+        if row.state != EXIT:
+            entries[(row.cpu, row.state)] = entries.get((row.cpu, row.state), 0) + 1
+            last_entry[row.cpu] = (row.timestamp, row.state)
+        elif row.cpu in last_entry:
+            timestamp, state = last_entry.pop(row.cpu)
+            residencies.setdefault((row.cpu, state), []).append(row.timestamp - timestamp)
+    return entries, residencies
+
+def assert_same_residency(cpu_idle_chunks):
+    entries, residency, statistics = cpu.get_cpu_idle_residency(cpu_idle_chunks)
+    expected_entries, expected_residencies = reference_idle_residency(pd.concat(cpu_idle_chunks, ignore_index=True))
+
+    assert {key: int(count) for key, count in np.ndenumerate(entries) if count} == expected_entries
+    assert {key: int(total) for key, total in np.ndenumerate(residency) if total} == \
+        {key: sum(durations) for key, durations in expected_residencies.items() if sum(durations)}
+    assert {key: (state_statistics.count, state_statistics.minimum, state_statistics.maximum)
+            for key, state_statistics in statistics.items()} == \
+        {key: (len(durations), min(durations), max(durations)) for key, durations in expected_residencies.items()}
+    return entries, residency, statistics
+
+def make_random_cpu_idle(seed, length=2000, cpus=4, states=5):
+    rng = np.random.default_rng(seed)
+    # About every second event is an exit, which gives entries directly followed by entries and repeated exits
+    states = np.where(rng.random(length) < 0.5, EXIT, rng.integers(0, states, length))
+    return make_cpu_idle(list(zip(np.cumsum(rng.integers(0, 20, length)).tolist(),
+                                  rng.integers(0, cpus, length).tolist(), states.tolist())))
+
+def test_recorded_excerpt():
+    with open(os.path.join(FIXTURE_DIR, 'task_runtime_excerpt.dump'), 'rb') as excerpt_file:
+        data = b''.join(line for line in excerpt_file if b' power:cpu_idle: ' in line)
+    assert_same_residency([dataimporterexporter.parse_perf_dump(data, dataimporterexporter.CPU_IDLE_COLUMNS)])
+
+def test_edge_cases():
+    entries, residency, statistics = assert_same_residency([make_cpu_idle([
+        # CPU 0: leading exit, three C-states, an entry directly followed by an entry, a repeated exit
+        (5, 0, EXIT), (10, 0, 2), (30, 0, EXIT), (40, 0, 0), (45, 0, EXIT), (50, 0, 1), (60, 0, 3), (90, 0, EXIT),
+        (95, 0, EXIT),
+        # CPU 2 interleaved with CPU 0, no events of CPU 1, the last entry is open
+        (12, 2, 1), (41, 2, EXIT), (91, 2, 4)])])
+    assert entries.shape == (3, 5)
+    assert residency.tolist() == [[5, 0, 20, 30, 0], [0, 0, 0, 0, 0], [0, 29, 0, 0, 0]]
+    assert entries[0].tolist() == [1, 1, 1, 1, 0] and entries[2].tolist() == [0, 1, 0, 0, 1]
+    assert (0, 1) not in statistics
+
+def test_empty_events():
+    entries, residency, statistics = cpu.get_cpu_idle_residency([make_cpu_idle([])])
+    assert entries.size == 0 and residency.size == 0 and statistics == {}
+    entries, residency, statistics = cpu.get_cpu_idle_residency([make_cpu_idle([(10, 1, EXIT)])])
+    assert residency.sum() == 0 and statistics == {}
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_events(seed):
+    assert_same_residency([make_random_cpu_idle(seed)])
+
+@pytest.mark.parametrize('seed', range(3))
+def test_chunked_events(seed):
+    """ The last event of each CPU carried over to the next chunk gives the residency of one pass """
+    cpu_idle_df = make_random_cpu_idle(seed)
+    entries, residency, statistics = cpu.get_cpu_idle_residency([cpu_idle_df])
+    chunks = [cpu_idle_df.iloc[rows] for rows in np.array_split(np.arange(len(cpu_idle_df)), 7)]
+    chunked_entries, chunked_residency, chunked_statistics = assert_same_residency(chunks)
+    np.testing.assert_array_equal(chunked_entries, entries)
+    np.testing.assert_array_equal(chunked_residency, residency)
+    assert {key: (state_statistics.count, state_statistics.total) for key, state_statistics in
+            chunked_statistics.items()} == {key: (state_statistics.count, state_statistics.total)
+                                            for key, state_statistics in statistics.items()}
+
+def test_chunks_with_new_cpus_and_states():
+    # The entries grow with the CPUs and idle states of later chunks, the entry of CPU 0 is paired across chunks
+    assert_same_residency([make_cpu_idle([(10, 0, 0)]), make_cpu_idle([]),
+                           make_cpu_idle([(20, 0, EXIT), (25, 3, 2), (30, 3, EXIT)]),
+                           make_cpu_idle([(40, 1, 6), (50, 1, EXIT)])])
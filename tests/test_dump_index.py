@@ -0,0 +1,94 @@
+"""
+perfViewer
+Module: test_dump_index
+Responsible: Brandtner Philipp
+Description:
+Compares the byte range lookup of a time window in a dump file, with and without the dump index, with a scan over
+the lines of the dump.
+
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import dataimporterexporter
+import timestamps
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SWITCH_FILENAME = 'perf.data.sched:sched_switch.dump'
+
+def read_excerpt(repeats=1):
+    """ Lines of the excerpt, each repeated to give equal timestamps of consecutive lines """
+    with open(os.path.join(FIXTURE_DIR, 'task_runtime_excerpt.dump'), 'rb') as excerpt_file:
+        return b''.join(line * repeats for line in excerpt_file)
+
+def scan_window_offsets(data, window):
+    """ Byte offsets of the first and behind the last line inside the window, both ends included """
+    start, stop = window
+    begin = end = None
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        timestamp = timestamps.parse_timestamp(dataimporterexporter.PERF_DUMP_TIMESTAMP.search(line).group(1))
+        if begin is None and (start is None or timestamp >= start):
+            begin = offset
+        offset += len(line)
+        if stop is None or timestamp <= stop:
+            end = offset
+    begin = len(data) if begin is None else begin
+    return begin, max(begin, 0 if end is None else end)
+
+def get_windows(data):
+    """ Windows at, between, before and behind the timestamps of the dump """
+    line_timestamps = timestamps.parse_timestamps(dataimporterexporter.PERF_DUMP_TIMESTAMP.findall(data))
+    first, last = int(line_timestamps[0]), int(line_timestamps[-1])
+    middle = int(line_timestamps[len(line_timestamps) // 2])
+    return [(None, None), (first, last), (first - 1, last + 1), (middle, middle), (middle + 1, middle - 1),
+            (middle - 1, None), (None, middle), (middle + 1, None), (None, middle - 1), (last + 1, None),
+            (None, first - 1), (0, first - 1)]
+
+@pytest.mark.parametrize('repeats', [1, 3])
+@pytest.mark.parametrize('stride', [1, 150, 1000, dataimporterexporter.DUMP_INDEX_STRIDE])
+def test_window_offsets(repeats, stride):
+    data = read_excerpt(repeats)
+    dump_index = dataimporterexporter.build_dump_index(data, stride)
+    # Buckets of at least stride bytes, each starting at a line with its row number and timestamp
+    assert dump_index['offsets'][0] == 0
+    assert np.all(np.diff(dump_index['offsets']) >= stride)
+    for offset, row, timestamp in zip(*(dump_index[name].tolist() for name in ('offsets', 'rows', 'timestamps'))):
+        assert offset == 0 or data[offset - 1:offset] == b'\n'
+        assert row == data[:offset].count(b'\n')
+        assert timestamp == dataimporterexporter.get_dump_line_timestamp(data, offset)[0]
+
+    for window in get_windows(data):
+        expected = scan_window_offsets(data, window)
+        assert dataimporterexporter.get_dump_window_offsets(data, window) == expected, window
+        assert dataimporterexporter.get_dump_window_offsets(data, window, dump_index) == expected, window
+
+def test_empty_dump():
+    dump_index = dataimporterexporter.build_dump_index(b'')
+    assert len(dump_index['timestamps']) == 0
+    assert dataimporterexporter.get_dump_window_offsets(b'', (0, 10), dump_index) == (0, 0)
+
+def test_stale_index_is_ignored(tmp_path):
+    perf_import_dir = str(tmp_path) + os.sep
+    data = b''.join(line for line in read_excerpt().splitlines(keepends=True) if b' sched:sched_switch: ' in line)
+    with open(perf_import_dir + SWITCH_FILENAME, 'wb') as dump_file:
+        dump_file.write(data)
+    dataimporterexporter.export_dump_index(perf_import_dir, SWITCH_FILENAME)
+    dump_index = dataimporterexporter.import_dump_index(perf_import_dir, SWITCH_FILENAME)
+    np.testing.assert_array_equal(dump_index['offsets'], dataimporterexporter.build_dump_index(data)['offsets'])
+
+    # A window read with the index gives the events of selecting the window from the whole dump
+    all_df = dataimporterexporter.parse_perf_dump(data, dataimporterexporter.SCHED_SWITCH_COLUMNS)
+    window = (int(all_df['timestamp'].iloc[2]), int(all_df['timestamp'].iloc[-3]))
+    events_df = dataimporterexporter.read_perf_dump(perf_import_dir, SWITCH_FILENAME,
+                                                    dataimporterexporter.SCHED_SWITCH_COLUMNS, window)
+    assert events_df['timestamp'].tolist() == all_df['timestamp'].iloc[2:-2].tolist()
+
+    with open(perf_import_dir + SWITCH_FILENAME, 'ab') as dump_file:
+        dump_file.write(data.splitlines(keepends=True)[-1])
+    assert dataimporterexporter.import_dump_index(perf_import_dir, SWITCH_FILENAME) is None
@@ -0,0 +1,103 @@
+"""
+perfViewer
+Module: test_import_cache
+Responsible: Brandtner Philipp
+Description:
+Checks that the columnar import cache of a dump file gives the events of parsing the dump and that it is rebuilt
+whenever the dump file changes.
+
+"""
+
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import dataimporterexporter
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SWITCH_FILENAME = 'perf.data.sched:sched_switch.dump'
+
+def write_switch_dump(perf_import_dir):
+    """ Write the sched_switch events of the excerpt as dump file, return its content """
+    with open(os.path.join(FIXTURE_DIR, 'task_runtime_excerpt.dump'), 'rb') as excerpt_file:
+        data = b''.join(line for line in excerpt_file if b' sched:sched_switch: ' in line)
+    with open(os.path.join(perf_import_dir, SWITCH_FILENAME), 'wb') as dump_file:
+        dump_file.write(data)
+    return data
+
+def import_switch_dump(perf_import_dir, window=None):
+    return dataimporterexporter.import_data_with_cache(dataimporterexporter.import_data_from_sched_switch,
+                                                      perf_import_dir, SWITCH_FILENAME, window)
+
+def fail_import(perf_import_dir, filename, window=None):
+    raise AssertionError('dump parsed instead of loaded from the cache')
+
+def assert_same_events(events_df, expected_df):
+    pd.testing.assert_frame_equal(events_df.reset_index(drop=True), expected_df.reset_index(drop=True))
+
+@pytest.fixture
+def perf_import_dir(tmp_path):
+    return str(tmp_path) + os.sep
+
+def test_cache_round_trip(perf_import_dir):
+    data = write_switch_dump(perf_import_dir)
+    expected_df = dataimporterexporter.parse_perf_dump(data, dataimporterexporter.SCHED_SWITCH_COLUMNS)
+
+    assert_same_events(import_switch_dump(perf_import_dir), expected_df)
+    assert os.path.exists(perf_import_dir + SWITCH_FILENAME + dataimporterexporter.IMPORT_CACHE_SUFFIX)
+    # The second import is loaded from the cache
+    assert_same_events(dataimporterexporter.import_data_with_cache(fail_import, perf_import_dir, SWITCH_FILENAME),
+                       expected_df)
+
+@pytest.mark.parametrize('change', ['append', 'same_size', 'touch', 'version'])
+def test_cache_invalidation(perf_import_dir, monkeypatch, change):
+    data = write_switch_dump(perf_import_dir)
+    import_switch_dump(perf_import_dir)
+    dump_path = perf_import_dir + SWITCH_FILENAME
+    mtime_ns = os.stat(dump_path).st_mtime_ns
+
+    if change == 'append':
+        data += data.splitlines(keepends=True)[-1].replace(b'1630.012', b'1630.019')
+    elif change == 'same_size':
+        data = data.replace(b'prev_prio=120', b'prev_prio=121', 1)
+    if change in ('append', 'same_size'):
+        with open(dump_path, 'wb') as dump_file:
+            dump_file.write(data)
+    if change == 'version':
+        monkeypatch.setattr(dataimporterexporter, 'IMPORT_CACHE_VERSION',
+                            dataimporterexporter.IMPORT_CACHE_VERSION + 1)
+    else:
+        # Changes within the timestamp resolution of the file system are told apart by the modification time
+        os.utime(dump_path, ns=(mtime_ns + 1000000, mtime_ns + 1000000))
+
+    assert dataimporterexporter.import_dump_cache(perf_import_dir, SWITCH_FILENAME) is None
+    expected_df = dataimporterexporter.parse_perf_dump(data, dataimporterexporter.SCHED_SWITCH_COLUMNS)
+    assert_same_events(import_switch_dump(perf_import_dir), expected_df)
+    # The rebuilt cache is valid again
+    assert_same_events(dataimporterexporter.import_data_with_cache(fail_import, perf_import_dir, SWITCH_FILENAME),
+                       expected_df)
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_cache_window(perf_import_dir, cached):
+    """ A window selects the same events from the cache as from the dump, both window ends are included """
+    data = write_switch_dump(perf_import_dir)
+    all_df = dataimporterexporter.parse_perf_dump(data, dataimporterexporter.SCHED_SWITCH_COLUMNS)
+    if cached:
+        import_switch_dump(perf_import_dir)
+    start, stop = int(all_df['timestamp'].iloc[3]), int(all_df['timestamp'].iloc[-4])
+
+    events_df = import_switch_dump(perf_import_dir, (start, stop))
+    assert events_df['timestamp'].tolist() == all_df['timestamp'].iloc[3:-3].tolist()
+    # Without a cache a window import does not write one, it has to hold the whole dump
+    assert os.path.exists(perf_import_dir + SWITCH_FILENAME + dataimporterexporter.IMPORT_CACHE_SUFFIX) == cached
+
+def test_cache_of_empty_dump(perf_import_dir):
+    open(perf_import_dir + SWITCH_FILENAME, 'wb').close()
+    events_df = import_switch_dump(perf_import_dir)
+    assert events_df.empty
+    assert list(events_df.columns) == list(dataimporterexporter.parse_perf_dump(
+        b'', dataimporterexporter.SCHED_SWITCH_COLUMNS).columns)
+    assert dataimporterexporter.import_data_with_cache(fail_import, perf_import_dir, SWITCH_FILENAME).empty
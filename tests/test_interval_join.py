@@ -0,0 +1,75 @@
+"""
+perfViewer
+Module: test_interval_join
+Responsible: Brandtner Philipp
+Description:
+Compares the interval join of probe.get_interval_rows and probe.get_rows_by_time with boolean masks over all events
+for each interval, start and stop excluded.
+
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import probe
+
+def reference_interval_rows(timestamps, starts, stops):
+    """ Positions of the timestamps within each interval of a mask per interval """
+    timestamps = np.asarray(timestamps)
+    return [np.flatnonzero((timestamps > start) & (timestamps < stop)).tolist() for start, stop in zip(starts, stops)]
+
+def split_rows(rows, counts):
+    assert len(rows) == counts.sum()
+    return [part.tolist() for part in np.split(rows, np.cumsum(counts)[:-1])] if len(counts) else []
+
+def assert_same_interval_rows(timestamps, starts, stops):
+    rows, counts = probe.get_interval_rows(np.array(timestamps, dtype=np.int64), np.array(starts, dtype=np.int64),
+                                           np.array(stops, dtype=np.int64))
+    expected = reference_interval_rows(timestamps, starts, stops)
+    assert counts.tolist() == [len(interval_rows) for interval_rows in expected]
+    assert split_rows(rows, counts) == expected
+    return expected
+
+def test_events_at_start_and_stop():
+    # Events exactly at start and stop are excluded, equal timestamps are all inside or all outside
+    expected = assert_same_interval_rows([10, 20, 20, 30, 40, 40, 50], [10, 20, 19, 25, 40, 0], [30, 40, 41, 35, 40, 9])
+    assert expected == [[1, 2], [3], [1, 2, 3, 4, 5], [3], [], []]
+
+def test_unsorted_and_overlapping_intervals():
+    # Intervals in any order, nested, overlapping and with a stop before the start
+    expected = assert_same_interval_rows([5, 15, 25, 35, 45], [30, 0, 10, 12, 40, 50], [50, 20, 40, 18, 20, 0])
+    assert expected == [[3, 4], [0, 1], [1, 2, 3], [1], [], []]
+
+def test_empty_input():
+    assert assert_same_interval_rows([], [0, 10], [5, 20]) == [[], []]
+    assert assert_same_interval_rows([1, 2, 3], [], []) == []
+    assert probe.get_rows_by_time(pd.DataFrame({'timestamp': [], 'cpu': []}), 'cpu') == {}
+
+def test_rows_by_time_of_unsorted_events():
+    events_df = pd.DataFrame({'timestamp': np.array([50, 10, 40, 10, 30, 20], dtype=np.int64),
+                              'cpu': np.array([1, 0, 0, 1, 1, 0], dtype=np.int16)})
+    cpu_rows = probe.get_rows_by_time(events_df, 'cpu')
+    assert {cpu: rows.tolist() for cpu, rows in cpu_rows.items()} == {0: [1, 5, 2], 1: [3, 4, 0]}
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_events(seed):
+    rng = np.random.default_rng(seed)
+    # Unsorted events of few distinct timestamps, many of them at a start or stop
+    events_df = pd.DataFrame({'timestamp': rng.integers(0, 100, 400), 'cpu': rng.integers(0, 4, 400)})
+    starts = rng.integers(0, 100, 60)
+    stops = starts + rng.integers(-5, 40, 60)
+
+    for cpu, rows in probe.get_rows_by_time(events_df, 'cpu').items():
+        timestamps = events_df['timestamp'].to_numpy()[rows]
+        assert np.all(np.diff(timestamps) >= 0)
+        assert sorted(rows.tolist()) == np.flatnonzero(events_df['cpu'].to_numpy() == cpu).tolist()
+        positions, counts = probe.get_interval_rows(timestamps, starts, stops)
+        # The rows of the events inside each interval are the rows of a mask over the unsorted events of the CPU
+        assert [sorted(interval_rows) for interval_rows in split_rows(rows[positions], counts)] == \
+            [np.flatnonzero((events_df['cpu'].to_numpy() == cpu) & (events_df['timestamp'].to_numpy() > start) &
+                            (events_df['timestamp'].to_numpy() < stop)).tolist() for start, stop in zip(starts, stops)]
@@ -0,0 +1,119 @@
+"""
+perfViewer
+Module: test_latency
+Responsible: Brandtner Philipp
+Description:
+Compares the wakeup latency join of latency.process_wakeup_latency with a loop over the wakeups, which looks up the
+next switch-in of the woken tid for each of them.
+
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import latency
+
+COMMS = pd.CategoricalDtype(['kworker/0:1', 'myapp', 'myapp_worker', 'sshd'])
+
+def make_wakeups(rows):
+    """ sched_wakeup events of rows (timestamp, pid, target) """
+    timestamps, pids, targets = zip(*rows) if rows else ((),) * 3
+    return pd.DataFrame({'comm': pd.Categorical.from_codes(np.array(pids, dtype=np.int8) % len(COMMS.categories),
+                                                          dtype=COMMS),
+                         'pid': np.array(pids, dtype=np.int32), 'target': np.array(targets, dtype=np.int16),
+                         'timestamp': np.array(timestamps, dtype=np.int64)})
+
+def make_switches(rows):
+    """ sched_switch events of rows (timestamp, next_pid, cpu) """
+    timestamps, pids, cpus = zip(*rows) if rows else ((),) * 3
+    return pd.DataFrame({'next_pid': np.array(pids, dtype=np.int32), 'cpu': np.array(cpus, dtype=np.int16),
+                         'timestamp': np.array(timestamps, dtype=np.int64)})
+
+def reference_latency(wakeups_df, switches_df):
+    """
+    Rows (comm, pid, target, cpu, wakeup, switch) of the wakeups in time order. A wakeup is joined with the next
+    switch-in of its tid at or after it. A switch-in ends the latency of the first wakeup before it only.
+    """
+    switches = sorted(zip(switches_df['timestamp'].tolist(), range(len(switches_df))))
+    switch_pids = switches_df['next_pid'].tolist()
+    joined_switches = set()
+    rows = []
+    for timestamp, row in sorted(zip(wakeups_df['timestamp'].tolist(), range(len(wakeups_df)))):
+        pid = int(wakeups_df['pid'].iloc[row])
+        switch_rows = [switch_row for switch_timestamp, switch_row in switches
+                       if switch_pids[switch_row] == pid and switch_timestamp >= timestamp]
+        if not switch_rows or switch_rows[0] in joined_switches:
+            continue
+        joined_switches.add(switch_rows[0])
+        rows.append((wakeups_df['comm'].iloc[row], pid, int(wakeups_df['target'].iloc[row]),
+                     int(switches_df['cpu'].iloc[switch_rows[0]]), timestamp,
+                     int(switches_df['timestamp'].iloc[switch_rows[0]])))
+    return rows
+
+def get_rows(latency_df):
+    assert (latency_df['latency'] == latency_df['switch'] - latency_df['wakeup']).all()
+    return list(zip(latency_df['comm'].tolist(), latency_df['pid'].tolist(), latency_df['target'].tolist(),
+                    latency_df['cpu'].tolist(), latency_df['wakeup'].tolist(), latency_df['switch'].tolist()))
+
+def make_random_events(seed, length=300):
+    rng = np.random.default_rng(seed)
+    # Equal wakeup timestamps and wakeups at the timestamp of a switch-in, switch-ins of a tid at distinct timestamps
+    wakeups = make_wakeups(list(zip(rng.integers(0, 1000, length).tolist(), rng.integers(1, 6, length).tolist(),
+                                    rng.integers(0, 4, length).tolist())))
+    switch_timestamps = rng.choice(1000, size=length // 2, replace=False)
+    switches = make_switches(list(zip(switch_timestamps.tolist(), rng.integers(0, 7, length // 2).tolist(),
+                                      rng.integers(0, 4, length // 2).tolist())))
+    return wakeups, switches
+
+def test_edge_cases():
+    wakeups = make_wakeups([(100, 1, 0), (100, 2, 1), (150, 1, 0), (300, 3, 2), (500, 2, 1), (600, 4, 0)])
+    switches = make_switches([(90, 1, 3), (100, 2, 1), (200, 1, 2), (250, 1, 0), (800, 2, 3)])
+    rows = get_rows(latency.process_wakeup_latency(wakeups, switches))
+    assert rows == reference_latency(wakeups, switches)
+    # A switch-in at the timestamp of the wakeup is joined, the second wakeup of tid 1 before its switch-in and the
+    # wakeups of tids 3 and 4 without a switch-in are left out, the switch-in before a wakeup is not joined. Wakeups
+    # at equal timestamps keep their order.
+    assert [(pid, wakeup, switch) for _, pid, _, _, wakeup, switch in rows] == \
+        [(1, 100, 200), (2, 100, 100), (2, 500, 800)]
+
+def test_empty_events():
+    latency_df = latency.process_wakeup_latency(make_wakeups([]), make_switches([(10, 1, 0)]))
+    assert latency_df.empty
+    assert list(latency_df.columns) == ['comm', 'pid', 'target', 'cpu', 'wakeup', 'switch', 'latency']
+    assert latency.process_wakeup_latency(make_wakeups([(10, 1, 0)]), make_switches([])).empty
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_events(seed):
+    wakeups, switches = make_random_events(seed)
+    latency_df = latency.process_wakeup_latency(wakeups, switches)
+    rows = reference_latency(wakeups, switches)
+    assert get_rows(latency_df) == rows
+
+    # Count, maximum and total latency per task
+    expected = dict()
+    for comm, pid, _, _, wakeup, switch in rows:
+        expected.setdefault((comm, pid), []).append(switch - wakeup)
+    task_latencies = latency.get_task_latency_statistics(latency_df)
+    assert {(comm, pid): (statistics.count, statistics.maximum, statistics.total)
+            for comm, pid, statistics in task_latencies} == \
+        {key: (len(latencies), max(latencies), sum(latencies)) for key, latencies in expected.items()}
+    assert [statistics.maximum for _, _, statistics in task_latencies] == \
+        sorted((max(latencies) for latencies in expected.values()), reverse=True)
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('boundaries', [[500], [100, 400, 401, 900]])
+def test_chunked_events(seed, boundaries):
+    """ Wakeups carried over to later chunks give the latencies of one pass """
+    wakeups, switches = make_random_events(seed)
+    expected_df = latency.process_wakeup_latency(wakeups, switches)
+
+    chunks = []
+    for start, stop in zip([0] + boundaries, boundaries + [1000]):
+        chunks.append((wakeups[(wakeups['timestamp'] >= start) & (wakeups['timestamp'] < stop)],
+                       switches[(switches['timestamp'] >= start) & (switches['timestamp'] < stop)]))
+    pd.testing.assert_frame_equal(latency.process_wakeup_latency_chunks(chunks), expected_df)
@@ -0,0 +1,100 @@
+"""
+perfViewer
+Module: test_migration
+Responsible: Brandtner Philipp
+Description:
+Compares the migration counts per task, the CPU to CPU migration matrix and the migration rate of migration with
+loops over the sched_migrate_task events.
+
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import dataimporterexporter
+import migration
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def make_migrations(rows):
+    """ sched_migrate_task events of rows (timestamp, pid, orig_cpu, dest_cpu) """
+    timestamps, pids, orig_cpus, dest_cpus = zip(*rows) if rows else ((),) * 4
+    return pd.DataFrame({'comm': pd.Categorical(['task' + str(pid) for pid in pids]),
+                         'pid': np.array(pids, dtype=np.int32), 'timestamp': np.array(timestamps, dtype=np.int64),
+                         'orig_cpu': np.array(orig_cpus, dtype=np.int16),
+                         'dest_cpu': np.array(dest_cpus, dtype=np.int16)})
+
+def make_random_migrations(seed, length=500, cpus=6):
+    rng = np.random.default_rng(seed)
+    return make_migrations(list(zip(np.sort(rng.integers(0, 10000, length)).tolist(),
+                                    rng.integers(1, 12, length).tolist(), rng.integers(0, cpus, length).tolist(),
+                                    rng.integers(0, cpus, length).tolist())))
+
+def reference_migrations(sched_migrate_df, start, stop, intervals):
+    """ Migration counts per task, migration matrix and migrations per interval of a loop over the events """
+    task_counts = dict()
+    matrix = dict()
+    interval_counts = [0] * intervals
+    for row in sched_migrate_df.itertuples():
+        if row.orig_cpu == row.dest_cpu:
+            continue
+        task_counts[(row.comm, row.pid)] = task_counts.get((row.comm, row.pid), 0) + 1
+        matrix[(row.orig_cpu, row.dest_cpu)] = matrix.get((row.orig_cpu, row.dest_cpu), 0) + 1
+        if start <= row.timestamp <= stop:
+            # Intervals [start + i * (stop - start) // intervals, ...), the last one includes stop
+            interval = 0
+            while interval + 1 < intervals and row.timestamp >= start + (interval + 1) * (stop - start) // intervals:
+                interval += 1
+            interval_counts[interval] += 1
+    return task_counts, matrix, interval_counts
+
+def assert_same_migrations(sched_migrate_df, start, stop, intervals=migration.MIGRATION_RATE_INTERVALS):
+    task_counts, matrix, interval_counts = reference_migrations(sched_migrate_df, start, stop, intervals)
+    migrations_df = migration.get_migrations(sched_migrate_df)
+
+    task_migrations = migration.get_task_migrations(migrations_df)
+    assert {(comm, pid): count for comm, pid, count in task_migrations} == task_counts
+    assert [count for _, _, count in task_migrations] == sorted(task_counts.values(), reverse=True)
+
+    migration_matrix = migration.get_migration_matrix(migrations_df)
+    num_cpus = max((max(key) + 1 for key in matrix), default=0)
+    assert migration_matrix.shape == (num_cpus, num_cpus)
+    assert {(orig_cpu, dest_cpu): int(count) for (orig_cpu, dest_cpu), count in np.ndenumerate(migration_matrix)
+            if count} == matrix
+
+    interval_starts, migration_counts = migration.get_migration_rate(migrations_df, start, stop, intervals)
+    assert interval_starts.tolist() == [start + i * (stop - start) // intervals for i in range(intervals)]
+    assert migration_counts.tolist() == interval_counts
+
+def test_recorded_excerpt():
+    with open(os.path.join(FIXTURE_DIR, 'task_runtime_excerpt.dump'), 'rb') as excerpt_file:
+        data = b''.join(line for line in excerpt_file if b' sched:sched_migrate_task: ' in line)
+    sched_migrate_df = dataimporterexporter.parse_perf_dump(data, dataimporterexporter.SCHED_MIGRATE_COLUMNS)
+    assert_same_migrations(sched_migrate_df, 1630000000000, 1630012000000)
+    assert migration.get_migration_matrix(migration.get_migrations(sched_migrate_df)).tolist() == \
+        [[0, 0, 0, 0], [0, 0, 0, 0], [1, 0, 0, 0], [0, 0, 1, 0]]
+
+def test_window_boundaries():
+    # Migrations at start, at an interval start, at stop and outside of the record, one without a CPU change
+    sched_migrate_df = make_migrations([(99, 1, 0, 1), (100, 1, 1, 0), (110, 2, 0, 3), (119, 2, 3, 3),
+                                        (120, 3, 3, 0), (200, 1, 0, 2), (201, 2, 2, 1)])
+    assert_same_migrations(sched_migrate_df, 100, 200)
+    _, migration_counts = migration.get_migration_rate(migration.get_migrations(sched_migrate_df), 100, 200)
+    assert migration_counts.tolist() == [1, 1, 1, 0, 0, 0, 0, 0, 0, 1]
+
+def test_no_migrations():
+    for sched_migrate_df in [make_migrations([]), make_migrations([(10, 1, 2, 2)])]:
+        assert_same_migrations(sched_migrate_df, 0, 100)
+        assert migration.get_migration_matrix(migration.get_migrations(sched_migrate_df), 4).tolist() == \
+            [[0] * 4] * 4
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_migrations(seed):
+    sched_migrate_df = make_random_migrations(seed)
+    assert_same_migrations(sched_migrate_df, 1000, 9000)
+    assert_same_migrations(sched_migrate_df, 0, 10007, 7)
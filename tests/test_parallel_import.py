@@ -0,0 +1,90 @@
+"""
+perfViewer
+Module: test_parallel_import
+Responsible: Brandtner Philipp
+Description:
+Checks that importing the dump files and probe files on a process pool gives the dataframes of the serial import,
+each under its own key or probe and in the row order of the dump.
+
+"""
+
+import os
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import dataimporterexporter
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Importer of each event of the excerpt, keyed like perfviewer.import_target_files
+EVENT_IMPORTERS = {'sched:sched_migrate_task': dataimporterexporter.import_data_from_sched_migrate,
+                   'sched:sched_stat_runtime': dataimporterexporter.import_data_from_sched_runtime,
+                   'sched:sched_switch': dataimporterexporter.import_data_from_sched_switch,
+                   'sched:sched_waking': dataimporterexporter.import_data_from_sched_waking,
+                   'sched:sched_wakeup': dataimporterexporter.import_data_from_sched_wakeup,
+                   'irq:irq_handler_entry': dataimporterexporter.import_data_from_irq,
+                   'irq:irq_handler_exit': dataimporterexporter.import_data_from_irq,
+                   'power:cpu_idle': dataimporterexporter.import_data_from_cpu_idle}
+
+PROBE_LINES = {'entry': b'           myapp   2001 [003]  1630.%06d: probe_myapp:%s_entry: (4005d0)\n',
+               'exit': b'           myapp   2001 [003]  1630.%06d: probe_myapp:%s_exit__return: (4005d0 <- 4006a0)\n'}
+
+@pytest.fixture
+def perf_import_dir(tmp_path):
+    return str(tmp_path) + os.sep
+
+def write_dump_files(perf_import_dir):
+    """ Split the excerpt into one dump file per event, return the dump files of import_dump_files """
+    with open(os.path.join(FIXTURE_DIR, 'task_runtime_excerpt.dump'), 'rb') as excerpt_file:
+        lines = excerpt_file.readlines()
+    dump_files = dict()
+    for event, import_function in EVENT_IMPORTERS.items():
+        filename = 'perf.data.' + event + '.dump'
+        with open(perf_import_dir + filename, 'wb') as dump_file:
+            dump_file.write(b''.join(line for line in lines if (' ' + event + ': ').encode() in line))
+        dump_files[dataimporterexporter.PERF_DATA_EVENTS[event][0]] = (import_function, filename)
+    return dump_files
+
+def assert_same_imports(imported_files, expected_files):
+    assert list(imported_files) == list(expected_files)
+    for key, expected_df in expected_files.items():
+        pd.testing.assert_frame_equal(imported_files[key], expected_df, obj=key)
+
+@pytest.mark.parametrize('use_cache', [False, True])
+@pytest.mark.parametrize('window', [None, (1630004000000, 1630009000000)])
+def test_dump_files_on_process_pool(perf_import_dir, use_cache, window):
+    dump_files = write_dump_files(perf_import_dir)
+    expected_files = dataimporterexporter.import_dump_files(perf_import_dir, dump_files, 1, use_cache, window)
+    assert_same_imports(dataimporterexporter.import_dump_files(perf_import_dir, dump_files, 3, use_cache, window),
+                        expected_files)
+
+    # A shared pool, ex. the one of the task runtime calculation
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert_same_imports(dataimporterexporter.import_dump_files(perf_import_dir, dump_files, 2, use_cache, window,
+                                                                   executor), expected_files)
+
+def test_probe_files_on_process_pool(perf_import_dir):
+    # Probes with different numbers of calls, so each trace data is told apart from the others
+    probe_list = []
+    for calls, probe_name in enumerate(['first', 'second', 'third'], start=1):
+        for kind, line in PROBE_LINES.items():
+            with open('{0}perf.data.probe_myapp:{1}_{2}.dump'.format(
+                    perf_import_dir, probe_name, 'entry' if kind == 'entry' else 'exit__return'), 'wb') as dump_file:
+                dump_file.write(b''.join(line % (call * 100 + (kind == 'exit') * 10, probe_name.encode())
+                                         for call in range(calls)))
+        probe_list.append(types.SimpleNamespace(executable='myapp', probe_name=probe_name, trace_data=None))
+
+    dataimporterexporter.import_probe_tracing_data(perf_import_dir, probe_list)
+    expected = [probe.trace_data for probe in probe_list]
+    dataimporterexporter.import_probe_tracing_data(perf_import_dir, probe_list, 3)
+    for probe, trace_data in zip(probe_list, expected):
+        pd.testing.assert_frame_equal(probe.trace_data, trace_data)
+    assert [len(probe.trace_data) for probe in probe_list] == [2, 4, 6]
+    # Entries and exits of a probe are merged by timestamp
+    assert probe_list[2].trace_data['timestamp'].tolist() == [1630000000000, 1630000010000, 1630000100000,
+                                                              1630000110000, 1630000200000, 1630000210000]
@@ -0,0 +1,104 @@
+"""
+perfViewer
+Module: test_probe_pairing
+Responsible: Brandtner Philipp
+Description:
+Compares the entry and exit pairing of probe.pair_probe_events and Probe.calculate_function_runtimes with a loop over
+the probe events, which keeps a stack of open entries per thread.
+
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+from probe import Probe, pair_probe_events
+
+PROBE_EVENTS = ['probe_myapp:compute_entry', 'probe_myapp:compute_exit__return']
+
+def make_probe(rows, categorical=True):
+    """ Probe with trace_data of rows (timestamp, tid, cpu, is_entry) """
+    timestamps, tids, cpus, is_entries = zip(*rows) if rows else ((),) * 4
+    codes = np.where(np.array(is_entries, dtype=bool), 0, 1).astype(np.int8)
+    events = pd.Categorical.from_codes(codes, PROBE_EVENTS) if categorical else \
+        pd.Series(np.array(PROBE_EVENTS, dtype=object)[codes], dtype=object)
+    probe = Probe('myapp', '/usr/bin/', '', 'compute', '')
+    probe.trace_data = pd.DataFrame({'tid': np.array(tids, dtype=np.int32), 'cpu': np.array(cpus, dtype=np.int16),
+                                     'timestamp': np.array(timestamps, dtype=np.int64), 'event': events})
+    probe.calculate_function_runtimes()
+    return probe
+
+def reference_pairs(tids, entries):
+    """ Pairs (entry, exit) of event positions, an exit closes the last open entry of its thread """
+    stacks = dict()
+    pairs = []
+    for position, (tid, is_entry) in enumerate(zip(tids, entries)):
+        stack = stacks.setdefault(tid, [])
+        if is_entry:
+            stack.append(position)
+        elif stack:
+            pairs.append((stack.pop(), position))
+    return sorted(pairs)
+
+def reference_runtimes(rows):
+    """ Rows (entry, exit, runtime, tid, cpu at the entry) of the paired calls sorted by entry """
+    pairs = reference_pairs([tid for _, tid, _, _ in rows], [is_entry for _, _, _, is_entry in rows])
+    return [(rows[entry][0], rows[exit][0], rows[exit][0] - rows[entry][0], rows[entry][1], rows[entry][2])
+            for entry, exit in pairs]
+
+def get_runtimes(probe):
+    assert len(probe.function_runtimes) == len(probe.function_tids) == len(probe.function_cpus)
+    return [tuple(runtime) + (tid, cpu) for runtime, tid, cpu in
+            zip(probe.function_runtimes.tolist(), probe.function_tids.tolist(), probe.function_cpus.tolist())]
+
+def test_edge_cases():
+    rows = [
+        # Thread 1: exit without entry (the record started within the call), then a recursive call
+        (10, 1, 0, False), (20, 1, 0, True), (25, 1, 0, True), (40, 1, 1, False), (50, 1, 1, False),
+        # Thread 2 runs the function concurrently on another CPU, its last entry has no exit
+        (22, 2, 2, True), (30, 2, 2, False), (45, 2, 3, True), (60, 1, 1, True), (70, 1, 1, False)]
+    rows.sort()
+    for categorical in (True, False):
+        runtimes = get_runtimes(make_probe(rows, categorical))
+        assert runtimes == reference_runtimes(rows)
+        assert runtimes == [(20, 50, 30, 1, 0), (22, 30, 8, 2, 2), (25, 40, 15, 1, 0), (60, 70, 10, 1, 1)]
+
+def test_empty_trace_data():
+    probe = make_probe([])
+    assert probe.function_runtimes.shape == (0, 3)
+    assert len(probe.function_tids) == len(probe.function_cpus) == len(probe.function_preempted_times) == 0
+    assert get_runtimes(make_probe([(10, 1, 0, False), (20, 2, 0, True)])) == []
+
+def test_window_boundary():
+    rows = [(10, 1, 0, True), (20, 1, 0, False), (30, 1, 0, True), (35, 2, 1, True), (40, 1, 0, False),
+            (45, 2, 1, False), (50, 1, 0, True), (60, 1, 0, False)]
+    # A window starting or stopping within a call leaves an exit without entry or an entry without exit
+    for start, stop in [(15, 60), (10, 55), (32, 42), (41, 44), (0, 100)]:
+        window_rows = [row for row in rows if start <= row[0] <= stop]
+        assert get_runtimes(make_probe(window_rows)) == reference_runtimes(window_rows)
+    assert get_runtimes(make_probe([row for row in rows if 32 <= row[0] <= 55])) == [(35, 45, 10, 2, 1)]
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('threads', [1, 4])
+def test_random_events(seed, threads):
+    rng = np.random.default_rng(seed)
+    for length in (1, 2, 30, 1000):
+        tids = rng.integers(0, threads, length)
+        entries = rng.random(length) < 0.5
+        entry_indices, exit_indices = pair_probe_events(tids, entries)
+        assert list(zip(entry_indices.tolist(), exit_indices.tolist())) == \
+            reference_pairs(tids.tolist(), entries.tolist())
+
+def test_flat_calls_of_concurrent_threads():
+    rng = np.random.default_rng(0)
+    # Calls without nesting per thread, the threads interleaved
+    tids = rng.integers(0, 8, 1000)
+    order = np.argsort(tids, kind='stable')
+    entries = np.empty(len(tids), dtype=bool)
+    entries[order] = np.arange(len(tids)) % 2 == 0
+    rows = list(zip((np.arange(len(tids)) * 10).tolist(), tids.tolist(), (tids % 4).tolist(), entries.tolist()))
+    assert get_runtimes(make_probe(rows)) == reference_runtimes(rows)
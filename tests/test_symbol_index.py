@@ -0,0 +1,146 @@
+"""
+perfViewer
+Module: test_symbol_index
+Responsible: Brandtner Philipp
+Description:
+Checks the parsing of readelf and c++filt output into the symbol index and the selection of the functions of a probe,
+with the output of the tools recorded from an executable.
+
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import symbolindex
+from probe import Probe
+
+READELF_OUTPUT = """
+Symbol table '.dynsym' contains 4 entries:
+   Num:    Value          Size Type    Bind   Vis      Ndx Name
+     0: 0000000000000000     0 NOTYPE  LOCAL  DEFAULT  UND
+     1: 0000000000000000     0 FUNC    GLOBAL DEFAULT  UND _ZNSt8ios_base4InitC1Ev@GLIBCXX_3.4 (2)
+     2: 00000000000011a0    24 FUNC    GLOBAL DEFAULT   16 _ZN2ns5Class3runEi@@MYAPP_1.0
+     3: 0000000000004010     4 OBJECT  GLOBAL DEFAULT   26 counter
+
+Symbol table '.symtab' contains 14 entries:
+   Num:    Value          Size Type    Bind   Vis      Ndx Name
+     0: 0000000000000000     0 NOTYPE  LOCAL  DEFAULT  UND
+     1: 0000000000000000     0 FILE    LOCAL  DEFAULT  ABS main.cpp
+     2: 00000000000011a0    24 FUNC    GLOBAL DEFAULT   16 _ZN2ns5Class3runEi
+     3: 00000000000011c0    40 FUNC    GLOBAL DEFAULT   16 _ZN2ns5Class3runEid
+     4: 0000000000001200    12 FUNC    GLOBAL DEFAULT   16 _ZNK2ns5Class3runEv
+     5: 0000000000001220    16 FUNC    WEAK   DEFAULT   16 _ZN2ns3getIiEET_S1_
+     6: 0000000000001240    30 FUNC    LOCAL  DEFAULT   16 _ZN2ns5Class3runEi.cold
+     7: 0000000000001260     8 FUNC    GLOBAL DEFAULT   16 _ZThn8_N2ns5Class3runEi
+     8: 0000000000001280    20 FUNC    GLOBAL DEFAULT   16 _ZN2nsltERKNS_1AES2_
+     9: 00000000000012a0    20 FUNC    GLOBAL DEFAULT   16 _ZN2ns8callbackEPFviE
+    10: 00000000000012c0    10 FUNC    GLOBAL DEFAULT   16 c_function
+    11: 00000000000012e0    90 FUNC    GLOBAL DEFAULT   16 main
+    12: 0000000000004010     4 OBJECT  GLOBAL DEFAULT   26 counter
+    13: 0000000000000000     0 FUNC    GLOBAL DEFAULT  UND printf@GLIBC_2.2.5
+"""
+
+# c++filt output for the functions of READELF_OUTPUT
+DEMANGLED_NAMES = {
+    '_ZN2ns5Class3runEi': 'ns::Class::run(int)',
+    '_ZN2ns5Class3runEid': 'ns::Class::run(int, double)',
+    '_ZNK2ns5Class3runEv': 'ns::Class::run() const',
+    '_ZN2ns3getIiEET_S1_': 'int ns::get<int>(int)',
+    '_ZN2ns5Class3runEi.cold': 'ns::Class::run(int) [clone .cold]',
+    '_ZThn8_N2ns5Class3runEi': 'non-virtual thunk to ns::Class::run(int)',
+    '_ZN2nsltERKNS_1AES2_': 'ns::operator<(ns::A const&, ns::A const&)',
+    '_ZN2ns8callbackEPFviE': 'ns::callback(void (*)(int))',
+    'c_function': 'c_function',
+    'main': 'main'}
+
+@pytest.fixture
+def tool_calls(monkeypatch):
+    """ Replace readelf and c++filt with their recorded output, return the list of called commands """
+    calls = []
+
+    def run_tool(command, tool_input=None):
+        calls.append(command[0])
+        if command[0] == 'readelf':
+            return READELF_OUTPUT
+        return ''.join(DEMANGLED_NAMES[mangled] + '\n' for mangled in tool_input.splitlines())
+
+    monkeypatch.setattr(symbolindex, 'run_tool', run_tool)
+    return calls
+
+@pytest.mark.parametrize('demangled, expected', [
+    ('ns::Class::run(int, double) const', ('ns::Class::run', '(int, double) const')),
+    ('c_function', ('c_function', '')),
+    ('int ns::get<int>(int)', ('ns::get<int>', '(int)')),
+    ('std::pair<int, int> ns::make<std::pair<int, int> >()', ('ns::make<std::pair<int, int> >', '()')),
+    ('ns::callback(void (*)(int))', ('ns::callback', '(void (*)(int))')),
+    ('ns::operator<(ns::A const&, ns::A const&)', ('ns::operator<', '(ns::A const&, ns::A const&)')),
+    ('ns::Class::operator()(int)', ('ns::Class::operator()', '(int)')),
+    ('ns::Class::operator new(unsigned long)', ('ns::Class::operator new', '(unsigned long)'))])
+def test_split_demangled_name(demangled, expected):
+    assert symbolindex.split_demangled_name(demangled) == expected
+
+def test_symbol_table(tool_calls):
+    symbol_index = symbolindex.SymbolIndex('/usr/bin/myapp')
+    # One call of each tool for the whole symbol table
+    assert tool_calls == ['readelf', 'c++filt']
+    # Undefined functions, objects, thunks and clones are left out, the versioned dynamic symbol is the same function
+    assert symbol_index.symbols == {
+        ('ns::Class::run', '(int)'): ('_ZN2ns5Class3runEi', '00000000000011a0'),
+        ('ns::Class::run', '(int, double)'): ('_ZN2ns5Class3runEid', '00000000000011c0'),
+        ('ns::Class::run', '() const'): ('_ZNK2ns5Class3runEv', '0000000000001200'),
+        ('ns::get<int>', '(int)'): ('_ZN2ns3getIiEET_S1_', '0000000000001220'),
+        ('ns::operator<', '(ns::A const&, ns::A const&)'): ('_ZN2nsltERKNS_1AES2_', '0000000000001280'),
+        ('ns::callback', '(void (*)(int))'): ('_ZN2ns8callbackEPFviE', '00000000000012a0'),
+        ('c_function', ''): ('c_function', '00000000000012c0'),
+        ('main', ''): ('main', '00000000000012e0')}
+    assert len(symbol_index) == 8
+    assert symbol_index.get('ns::Class::run', '(int)') == ('_ZN2ns5Class3runEi', '00000000000011a0')
+    assert symbol_index.get('ns::Class::run', '(float)') is None
+
+@pytest.mark.parametrize('namespace, function, arguments, expected', [
+    # All overloads, overloads selected by the argument list with any whitespace
+    ('ns::Class', 'run', None, [('ns::Class::run', '(int)'), ('ns::Class::run', '(int, double)'),
+                                ('ns::Class::run', '() const')]),
+    ('ns::Class', 'run', 'int', [('ns::Class::run', '(int)')]),
+    ('ns::Class', 'run', 'int,  double', [('ns::Class::run', '(int, double)')]),
+    ('ns::Class', 'run', '', [('ns::Class::run', '() const')]),
+    # No overload with the argument list keeps all overloads for the selection by the user
+    ('ns::Class', 'run', 'float', [('ns::Class::run', '(int)'), ('ns::Class::run', '(int, double)'),
+                                   ('ns::Class::run', '() const')]),
+    # Innermost namespace of the function, template instances and functions without namespace
+    ('Class', 'run', 'int', [('ns::Class::run', '(int)')]),
+    ('ns', 'get', None, [('ns::get<int>', '(int)')]),
+    ('', 'c_function', None, [('c_function', '')]),
+    ('ns', 'missing', None, []),
+    ('', 'run', None, [])])
+def test_find(tool_calls, namespace, function, arguments, expected):
+    assert symbolindex.SymbolIndex('/usr/bin/myapp').find(namespace, function, arguments) == expected
+
+def test_mangle_function_name(tool_calls, monkeypatch):
+    symbol_index = symbolindex.SymbolIndex('/usr/bin/myapp')
+    probe = Probe('myapp', '/usr/bin/', 'ns::Class', 'run', 'int, double')
+    probe.mangle_function_name(symbol_index)
+    assert (probe.mangled_function, probe.function_address) == ('_ZN2ns5Class3runEid', '00000000000011c0')
+
+    # Overloads without matching argument list are chosen by the user, invalid choices are asked again
+    answers = iter(['x', '3', '2'])
+    monkeypatch.setattr('builtins.input', lambda prompt: next(answers))
+    probe = Probe('myapp', '/usr/bin/', 'ns::Class', 'run', 'float')
+    probe.mangle_function_name(symbol_index)
+    assert (probe.mangled_function, probe.function_address) == ('_ZNK2ns5Class3runEv', '0000000000001200')
+
+    probe = Probe('myapp', '/usr/bin/', 'ns', 'missing', '')
+    probe.mangle_function_name(symbol_index)
+    assert (probe.mangled_function, probe.function_address) == (0, 0)
+
+def test_failing_tools(monkeypatch):
+    monkeypatch.setattr(symbolindex, 'run_tool', lambda command, tool_input=None: None)
+    assert len(symbolindex.SymbolIndex('/usr/bin/myapp')) == 0
+
+    # c++filt output not matching the symbols gives an empty index
+    monkeypatch.setattr(symbolindex, 'run_tool', lambda command, tool_input=None:
+                        READELF_OUTPUT if command[0] == 'readelf' else 'ns::Class::run(int)\n')
+    assert len(symbolindex.SymbolIndex('/usr/bin/myapp')) == 0
@@ -0,0 +1,162 @@
+"""
+perfViewer
+Module: test_task_runtime
+Responsible: Brandtner Philipp
+Description:
+Compares the per-CPU runtime reconstruction of task.reconstruct_runtime_slices with a plain loop over the events of
+each CPU on synthetic traces.
+
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import task
+
+SWITCH, RUNTIME, WAKING, WAKEUP, IRQ_ENTRY, IRQ_EXIT, IDLE, MIGRATE = range(8)
+INTERRUPTING_CODES = {WAKING: WAKEUP, IRQ_ENTRY: IRQ_EXIT, IDLE: IDLE}
+
+def make_events(rows):
+    """ Events dictionary of rows (timestamp, cpu, event, tid, runtime), sorted by timestamp """
+    rows = sorted(rows, key=lambda row: row[0])
+    timestamps, cpus, codes, tids, runtimes = zip(*rows) if rows else ((),) * 5
+    return {'event': np.array(codes, dtype=np.int8), 'task': np.array(tids, dtype=np.int8),
+            'tid': np.array(tids, dtype=np.int32), 'cpu': np.array(cpus, dtype=np.int16),
+            'timestamp': np.array(timestamps, dtype=np.int64), 'runtime': np.array(runtimes, dtype=np.int64),
+            'sequence': np.arange(len(rows), dtype=np.int64)}
+
+def reconstruct_reference(events, skipping_cpus=frozenset()):
+    """ Runtime elements, pending events and skipping CPUs of a loop over the events of each CPU """
+    elements = []
+    pending = []
+    next_skipping_cpus = set(skipping_cpus)
+    for cpu in np.unique(events['cpu']).tolist():
+        rows = np.flatnonzero(events['cpu'] == cpu).tolist()
+        start = None
+        skipping = cpu in skipping_cpus
+        correction = 0
+        position = 0
+        while position < len(rows):
+            row = rows[position]
+            code = int(events['event'][row])
+            if code == SWITCH:
+                if start is not None and not skipping:
+                    elements.append((row, events['timestamp'][start], events['timestamp'][row] - correction))
+                start, skipping, correction = row, False, 0
+                next_skipping_cpus.discard(cpu)
+            elif skipping:
+                pass
+            elif code == RUNTIME:
+                elements.append((row, events['timestamp'][row], events['timestamp'][row] + events['runtime'][row]))
+                skipping = start is not None
+            elif code in INTERRUPTING_CODES and start is not None:
+                ends = [end for end in rows[position + 1:] if events['event'][end] == INTERRUPTING_CODES[code]]
+                if not ends:
+                    break
+                correction += events['timestamp'][ends[0]] - events['timestamp'][row]
+                position = rows.index(ends[0])
+            position += 1
+
+        if start is not None and skipping:
+            next_skipping_cpus.add(cpu)
+        elif start is not None:
+            pending.extend(rows[rows.index(start):])
+
+    elements.sort()
+    runtime_elements = {'task': events['task'][[row for row, _, _ in elements]],
+                        'tid': events['tid'][[row for row, _, _ in elements]],
+                        'start': np.array([start for _, start, _ in elements], dtype=np.int64),
+                        'stop': np.array([stop for _, _, stop in elements], dtype=np.int64),
+                        'cpu': events['cpu'][[row for row, _, _ in elements]].astype(np.int64),
+                        'sequence': events['sequence'][[row for row, _, _ in elements]]}
+    return runtime_elements, np.array(sorted(pending), dtype=np.int64), next_skipping_cpus
+
+def reconstruct(events, skipping_cpus=frozenset()):
+    return task.reconstruct_runtime_slices(events, SWITCH, RUNTIME, INTERRUPTING_CODES, skipping_cpus)
+
+def assert_same_reconstruction(events, skipping_cpus=frozenset()):
+    runtime_elements, pending, next_skipping_cpus = reconstruct(events, skipping_cpus)
+    expected_elements, expected_pending, expected_skipping_cpus = reconstruct_reference(events, skipping_cpus)
+    for name, values in expected_elements.items():
+        np.testing.assert_array_equal(runtime_elements[name], values, err_msg=name)
+    np.testing.assert_array_equal(pending, expected_pending)
+    assert next_skipping_cpus == expected_skipping_cpus
+
+def make_trace():
+    """
+    Two CPUs with idle, an irq, a waking, back-to-back switches, sched_stat_runtime before the first and inside a
+    runtime element, an open last element on CPU 0 and one reported by sched_stat_runtime on CPU 1
+    """
+    return make_events([
+        # CPU 0: runtime before the first switch, element with an irq, idle between switches, back-to-back switches
+        (100, 0, RUNTIME, 7, 40), (200, 0, SWITCH, 1, 0), (250, 0, IRQ_ENTRY, 1, 0), (270, 0, IRQ_EXIT, 1, 0),
+        (300, 0, SWITCH, 1, 0), (310, 0, IDLE, 0, 0), (360, 0, MIGRATE, 3, 0), (400, 0, IDLE, 0, 0),
+        (450, 0, SWITCH, 2, 0), (450, 0, SWITCH, 3, 0), (451, 0, SWITCH, 4, 0), (500, 0, WAKING, 4, 0),
+        (505, 0, WAKEUP, 4, 0), (520, 0, SWITCH, 4, 0), (600, 0, IRQ_ENTRY, 5, 0),
+        # CPU 1: element reported by sched_stat_runtime, events up to the next switch are skipped
+        (150, 1, SWITCH, 8, 0), (180, 1, RUNTIME, 8, 25), (190, 1, IRQ_ENTRY, 8, 0), (195, 1, IRQ_EXIT, 8, 0),
+        (220, 1, SWITCH, 8, 0), (230, 1, IDLE, 0, 0), (330, 1, IDLE, 0, 0), (340, 1, SWITCH, 9, 0),
+        (700, 1, RUNTIME, 10, 30)])
+
+def make_random_trace(seed, length=2000, cpus=4):
+    rng = np.random.default_rng(seed)
+    codes = rng.choice([SWITCH, RUNTIME, WAKING, WAKEUP, IRQ_ENTRY, IRQ_EXIT, IDLE, MIGRATE], size=length,
+                       p=[0.3, 0.1, 0.1, 0.1, 0.1, 0.1, 0.15, 0.05])
+    # Steps of 0 give equal timestamps of back-to-back events
+    timestamps = np.cumsum(rng.integers(0, 5, size=length))
+    return make_events(list(zip(timestamps.tolist(), rng.integers(0, cpus, size=length).tolist(), codes.tolist(),
+                                rng.integers(1, 20, size=length).tolist(), rng.integers(1, 50, size=length).tolist())))
+
+def select_events(events, selected):
+    return {name: values[selected] for name, values in events.items()}
+
+def test_synthetic_trace():
+    events = make_trace()
+    assert_same_reconstruction(events)
+    runtime_elements, pending, next_skipping_cpus = reconstruct(events)
+    # Slices of CPU 0: runtime before the first switch, the irq is subtracted, idle up to the switch at 450, the
+    # back-to-back switches give a slice of 0 and 1 ns, the waking is subtracted
+    assert list(zip(runtime_elements['start'][runtime_elements['cpu'] == 0].tolist(),
+                    runtime_elements['stop'][runtime_elements['cpu'] == 0].tolist())) == \
+        [(100, 140), (200, 280), (300, 360), (450, 450), (450, 451), (451, 515)]
+    # The last element of CPU 0 is open, the one of CPU 1 is reported by sched_stat_runtime and CPU 1 skips its
+    # events up to the next switch
+    assert events['timestamp'][pending].tolist() == [520, 600]
+    assert next_skipping_cpus == {1}
+
+@pytest.mark.parametrize('skipping_cpus', [frozenset(), frozenset({1})])
+@pytest.mark.parametrize('window', [(None, None), (210, None), (None, 455), (305, 450)])
+def test_window_clipping(window, skipping_cpus):
+    events = make_trace()
+    start, stop = window
+    in_window = np.ones(len(events['timestamp']), dtype=bool)
+    if start is not None:
+        in_window &= events['timestamp'] >= start
+    if stop is not None:
+        in_window &= events['timestamp'] <= stop
+    assert_same_reconstruction(select_events(events, np.flatnonzero(in_window)), skipping_cpus)
+
+@pytest.mark.parametrize('seed', range(10))
+def test_random_trace(seed):
+    events = make_random_trace(seed)
+    assert_same_reconstruction(events)
+    assert_same_reconstruction(select_events(events, np.arange(len(events['timestamp']) // 3,
+                                                               len(events['timestamp']) * 2 // 3)), frozenset({0, 2}))
+
+@pytest.mark.parametrize('seed', range(5))
+def test_chunked_trace(seed):
+    """ Pending events and skipping CPUs carried over to the next chunk give the runtime elements of one pass """
+    events = make_random_trace(seed)
+    expected_elements, _, _ = reconstruct(events)
+
+    split = len(events['timestamp']) // 2
+    first_elements, pending, skipping_cpus = reconstruct(select_events(events, np.arange(split)))
+    second = np.concatenate((pending, np.arange(split, len(events['timestamp']))))
+    second_elements, _, _ = reconstruct(select_events(events, second), skipping_cpus)
+    for name, values in expected_elements.items():
+        np.testing.assert_array_equal(np.concatenate((first_elements[name], second_elements[name])), values,
+                                      err_msg=name)
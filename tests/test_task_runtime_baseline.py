@@ -0,0 +1,240 @@
+"""
+perfViewer
+Module: test_task_runtime_baseline
+Responsible: Brandtner Philipp
+Description:
+Compares task.process_task_runtime with the event loop of the first perfViewer release on perf dump excerpts. The
+loop is kept below unchanged apart from recording the runtime elements instead of creating Task objects and stepping
+over the events it has no branch for (sched_migrate_task, a sched_wakeup or irq exit without its start), on which it
+did not terminate. It runs one state machine over the events of all CPUs, the reconstruction per CPU gives its
+results for the events of each CPU.
+
+The loop keeps no preemption counter. The nearest it has is the number of runtime elements of a task, each ends
+with the task being switched out or reported by sched_stat_runtime, which is compared as the element count.
+
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import dataimporterexporter
+import task
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Four CPUs, tasks switched in on several CPUs and two sched_migrate_task events
+EXCERPT_FILENAME = 'task_runtime_excerpt.dump'
+
+# myapp (2001) runs on CPU 0 with an irq and a waking inside its runtime elements, is reported by sched_stat_runtime,
+# migrated and runs on CPU 1. The events of the CPUs do not interleave, so the loop over all CPUs sees the same
+# runtime elements as a loop per CPU.
+MIGRATION_DUMP = b"""\
+       swapper/0      0 [000]  1630.000100: sched:sched_switch: prev_comm=swapper/0 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=myapp next_pid=2001 next_prio=120
+           myapp   2001 [000]  1630.000150: irq:irq_handler_entry: irq=30 name=eth0
+           myapp   2001 [000]  1630.000170: irq:irq_handler_exit: irq=30 ret=handled
+           myapp   2001 [000]  1630.000300: sched:sched_switch: prev_comm=myapp prev_pid=2001 prev_prio=120 prev_state=R+ ==> next_comm=kworker/0:1 next_pid=55 next_prio=120
+     kworker/0:1     55 [000]  1630.000340: sched:sched_waking: comm=myapp pid=2001 prio=120 target_cpu=000
+     kworker/0:1     55 [000]  1630.000345: sched:sched_wakeup: comm=myapp pid=2001 prio=120 target_cpu=000
+     kworker/0:1     55 [000]  1630.000400: sched:sched_switch: prev_comm=kworker/0:1 prev_pid=55 prev_prio=120 prev_state=D ==> next_comm=myapp next_pid=2001 next_prio=120
+           myapp   2001 [000]  1630.000460: sched:sched_stat_runtime: comm=myapp pid=2001 runtime=45000 [ns] vruntime=909757328 [ns]
+           myapp   2001 [000]  1630.000470: irq:irq_handler_entry: irq=31 name=timer
+           myapp   2001 [000]  1630.000480: irq:irq_handler_exit: irq=31 ret=handled
+     kworker/1:0     56 [001]  1630.000500: sched:sched_migrate_task: comm=myapp pid=2001 prio=120 orig_cpu=0 dest_cpu=1
+       swapper/1      0 [001]  1630.000510: power:cpu_idle: state=4294967295 cpu_id=1
+       swapper/1      0 [001]  1630.000520: sched:sched_switch: prev_comm=swapper/1 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=myapp next_pid=2001 next_prio=120
+           myapp   2001 [001]  1630.000600: sched:sched_switch: prev_comm=myapp prev_pid=2001 prev_prio=120 prev_state=S ==> next_comm=swapper/1 next_pid=0 next_prio=120
+       swapper/1      0 [001]  1630.000610: power:cpu_idle: state=1 cpu_id=1
+       swapper/1      0 [001]  1630.000700: power:cpu_idle: state=4294967295 cpu_id=1
+       swapper/1      0 [001]  1630.000710: sched:sched_switch: prev_comm=swapper/1 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=myapp next_pid=2001 next_prio=120
+           myapp   2001 [001]  1630.000800: sched:sched_switch: prev_comm=myapp prev_pid=2001 prev_prio=120 prev_state=R+ ==> next_comm=swapper/1 next_pid=0 next_prio=120
+"""
+
+def baseline_process_task_runtime(perf_data_df):
+    """
+    Event loop of process_task_runtime of the first release. Timestamps are seconds, events are strings.
+    :return: Dictionary of (task, tid): list of runtime elements [start, duration, cpu]
+    """
+    runtimes = dict()
+
+    def set_task_runtime(name, tid, start_time, stop_time, cpu):
+        runtimes.setdefault((name, tid), []).append([start_time, stop_time - start_time, cpu])
+
+    perf_data_df = perf_data_df.sort_values('timestamp')
+
+    perf_data_df = perf_data_df.reset_index(drop=True)
+    # process all perf events
+    i = 0
+
+    while i < len(perf_data_df):
+        entry_i = perf_data_df.iloc[i]
+        entry_i_event = entry_i['event']
+
+        if entry_i_event == 'sched:sched_switch':
+            runtime_correction = 0
+            k = i + 1
+            while k < len(perf_data_df):
+                entry_k = perf_data_df.iloc[k]
+                entry_k_event = entry_k['event']
+
+                if entry_k_event == 'sched:sched_stat_runtime':
+                    set_task_runtime(entry_k['task'], entry_k['tid'], entry_k['timestamp'],
+                                     entry_k['timestamp'] + entry_k['runtime'] * 1e-9, entry_k['cpu'])
+                    while perf_data_df.iloc[k]['event'] != 'sched:sched_switch':
+                        k += 1
+                    i = k-1
+                    break
+
+                elif entry_k_event == 'sched:sched_waking':
+                    x = k + 1
+                    while True:
+                        entry_x = perf_data_df.iloc[x]
+                        entry_x_event = entry_x['event']
+
+                        if entry_x_event == 'sched:sched_wakeup':
+                            runtime_correction += entry_x['timestamp'] - entry_k['timestamp']
+                            k = x + 1
+                            break
+                        x += 1
+
+                elif entry_k_event == 'irq:softirq_raise':
+                    x = k + 1
+                    while True:
+                        entry_x = perf_data_df.iloc[x]
+                        entry_x_event = entry_x['event']
+
+                        if entry_x_event == 'irq:softirq_exit':
+                            runtime_correction += entry_x['timestamp'] - entry_k['timestamp']
+                            k = x + 1
+                            break
+                        x += 1
+
+                elif entry_k_event == 'irq:irq_handler_entry':
+                    x = k + 1
+                    while True:
+                        entry_x = perf_data_df.iloc[x]
+                        entry_x_event = entry_x['event']
+
+                        if entry_x_event == 'irq:irq_handler_exit':
+                            runtime_correction += entry_x['timestamp'] - entry_k['timestamp']
+                            k = x + 1
+                            break
+                        x += 1
+
+                elif entry_k_event == 'power:cpu_idle':
+                    x = k + 1
+                    while True:
+                        entry_x = perf_data_df.iloc[x]
+                        entry_x_event = entry_x['event']
+
+                        if entry_x_event == 'power:cpu_idle':
+                            runtime_correction += entry_x['timestamp'] - entry_k['timestamp']
+                            k = x + 1
+                            break
+                        x += 1
+
+                elif entry_k_event == 'sched:sched_switch':
+                    set_task_runtime(entry_k['task'], entry_k['tid'], entry_i['timestamp'],
+                                     entry_k['timestamp'] - runtime_correction, entry_i['cpu'])
+                    i = k-1
+                    break
+
+                else:
+                    # Not in the first release, which never stepped over these events and did not terminate
+                    k += 1
+
+        elif entry_i_event == 'sched:sched_stat_runtime':
+            set_task_runtime(entry_i['task'], entry_i['tid'], entry_i['timestamp'],
+                             entry_i['timestamp'] + entry_i['runtime'] * 1e-9, entry_i['cpu'])
+        i+=1
+    return runtimes
+
+def import_dump(data):
+    """ Imported files of a perf dump with the events of all dump files, keyed like perfviewer.import_target_files """
+    lines = data.splitlines(keepends=True)
+    imported_files = dict()
+    for event, (key, columns) in dataimporterexporter.PERF_DATA_EVENTS.items():
+        event_lines = b''.join(line for line in lines if (' ' + event + ': ').encode() in line)
+        imported_files[key] = dataimporterexporter.parse_perf_dump(event_lines, columns)
+    dataimporterexporter.unify_imported_files(imported_files)
+    return imported_files
+
+def get_baseline_events(imported_files):
+    """ Merged events as imported by the first release, timestamps in seconds and events as strings """
+    perf_data_df = pd.concat([imported_files[key] for key, _ in dataimporterexporter.PERF_DATA_EVENTS.values()],
+                             ignore_index=True)
+    perf_data_df = perf_data_df.astype({'task': object, 'event': object})
+    perf_data_df['timestamp'] = perf_data_df['timestamp'] / 1e9
+    return perf_data_df.sort_values('timestamp', kind='mergesort', ignore_index=True)
+
+def get_task_runtimes(imported_files):
+    """ Runtime elements of process_task_runtime, dictionary of (task, tid): list of (start, duration, cpu) in ns """
+    return {(runtime_task.name, runtime_task.number):
+            list(zip(runtime_task.get_task_runtime()['start'].tolist(),
+                     runtime_task.get_task_runtime()['duration'].tolist(),
+                     runtime_task.get_cpu_to_runtime().tolist()))
+            for runtime_task in task.process_task_runtime(imported_files) if len(runtime_task.get_task_runtime())}
+
+def to_nanoseconds(baseline_runtimes):
+    """ Runtime elements of the baseline loop in integer nanoseconds """
+    return {key: [(int(round(start * 1e9)), int(round(duration * 1e9)), int(cpu)) for start, duration, cpu in elements]
+            for key, elements in baseline_runtimes.items()}
+
+def assert_same_tasks(task_runtimes, baseline_runtimes):
+    assert set(task_runtimes) == set(baseline_runtimes)
+    for key, elements in baseline_runtimes.items():
+        # Elements, element count and total runtime of each task
+        assert sorted(task_runtimes[key]) == sorted(elements), key
+        assert len(task_runtimes[key]) == len(elements), key
+        assert sum(duration for _, duration, _ in task_runtimes[key]) == \
+            sum(duration for _, duration, _ in elements), key
+
+def test_recorded_excerpt_per_cpu():
+    with open(os.path.join(FIXTURE_DIR, EXCERPT_FILENAME), 'rb') as dump_file:
+        imported_files = import_dump(dump_file.read())
+    perf_data_df = get_baseline_events(imported_files)
+
+    baseline_runtimes = dict()
+    for _, cpu_events_df in perf_data_df.groupby('cpu', sort=True):
+        for key, elements in to_nanoseconds(baseline_process_task_runtime(cpu_events_df)).items():
+            baseline_runtimes.setdefault(key, []).extend(elements)
+    task_runtimes = get_task_runtimes(imported_files)
+    assert_same_tasks(task_runtimes, baseline_runtimes)
+
+    # Tasks switched in on several CPUs keep the CPU of each runtime element
+    assert {cpu for _, _, cpu in task_runtimes[('kworker/0:1', 55)]} == {0, 1, 2, 3}
+    assert {cpu for _, _, cpu in task_runtimes[('sshd', 800)]} == {0, 1, 3}
+
+def test_migration_matches_loop_over_all_cpus():
+    imported_files = import_dump(MIGRATION_DUMP)
+    baseline_runtimes = to_nanoseconds(baseline_process_task_runtime(get_baseline_events(imported_files)))
+    task_runtimes = get_task_runtimes(imported_files)
+    assert_same_tasks(task_runtimes, baseline_runtimes)
+
+    # CPU 0: the irq is subtracted, sched_stat_runtime reports the second element. CPU 1 after the migration: the
+    # idle between the runtime elements belongs to swapper/1.
+    assert sorted(task_runtimes[('myapp', 2001)]) == [(1630000100000, 180000, 0), (1630000460000, 45000, 0),
+                                                      (1630000520000, 80000, 1), (1630000710000, 90000, 1)]
+    assert task_runtimes[('swapper/1', 0)] == [(1630000600000, 20000, 1)]
+
+@pytest.mark.parametrize('chunks', [2, 3])
+def test_recorded_excerpt_in_chunks(chunks):
+    """ The excerpt streamed in chunks gives the runtime elements of one pass """
+    with open(os.path.join(FIXTURE_DIR, EXCERPT_FILENAME), 'rb') as dump_file:
+        imported_files = import_dump(dump_file.read())
+    perf_data_df = pd.concat([imported_files[key] for key, _ in dataimporterexporter.PERF_DATA_EVENTS.values()],
+                             ignore_index=True).sort_values('timestamp', kind='mergesort', ignore_index=True)
+    expected = get_task_runtimes(imported_files)
+
+    chunked = {(runtime_task.name, runtime_task.number):
+               list(zip(runtime_task.get_task_runtime()['start'].tolist(),
+                        runtime_task.get_task_runtime()['duration'].tolist(),
+                        runtime_task.get_cpu_to_runtime().tolist()))
+               for runtime_task in task.process_perf_events(
+                   perf_data_df.iloc[rows] for rows in np.array_split(np.arange(len(perf_data_df)), chunks))
+               if len(runtime_task.get_task_runtime())}
+    assert chunked == expected
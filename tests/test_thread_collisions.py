@@ -0,0 +1,167 @@
+"""
+perfViewer
+Module: test_thread_collisions
+Responsible: Brandtner Philipp
+Description:
+Compares the collisions of probe.get_thread_collisions and Probe.evaluate_contextswitch_irq_collisions with a loop
+over the events of each interval, which follows the thread across its preemptions and migrations.
+
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import probe
+
+def make_switches(rows):
+    """ sched_switch events of rows (timestamp, cpu, prev_pid, next_pid) """
+    timestamps, cpus, prev_pids, next_pids = zip(*rows) if rows else ((),) * 4
+    return pd.DataFrame({'cpu': np.array(cpus, dtype=np.int16), 'timestamp': np.array(timestamps, dtype=np.int64),
+                         'prev_pid': np.array(prev_pids, dtype=np.int32),
+                         'next_comm': pd.Categorical(['task' + str(pid) for pid in next_pids]),
+                         'next_pid': np.array(next_pids, dtype=np.int32)})
+
+def make_irqs(rows):
+    """ irq_handler_entry events of rows (timestamp, cpu) """
+    timestamps, cpus = zip(*rows) if rows else ((),) * 2
+    return pd.DataFrame({'cpu': np.array(cpus, dtype=np.int16), 'timestamp': np.array(timestamps, dtype=np.int64),
+                         'irq_source': pd.Categorical(['irq' + str(cpu) for cpu in cpus])})
+
+def reference_collisions(sched_switch_df, irq_handler_entry_df, intervals):
+    """
+    Rows of the preemptions and interrupts and the preempted time of each interval (start, stop, tid, cpu). The
+    thread runs on cpu at start, a switch-out of the thread preempts it until its next switch-in, which sets its CPU.
+    Interrupts count while the thread runs on the CPU of the interrupt, not at the timestamp of its switch-in or
+    switch-out.
+    """
+    events = sorted([(timestamp, 0, row) for row, timestamp in enumerate(sched_switch_df['timestamp'].tolist())] +
+                    [(timestamp, 1, row) for row, timestamp in enumerate(irq_handler_entry_df['timestamp'].tolist())])
+    switches = sched_switch_df[['cpu', 'prev_pid', 'next_pid']].values.tolist()
+    irq_cpus = irq_handler_entry_df['cpu'].tolist()
+    collisions = []
+    for start, stop, tid, cpu in intervals:
+        csw_rows, irq_rows = [], []
+        preempted_time = 0
+        preempted_at = resumed_at = None
+        for timestamp, is_irq, row in events:
+            if not start < timestamp < stop:
+                continue
+            if is_irq:
+                if preempted_at is None and irq_cpus[row] == cpu and timestamp != resumed_at:
+                    irq_rows.append(row)
+            elif switches[row][1] == tid:
+                csw_rows.append(row)
+                preempted_at = timestamp
+            elif switches[row][2] == tid and preempted_at is not None:
+                preempted_time += timestamp - preempted_at
+                preempted_at = None
+                resumed_at = timestamp
+                cpu = switches[row][0]
+        if preempted_at is not None:
+            preempted_time += stop - preempted_at
+        collisions.append((csw_rows, irq_rows, preempted_time))
+    return collisions
+
+def split_rows(rows, counts):
+    return [part.tolist() for part in np.split(rows, np.cumsum(counts)[:-1])]
+
+def assert_same_collisions(sched_switch_df, irq_handler_entry_df, intervals):
+    starts, stops, tids, cpus = (np.array(column, dtype=np.int64) for column in zip(*intervals))
+    csw_rows, csw_counts, irq_rows, irq_counts, preempted_times = \
+        probe.get_thread_collisions(sched_switch_df, irq_handler_entry_df, starts, stops, tids, cpus)
+    collisions = list(zip(split_rows(csw_rows, csw_counts), split_rows(irq_rows, irq_counts),
+                          preempted_times.tolist()))
+    assert collisions == [tuple(collision) for collision in
+                          reference_collisions(sched_switch_df, irq_handler_entry_df, intervals)]
+    return collisions
+
+def simulate_events(seed, length=400, threads=3, cpus=4):
+    """ sched_switch and irq_handler_entry events of threads 1 to threads migrating between cpus """
+    rng = np.random.default_rng(seed)
+    running = {tid: int(rng.integers(0, cpus)) for tid in range(1, threads + 1)}
+    history = []
+    switch_rows, irq_rows = [], []
+    # Distinct timestamps, a switch-in and switch-out at the same timestamp have no order
+    for timestamp in np.cumsum(rng.integers(1, 10, length)).tolist():
+        tid = int(rng.integers(1, threads + 1))
+        action = rng.random()
+        if action < 0.5:
+            irq_rows.append((timestamp, int(rng.integers(0, cpus))))
+        elif action < 0.7 and running[tid] is not None:
+            switch_rows.append((timestamp, running[tid], tid, 100 + running[tid]))
+            running[tid] = None
+        elif action < 0.9 and running[tid] is None:
+            running[tid] = int(rng.integers(0, cpus))
+            switch_rows.append((timestamp, running[tid], 100 + running[tid], tid))
+        else:
+            # Switches between other tasks
+            switch_rows.append((timestamp, int(rng.integers(0, cpus)), 200, 201))
+        history.append((timestamp, dict(running)))
+
+    # Intervals starting while the thread runs, stopping anywhere later
+    intervals = []
+    for _ in range(60):
+        position = int(rng.integers(0, len(history) - 1))
+        timestamp, state = history[position]
+        tid = int(rng.integers(1, threads + 1))
+        if state[tid] is not None:
+            stop = history[min(position + int(rng.integers(0, 80)), len(history) - 1)][0] + int(rng.integers(0, 2))
+            intervals.append((timestamp + int(rng.integers(0, 2)), stop, tid, state[tid]))
+    return make_switches(switch_rows), make_irqs(irq_rows), intervals
+
+def test_migration_within_interval():
+    sched_switch_df = make_switches([
+        # Thread 1 is preempted on CPU 0, runs on CPU 1, is preempted again and returns on CPU 2 after the stop
+        (120, 0, 1, 100), (150, 1, 101, 1), (180, 1, 1, 101), (200, 1, 102, 102), (250, 2, 102, 1),
+        # Another thread on CPU 0
+        (130, 0, 100, 2), (140, 0, 2, 100)])
+    irq_handler_entry_df = make_irqs([(100, 0), (110, 0), (115, 1), (120, 0), (130, 0), (150, 1), (160, 1), (170, 0),
+                                      (190, 1), (200, 1), (260, 2)])
+    collisions = assert_same_collisions(sched_switch_df, irq_handler_entry_df,
+                                        [(100, 200, 1, 0), (100, 200, 2, 3), (200, 300, 1, 2)])
+    # Interrupts at the start, the preemption, the switch-in and the stop and on other CPUs are left out
+    assert collisions == [([0, 2], [1, 6], 50), ([6], [], 60), ([], [10], 0)]
+
+def test_preemption_without_switch_in():
+    sched_switch_df = make_switches([(110, 3, 1, 100)])
+    collisions = assert_same_collisions(sched_switch_df, make_irqs([(105, 3), (120, 3)]),
+                                        [(100, 150, 1, 3), (50, 90, 1, 3)])
+    assert collisions == [([0], [0], 40), ([], [], 0)]
+
+def test_empty_events():
+    intervals = [(100, 200, 1, 0), (150, 250, 2, 1)]
+    assert assert_same_collisions(make_switches([]), make_irqs([]), intervals) == [([], [], 0)] * 2
+    assert assert_same_collisions(make_switches([(120, 0, 3, 4)]), make_irqs([(130, 0)]), intervals) == \
+        [([], [0], 0), ([], [], 0)]
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_events(seed):
+    assert_same_collisions(*simulate_events(seed))
+
+def test_probe_collisions():
+    sched_switch_df, irq_handler_entry_df, intervals = simulate_events(0)
+    tracing_probe = probe.Probe('myapp', '/usr/bin/', '', 'compute', '')
+    tracing_probe.function_runtimes = np.array([(start, stop, stop - start) for start, stop, _, _ in intervals],
+                                               dtype=np.int64)
+    tracing_probe.function_tids = np.array([tid for _, _, tid, _ in intervals], dtype=np.int64)
+    tracing_probe.function_cpus = np.array([cpu for _, _, _, cpu in intervals], dtype=np.int64)
+    tracing_probe.evaluate_contextswitch_irq_collisions(sched_switch_df, irq_handler_entry_df)
+    collisions = reference_collisions(sched_switch_df, irq_handler_entry_df, intervals)
+
+    assert tracing_probe.function_preempted_times.tolist() == [preempted for _, _, preempted in collisions]
+    assert len(tracing_probe.csw_collision_events) == sum(len(csw_rows) for csw_rows, _, _ in collisions)
+    assert len(tracing_probe.irq_collision_events) == sum(len(irq_rows) for _, irq_rows, _ in collisions)
+    for index, suffix in ((int(np.argmax(tracing_probe.function_runtimes[:, 2])), 'max_runtime'),
+                          (int(np.argmin(tracing_probe.function_runtimes[:, 2])), 'min_runtime')):
+        csw_rows, irq_rows, _ = collisions[index]
+        pd.testing.assert_frame_equal(getattr(tracing_probe, 'csw_collision_events_' + suffix),
+                                      sched_switch_df.iloc[csw_rows])
+        pd.testing.assert_frame_equal(getattr(tracing_probe, 'irq_collision_events_' + suffix),
+                                      irq_handler_entry_df.iloc[irq_rows])
+    assert tracing_probe.preempted_time_max_runtime == \
+        collisions[int(np.argmax(tracing_probe.function_runtimes[:, 2]))][2]
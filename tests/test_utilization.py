@@ -0,0 +1,84 @@
+"""
+perfViewer
+Module: test_utilization
+Responsible: Brandtner Philipp
+Description:
+Compares the binned CPU utilization of cpu.get_binned_utilization and the peak window of cpu.get_peak_window with
+loops over the bins and the runtime slices.
+
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'perfViewer'))
+
+import cpu
+from runtimeslices import RuntimeSlices
+
+def make_slices(rows):
+    """ Runtime slices of rows (start, duration) """
+    runtime_slices = RuntimeSlices()
+    starts, durations = zip(*rows) if rows else ((),) * 2
+    runtime_slices.extend(np.array(starts, dtype=np.int64), np.array(durations, dtype=np.int64), 0, 1)
+    return runtime_slices.view()
+
+def reference_utilization(runtime_slices, start, stop, bin_size):
+    """ Busy time of the slices inside each bin [start + i * bin_size, start + (i + 1) * bin_size) before stop """
+    utilization = []
+    bin_start = start
+    while bin_start < stop:
+        bin_stop = min(bin_start + bin_size, stop)
+        busy_time = 0
+        for slice_start, duration in zip(runtime_slices['start'].tolist(), runtime_slices['duration'].tolist()):
+            busy_time += max(min(slice_start + duration, bin_stop) - max(slice_start, bin_start), 0)
+        utilization.append(busy_time / bin_size)
+        bin_start += bin_size
+    return utilization
+
+def reference_peak_window(utilization, window_bins):
+    """ First window of the highest mean utilization """
+    window_bins = max(min(window_bins, len(utilization)), 1)
+    sums = [sum(utilization[first:first + window_bins]) for first in range(len(utilization) - window_bins + 1)]
+    if not sums:
+        return 0, 0.0
+    return sums.index(max(sums)), max(sums) / window_bins
+
+def test_bin_boundaries():
+    runtime_slices = make_slices([
+        # Before start, across start, inside a bin, up to and from a bin boundary, over several bins, zero
+        # duration, across stop and behind stop
+        (0, 50), (90, 20), (105, 3), (110, 10), (120, 5), (125, 40), (130, 0), (185, 30), (300, 10)])
+    utilization = cpu.get_binned_utilization(runtime_slices, 100, 200, 10)
+    np.testing.assert_allclose(utilization, reference_utilization(runtime_slices, 100, 200, 10))
+    np.testing.assert_allclose(utilization, [1.3, 1.0, 1.0, 1.0, 1.0, 1.0, 0.5, 0.0, 0.5, 1.0])
+
+def test_partial_last_bin():
+    runtime_slices = make_slices([(100, 100)])
+    # The last bin ends at stop, its utilization is relative to the bin size
+    np.testing.assert_allclose(cpu.get_binned_utilization(runtime_slices, 100, 125, 10), [1.0, 1.0, 0.5])
+
+def test_empty_range_and_slices():
+    assert len(cpu.get_binned_utilization(make_slices([(0, 10)]), 100, 100, 10)) == 0
+    assert len(cpu.get_binned_utilization(make_slices([(0, 10)]), 100, 50, 10)) == 0
+    np.testing.assert_array_equal(cpu.get_binned_utilization(make_slices([]), 0, 30, 10), [0.0, 0.0, 0.0])
+    assert cpu.get_peak_window(np.empty(0), 5) == (0, 0.0)
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('bin_size', [1, 7, 100, 5000])
+def test_random_slices(seed, bin_size):
+    rng = np.random.default_rng(seed)
+    starts = np.sort(rng.integers(0, 2000, 50))
+    runtime_slices = make_slices(list(zip(starts.tolist(), rng.integers(0, 300, 50).tolist())))
+    start, stop = int(rng.integers(-100, 400)), int(rng.integers(1600, 2200))
+
+    utilization = cpu.get_binned_utilization(runtime_slices, start, stop, bin_size)
+    np.testing.assert_allclose(utilization, reference_utilization(runtime_slices, start, stop, bin_size))
+    for window_bins in (1, 3, len(utilization), len(utilization) + 5):
+        peak, peak_utilization = cpu.get_peak_window(utilization, window_bins)
+        expected_peak, expected_utilization = reference_peak_window(utilization.tolist(), window_bins)
+        assert peak_utilization == pytest.approx(expected_utilization)
+        assert sum(utilization[peak:peak + max(min(window_bins, len(utilization)), 1)]) == \
+            pytest.approx(sum(utilization[expected_peak:expected_peak + max(min(window_bins, len(utilization)), 1)]))